@@ -1,8 +1,11 @@
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 import json
 from pathlib import Path
-import librosa
+from audio_features import AudioFeatureExtractor
+from audio_stream import StreamingAudioAnalyzer
+from audio_batch import extract_features_batch
+from vad import EnergyVAD
 
 class AnalysisEngine:
     def __init__(self):
@@ -24,6 +27,12 @@ class AnalysisEngine:
             "stress_handling": 0.3
         }
         
+        self.audio_features = AudioFeatureExtractor(sample_rate=16000)
+        # Audio scores are computed over speech only; silence would skew energy and pitch statistics
+        self.vad = EnergyVAD(sample_rate=16000)
+        # Features of the most recent audio; communication and behavioral analysis share them
+        self._audio_cache = None
+        
     def analyze_response(self, 
                         text_response: str, 
                         audio_data: np.ndarray,
@@ -70,6 +79,49 @@ class AnalysisEngine:
             }
         }
     
+    def analyze_batch(self,
+                      responses: List[Dict[str, Any]],
+                      workers: int = None) -> Dict[str, Any]:
+        """
+        Analyze many responses, extracting audio features on all cores
+        
+        Each response is {"candidate_id", "text", "audio", "role_requirements"}
+        where audio is a 16 kHz array or a WAV / raw int16 PCM path. Returns
+        the per-response results in input order and, per candidate, the
+        mean of their response scores.
+        """
+        features = extract_features_batch([response["audio"] for response in responses],
+                                          sample_rate=self.audio_features.sample_rate,
+                                          workers=workers,
+                                          speech_only=True)
+        
+        results = []
+        per_candidate: Dict[Any, List[Dict[str, float]]] = {}
+        for response, audio_features in zip(responses, features):
+            # Seed the feature cache so analyze_response does not extract again
+            self._audio_cache = (response["audio"], audio_features)
+            result = self.analyze_response(response["text"], response["audio"], response["role_requirements"])
+            result["candidate_id"] = response.get("candidate_id")
+            results.append(result)
+            per_candidate.setdefault(result["candidate_id"], []).append(result["scores"])
+        self._audio_cache = None
+        
+        candidates = {
+            candidate_id: {
+                "responses": len(scores),
+                "scores": {
+                    category: float(np.mean([score[category] for score in scores]))
+                    for category in scores[0]
+                }
+            }
+            for candidate_id, scores in per_candidate.items()
+        }
+        
+        return {
+            "responses": results,
+            "candidates": candidates
+        }
+    
     def evaluate_technical(self, 
                          response: str, 
                          requirements: Dict[str, Any]) -> Dict[str, float]:
@@ -151,6 +203,12 @@ class AnalysisEngine:
             matches[req] = any(self._concept_matches(c, req) for c in concepts)
         return matches
     
+    def _calculate_accuracy(self, concept_matches: Dict[str, bool]) -> float:
+        """Share of role requirements covered by the response"""
+        if not concept_matches:
+            return 0.0
+        return sum(concept_matches.values()) / len(concept_matches)
+    
     def _concept_matches(self, concept: str, requirement: str) -> bool:
         """Check if a concept matches a requirement"""
         # Implement fuzzy matching
@@ -206,27 +264,18 @@ class AnalysisEngine:
             return 0.0
     
     def _extract_audio_features(self, audio: np.ndarray) -> Dict[str, np.ndarray]:
-        """Extract relevant features from audio"""
-        # Sample rate for feature extraction
-        sr = 16000
-        
-        # Extract features using librosa
-        features = {}
+        """Extract relevant features from the speech segments of audio (16 kHz) in one framing pass"""
+        if self._audio_cache is not None and self._audio_cache[0] is audio:
+            return self._audio_cache[1]
         
         try:
-            # Pitch (fundamental frequency)
-            features["pitch"] = librosa.yin(audio, fmin=75, fmax=300)
-            
-            # Volume/energy
-            features["rms"] = librosa.feature.rms(y=audio)[0]
-            
-            # Speech rate (zero crossing rate)
-            features["zcr"] = librosa.feature.zero_crossing_rate(audio)[0]
-            
-            return features
+            features = self.audio_features.extract(self.vad.trim(audio))
         except Exception as e:
             print(f"Error extracting audio features: {str(e)}")
             return {}
+        
+        self._audio_cache = (audio, features)
+        return features
     
     def _calculate_confidence_score(self, 
                                  features: Dict[str, np.ndarray]) -> float:
@@ -235,8 +284,9 @@ class AnalysisEngine:
             return 0.0
             
         try:
-            # Analyze pitch stability
-            pitch_stability = np.std(features["pitch"])
+            # Analyze pitch stability (voiced frames only)
+            voiced_pitch = features["pitch"][features["voiced"]]
+            pitch_stability = np.std(voiced_pitch) if voiced_pitch.size else 0.0
             
             # Analyze volume variation
             volume_variation = np.std(features["rms"])
@@ -244,19 +294,23 @@ class AnalysisEngine:
             # Analyze speech rate
             speech_rate = np.mean(features["zcr"])
             
-            # Combine into confidence score
-            # These weights could be tuned based on data
-            score = (
-                0.4 * self._normalize_score(pitch_stability, 0, 50) +
-                0.4 * self._normalize_score(volume_variation, 0, 0.2) +
-                0.2 * self._normalize_score(speech_rate, 0.05, 0.15)
-            )
-            
-            return min(max(score, 0.0), 1.0)
+            return self._confidence_from_stats(pitch_stability, volume_variation, speech_rate)
         except Exception as e:
             print(f"Error calculating confidence score: {str(e)}")
             return 0.0
     
+    def _confidence_from_stats(self, pitch_stability: float, volume_variation: float, speech_rate: float) -> float:
+        """Confidence score from pitch std, RMS std and mean ZCR"""
+        # Combine into confidence score
+        # These weights could be tuned based on data
+        score = (
+            0.4 * self._normalize_score(pitch_stability, 0, 50) +
+            0.4 * self._normalize_score(volume_variation, 0, 0.2) +
+            0.2 * self._normalize_score(speech_rate, 0.05, 0.15)
+        )
+        
+        return float(min(max(score, 0.0), 1.0))
+    
     def _normalize_score(self, 
                         value: float, 
                         min_val: float, 
@@ -297,53 +351,68 @@ class AnalysisEngine:
     
     def _extract_stress_features(self, audio: np.ndarray) -> Dict[str, np.ndarray]:
         """Extract features related to stress"""
-        features = {}
+        features = self._extract_audio_features(audio)
+        if not features:
+            return {}
         
-        try:
+        return {
             # Jitter (pitch variation)
-            features["jitter"] = self._calculate_jitter(audio)
-            
+            "jitter": features["jitter"],
             # Shimmer (amplitude variation)
-            features["shimmer"] = self._calculate_shimmer(audio)
-            
+            "shimmer": features["shimmer"],
             # Speech rate variation
-            features["rate_var"] = self._calculate_rate_variation(audio)
-            
-            return features
-        except Exception as e:
-            print(f"Error extracting stress features: {str(e)}")
-            return {}
-    
-    def _calculate_jitter(self, audio: np.ndarray) -> np.ndarray:
-        """Calculate jitter from audio"""
-        # Implement pitch variation calculation
-        return np.array([])  # Placeholder
-    
-    def _calculate_shimmer(self, audio: np.ndarray) -> np.ndarray:
-        """Calculate shimmer from audio"""
-        # Implement amplitude variation calculation
-        return np.array([])  # Placeholder
-    
-    def _calculate_rate_variation(self, audio: np.ndarray) -> np.ndarray:
-        """Calculate speech rate variation"""
-        # Implement rate variation calculation
-        return np.array([])  # Placeholder
+            "rate_var": features["rate_var"],
+            "voiced": features["voiced"]
+        }
     
     def _calculate_stress_score(self, 
                               features: Dict[str, np.ndarray]) -> float:
-        """Calculate stress score from features"""
-        if not features:
+        """Calculate stress handling score from features (1.0 = calm, steady voice)"""
+        # No voiced frames means no jitter or shimmer to judge, not a calm voice
+        if not features or not np.any(features["voiced"]):
             return 0.0
             
         try:
-            # Combine features into stress score
-            # This could be enhanced with machine learning
-            score = 0.0  # Placeholder calculation
-            return min(max(score, 0.0), 1.0)
+            jitter = float(np.mean(features["jitter"])) if features["jitter"].size else 0.0
+            shimmer = float(np.mean(features["shimmer"])) if features["shimmer"].size else 0.0
+            rate = features["rate_var"]
+            rate_variation = float(np.std(rate) / np.mean(rate)) if rate.size and np.mean(rate) > 0 else 0.0
+            return self._stress_from_stats(jitter, shimmer, rate_variation)
         except Exception as e:
             print(f"Error calculating stress score: {str(e)}")
             return 0.0
     
+    def _stress_from_stats(self, jitter: float, shimmer: float, rate_variation: float) -> float:
+        """Stress handling score from mean jitter, mean shimmer and speech rate coefficient of variation"""
+        # Combine into stress level; these ranges could be tuned based on data
+        stress = (
+            0.4 * min(max(self._normalize_score(jitter, 0.01, 0.08), 0.0), 1.0) +
+            0.4 * min(max(self._normalize_score(shimmer, 0.05, 0.4), 0.0), 1.0) +
+            0.2 * min(max(self._normalize_score(rate_variation, 0.0, 1.0), 0.0), 1.0)
+        )
+        return min(max(1.0 - stress, 0.0), 1.0)
+    
+    def analyze_audio_stream(self,
+                             source: Union[str, np.ndarray],
+                             segment_seconds: float = 60.0,
+                             chunk_seconds: float = 10.0,
+                             dtype: str = 'int16') -> Dict[str, Any]:
+        """
+        Voice confidence and stress handling per segment and for the whole
+        recording, reading `source` (a WAV path, raw PCM path or array) in
+        chunks with constant memory. Silence is cut before scoring, as in
+        analyze_response, so segments are `segment_seconds` of speech.
+        """
+        analyzer = StreamingAudioAnalyzer(self.audio_features, segment_seconds=segment_seconds, vad=self.vad)
+        result = analyzer.analyze(source, chunk_seconds=chunk_seconds, dtype=dtype)
+        for summary in result["segments"] + [result["overall"]]:
+            summary["confidence"] = self._confidence_from_stats(summary["pitch_std"], summary["rms_std"], summary["zcr_mean"])
+            summary["stress_handling"] = (
+                self._stress_from_stats(summary["jitter"], summary["shimmer"], summary["rate_variation"])
+                if summary["voiced_ratio"] > 0 else 0.0
+            )
+        return result
+    
     def _weighted_average(self, 
                          scores: Dict[str, float], 
                          weights: Dict[str, float]) -> float:
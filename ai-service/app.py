@@ -20,30 +20,38 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import AI modules
-from services.llm_service import LLMService
-from services.gemini_service import GeminiService
-from services.resume_service import ResumeService
-from services.resume_screening_service import ResumeScreeningService
-from services.job_description_service import JobDescriptionService
-from services.email_service import EmailService
-from services.performance_service import PerformanceService
-from services.interview_service import InterviewService
-from services.pdf_service import pdf_extractor
+# AI services are imported and constructed on first use (see services/service_registry.py)
+from services.service_registry import services, warmup_names
+from services.result_outbox import ResultOutbox
+from services.ttl_cache import TTLCache
 
 # Import new routes
 from routes.question_generator import question_generator_bp
 
 
 # Initialize services
-llm_service = LLMService()
-gemini_service = GeminiService()
-resume_service = ResumeService(llm_service)
-resume_screening_service = ResumeScreeningService(llm_service)
-job_description_service = JobDescriptionService(llm_service)
-email_service = EmailService(llm_service, gemini_service)
-performance_service = PerformanceService(llm_service)
-interview_service = InterviewService(llm_service, gemini_service)
+llm_service = services.proxy('llm')
+gemini_service = services.proxy('gemini')
+resume_service = services.proxy('resume')
+resume_screening_service = services.proxy('resume_screening')
+job_description_service = services.proxy('job_description')
+email_service = services.proxy('email')
+performance_service = services.proxy('performance')
+interview_service = services.proxy('interview')
+pdf_extractor = services.proxy('pdf_extractor')
+result_outbox = ResultOutbox()
+
+# Custom (PDF) question sets per application id; "none found" is cached for a shorter time
+custom_question_cache = TTLCache(ttl=float(os.getenv('CUSTOM_QUESTIONS_CACHE_TTL', 120)))
+CUSTOM_QUESTIONS_NEGATIVE_TTL = float(os.getenv('CUSTOM_QUESTIONS_NEGATIVE_TTL', 60))
+CUSTOM_QUESTIONS_TIMEOUT = float(os.getenv('CUSTOM_QUESTIONS_TIMEOUT', 2))
+
+# Resume delivery of results queued before a restart
+if result_outbox.pending_count():
+    result_outbox.start()
+
+# Build services in the background so the first requests rarely wait for model loads
+services.warm_up(warmup_names())
 
 
 @app.route('/health', methods=['GET'])
@@ -52,7 +60,9 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'AI HRMS Service',
-        'model_loaded': llm_service.is_loaded()
+        'model_loaded': services.is_initialized('llm') and llm_service.is_loaded(),
+        'services_ready': services.initialized,
+        'pending_result_deliveries': result_outbox.pending_count()
     })
 
 @app.route('/api/ai/resume/screen', methods=['POST'])
@@ -347,6 +357,77 @@ def chat():
         logger.error(f"Error in chat: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def get_custom_questions(application_id):
+    """
+    Custom questions uploaded (from PDF) for an application, formatted for the interview
+    Cached per application id in this process; an empty list means none exist.
+    Failed lookups are not cached, so the next request asks the backend again
+    """
+    cache_key = str(application_id)
+    questions = custom_question_cache.get(cache_key)
+    if questions is not None:
+        logger.info(f"♻️ Custom questions for application {application_id} served from cache ({len(questions)})")
+        return questions
+    
+    logger.info(f"🔍 Checking for custom questions for application {application_id}")
+    questions = []
+    fetched = False
+    try:
+        import requests
+        backend_url = os.getenv('BACKEND_URL', 'http://localhost:5000')
+        response = requests.get(
+            f"{backend_url}/api/interview-questions/{application_id}",
+            timeout=CUSTOM_QUESTIONS_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            custom_questions = response.json().get('data', [])
+            fetched = True
+            
+            # Convert custom questions to expected format
+            for q in custom_questions or []:
+                questions.append({
+                    'text': q.get('question_text'),
+                    'type': q.get('question_type', 'general'),
+                    'duration': q.get('duration', 180),
+                    'code': q.get('code_snippet'),
+                    'language': q.get('code_language', 'javascript'),
+                    'expected_answer': q.get('expected_answer'),
+                    'answer_mode': q.get('answer_mode', 'voice')  # 'voice' or 'write'
+                })
+    except Exception as e:
+        logger.warning(f"Could not fetch custom questions: {e}")
+    
+    if questions:
+        logger.info(f"✅ Found {len(questions)} custom questions from PDF!")
+        custom_question_cache.set(cache_key, questions)
+    elif fetched:
+        custom_question_cache.set(cache_key, questions, ttl=CUSTOM_QUESTIONS_NEGATIVE_TTL)
+    return questions
+
+@app.route('/api/ai/interview/questions/invalidate', methods=['POST'])
+def invalidate_custom_questions():
+    """
+    Webhook for the backend when an application's custom questions change
+    Body: { application_id } (omit to clear all). Requires X-API-Secret when API_SECRET is set.
+    The cache is per process: with several workers only the one receiving this
+    call is cleared, the others pick up the change within CUSTOM_QUESTIONS_CACHE_TTL
+    """
+    api_secret = os.getenv('API_SECRET')
+    if api_secret and request.headers.get('X-API-Secret') != api_secret:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    application_id = data.get('application_id')
+    if application_id:
+        custom_question_cache.invalidate(str(application_id))
+        logger.info(f"🗑️ Custom question cache invalidated for application {application_id}")
+    else:
+        custom_question_cache.clear()
+        logger.info("🗑️ Custom question cache cleared")
+    
+    return jsonify({'success': True})
+
 @app.route('/api/ai/interview/questions', methods=['POST'])
 def generate_interview_questions():
     """
@@ -362,44 +443,18 @@ def generate_interview_questions():
         
         # Check if custom questions exist for this application
         if application_id:
-            logger.info(f"🔍 Checking for custom questions for application {application_id}")
-            try:
-                import requests
-                backend_url = os.getenv('BACKEND_URL', 'http://localhost:5000')
-                response = requests.get(f"{backend_url}/api/interview-questions/{application_id}")
+            questions = get_custom_questions(application_id)
+            if questions:
+                total_duration = sum(q['duration'] for q in questions)
                 
-                if response.status_code == 200:
-                    custom_questions_data = response.json()
-                    custom_questions = custom_questions_data.get('data', [])
-                    
-                    if custom_questions and len(custom_questions) > 0:
-                        logger.info(f"✅ Found {len(custom_questions)} custom questions from PDF!")
-                        
-                        # Convert custom questions to expected format
-                        questions = []
-                        for q in custom_questions:
-                            questions.append({
-                                'text': q.get('question_text'),
-                                'type': q.get('question_type', 'general'),
-                                'duration': q.get('duration', 180),
-                                'code': q.get('code_snippet'),
-                                'language': q.get('code_language', 'javascript'),
-                                'expected_answer': q.get('expected_answer'),
-                                'answer_mode': q.get('answer_mode', 'voice')  # 'voice' or 'write'
-                            })
-                        
-                        total_duration = sum(q['duration'] for q in questions)
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': {
-                                'questions': questions,
-                                'estimated_duration': total_duration // 60,
-                                'source': 'custom_pdf'
-                            }
-                        })
-            except Exception as e:
-                logger.warning(f"Could not fetch custom questions: {e}")
+                return jsonify({
+                    'success': True,
+                    'data': {
+                        'questions': questions,
+                        'estimated_duration': total_duration // 60,
+                        'source': 'custom_pdf'
+                    }
+                })
         
         # No custom questions found, generate new ones
         logger.info(f"🎯 Generating {num_questions} {interview_type} interview questions for {job_title}")
@@ -419,7 +474,7 @@ def generate_interview_questions():
 def generate_questions_by_category():
     """
     Generate AI interview questions based on category and difficulty
-    Body: { job_role, category, difficulty, num_questions }
+    Body: { job_role, category, difficulty, num_questions, candidate_id (optional) }
     """
     try:
         data = request.json
@@ -427,10 +482,14 @@ def generate_questions_by_category():
         category = data.get('category', 'technical')
         difficulty = data.get('difficulty', 'intermediate')
         num_questions = data.get('num_questions', 5)
+        candidate_id = data.get('candidate_id') or data.get('application_id')
         
         logger.info(f"🎯 Generating {num_questions} {difficulty} {category} questions for {job_role}")
         
-        result = interview_service.generate_questions_by_category(job_role, category, difficulty, num_questions)
+        result = interview_service.generate_questions_by_category(
+            job_role, category, difficulty, num_questions,
+            candidate_id=str(candidate_id) if candidate_id else None
+        )
         
         return jsonify({
             'success': True,
@@ -464,19 +523,17 @@ def evaluate_interview():
         
         result = interview_service.evaluate_interview(questions, answers, job_title, candidate_name)
         
-        # Save results to backend if token provided
+        # Save results to backend if token provided (delivered in the background with retries)
         if interview_token:
             try:
-                import requests
                 backend_url = os.getenv('BACKEND_URL', 'http://localhost:5000')
-                response = requests.post(
+                result_outbox.enqueue(
                     f"{backend_url}/api/applications/interview/{interview_token}/results",
-                    json=result,
-                    headers={'Content-Type': 'application/json'}
+                    result,
+                    ResultOutbox.make_idempotency_key(f"interview-results:{interview_token}", result)
                 )
-                logger.info(f"✅ Results saved to backend: {response.status_code}")
             except Exception as e:
-                logger.error(f"Failed to save results to backend: {e}")
+                logger.error(f"Failed to queue results for backend: {e}")
         
         return jsonify({
             'success': True,
@@ -0,0 +1,203 @@
+"""
+Long-lived Whisper ASR worker process.
+
+The model is loaded once in a separate process (shared by every
+VoiceInteractionFallback in this process) and audio segments arrive over
+a queue. A TranscriptionSession submits voiced chunks while the candidate
+is still speaking - the worker passes the previous chunk's text as the
+prompt for the next one - and stitches the partial transcripts, so only
+the last short chunk remains to decode after end-of-speech.
+"""
+
+import atexit
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+import numpy as np
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+# Audio shorter than this is not worth a decode (Whisper hallucinates on near-empty input)
+MIN_CHUNK_SECONDS = 0.3
+PROMPT_CHARS = 200
+
+
+def _serve(model_name: str, language: str, requests, results):
+    """Worker process: load the model once, then transcribe requests until None arrives"""
+    model = None
+    try:
+        import whisper
+        model = whisper.load_model(model_name)
+        results.put((None, 'ready', None))
+    except Exception as e:
+        results.put((None, 'error', f"Failed to load whisper model: {e}"))
+
+    prompts: Dict[str, str] = {}
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+        if item[0] == 'end':
+            prompts.pop(item[1], None)
+            continue
+
+        _, request_id, session, audio = item
+        if model is None:
+            results.put((request_id, 'error', 'whisper model unavailable'))
+            continue
+        try:
+            result = model.transcribe(audio, language=language, initial_prompt=prompts.get(session))
+            text = result.get('text', '').strip()
+            if session and text:
+                prompts[session] = text[-PROMPT_CHARS:]
+            results.put((request_id, 'ok', text))
+        except Exception as e:
+            results.put((request_id, 'error', str(e)))
+
+
+def stitch_transcripts(parts: List[str]) -> str:
+    """Join chunk transcripts in order; chunks are cut at pauses and never overlap, so no words are dropped"""
+    return ' '.join(part.strip() for part in parts if part and part.strip())
+
+
+class ASRWorker:
+    """Handle to the Whisper process; transcription requests resolve as futures"""
+
+    def __init__(self, model_name: str = 'base', language: str = 'en'):
+        self.model_name = model_name
+        self.language = language
+        # spawn: never fork a process that holds audio streams and threads
+        context = multiprocessing.get_context('spawn')
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(target=_serve, args=(model_name, language, self._requests, self._results),
+                                        name='whisper-asr', daemon=True)
+        self._process.start()
+
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+        self.error: Optional[str] = None
+        self._dispatcher = threading.Thread(target=self._dispatch, name='whisper-asr-results', daemon=True)
+        self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            try:
+                request_id, status, payload = self._results.get(timeout=1)
+            except queue.Empty:
+                if self._process.is_alive():
+                    continue
+                self._fail_pending(f"ASR worker exited (code {self._process.exitcode})")
+                return
+            except (EOFError, OSError):
+                self._fail_pending('ASR worker result queue closed')
+                return
+            if request_id is None:
+                if status == 'error':
+                    self.error = payload
+                    print('Warning:', payload)
+                self.ready.set()
+                continue
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if status == 'ok':
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _fail_pending(self, reason: str):
+        """Fail every outstanding request once the worker process is gone"""
+        print('Warning:', reason)
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(RuntimeError(reason))
+        self.error = self.error or reason
+        self.ready.set()
+
+    def submit(self, audio: np.ndarray, session: str = None) -> Future:
+        """Queue float32 16 kHz audio for transcription; the future resolves to its text"""
+        future = Future()
+        request_id = next(self._ids)
+        # Checked under the lock: once the dispatcher has failed the pending requests of a dead
+        # worker it stops, so nothing may be registered after that
+        with self._lock:
+            if not self._process.is_alive():
+                future.set_exception(RuntimeError('ASR worker is not running'))
+                return future
+            self._pending[request_id] = future
+        self._requests.put(('transcribe', request_id, session, np.ascontiguousarray(audio, dtype=np.float32)))
+        return future
+
+    def transcribe(self, audio: np.ndarray, timeout: float = None) -> str:
+        """Text of `audio`; raises TimeoutError if the worker has not answered within `timeout` seconds"""
+        return self.submit(audio).result(timeout)
+
+    def session(self) -> 'TranscriptionSession':
+        return TranscriptionSession(self)
+
+    def end_session(self, session: str):
+        self._requests.put(('end', session))
+
+    def close(self, timeout: float = 5):
+        if self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+
+
+class TranscriptionSession:
+    """Chunks of one utterance, transcribed in order while recording continues"""
+
+    def __init__(self, worker: ASRWorker, sample_rate: int = 16000):
+        self.worker = worker
+        self.id = uuid.uuid4().hex
+        self.min_samples = int(MIN_CHUNK_SECONDS * sample_rate)
+        self._futures: List[Future] = []
+
+    def add(self, audio: np.ndarray):
+        """Submit a completed voiced chunk (safe to call from the recording loop)"""
+        if len(audio) >= self.min_samples:
+            self._futures.append(self.worker.submit(audio, session=self.id))
+
+    def finish(self, timeout: float = None) -> str:
+        """Wait for every chunk and return the stitched transcript (failed chunks are skipped)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        parts = []
+        for future in self._futures:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                parts.append(future.result(remaining))
+            except Exception as e:
+                print('Whisper transcription failed:', e)
+        self.worker.end_session(self.id)
+        return stitch_transcripts(parts)
+
+
+_workers: Dict[tuple, ASRWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_asr_worker(model_name: str = 'base', language: str = 'en') -> ASRWorker:
+    """The process-wide worker for a model, started on first use (and restarted if it died)"""
+    key = (model_name, language)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None or not worker._process.is_alive():
+            worker = _workers[key] = ASRWorker(model_name, language)
+        return worker
+
+
+@atexit.register
+def _close_workers():
+    for worker in list(_workers.values()):
+        worker.close()
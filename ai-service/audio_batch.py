@@ -0,0 +1,116 @@
+"""
+Parallel audio feature extraction for many recorded answers.
+
+The answers' samples are copied once into a single shared memory block
+(or, for file paths, read by the workers themselves from memory-mapped
+files) and a process pool extracts features from zero-copy views of it,
+so large arrays are never pickled and every core is used. Only the
+compact per-frame float32 features travel back to the caller.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from audio_features import AudioFeatureExtractor
+from audio_stream import iter_audio_chunks
+from vad import EnergyVAD
+
+AudioInput = Union[str, np.ndarray]
+
+# One extractor (and VAD when only speech is analyzed) per worker process, created by the pool initializer
+_worker_extractor: Optional[AudioFeatureExtractor] = None
+_worker_vad: Optional[EnergyVAD] = None
+
+
+def _init_worker(sample_rate: int, speech_only: bool):
+    global _worker_extractor, _worker_vad
+    _worker_extractor = AudioFeatureExtractor(sample_rate=sample_rate)
+    _worker_vad = EnergyVAD(sample_rate=sample_rate) if speech_only else None
+
+
+def _extract(audio: np.ndarray) -> Dict[str, np.ndarray]:
+    if _worker_vad is not None:
+        audio = _worker_vad.trim(audio)
+    return _worker_extractor.extract(audio)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to the parent's block; pool workers share the parent's resource tracker, which unlinks it once"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def _extract_shared(task: Tuple[str, int, int]) -> Dict[str, np.ndarray]:
+    name, offset, length = task
+    block = _attach(name)
+    try:
+        audio = np.ndarray((length,), dtype=np.float32, buffer=block.buf, offset=offset * 4)
+        features = _extract(audio)
+        del audio  # The view must be gone before the block can be closed
+        return features
+    finally:
+        block.close()
+
+
+def _extract_file(task: Tuple[str, str]) -> Dict[str, np.ndarray]:
+    path, dtype = task
+    chunks = list(iter_audio_chunks(path, 1 << 20, _worker_extractor.sample_rate, dtype))
+    audio = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float32)
+    return _extract(audio)
+
+
+def extract_features_batch(audios: Sequence[AudioInput],
+                           sample_rate: int = 16000,
+                           workers: int = None,
+                           dtype: str = 'int16',
+                           speech_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    AudioFeatureExtractor.extract of every input, in input order, across processes
+
+    Inputs are arrays (shared through one SharedMemory block) or paths to
+    WAV / raw PCM files (`dtype`), read by the worker that analyzes them.
+    With `speech_only`, silence is cut with EnergyVAD before extraction.
+    Failed inputs give an empty dict. AUDIO_ANALYSIS_WORKERS caps the pool
+    (default: all cores).
+    """
+    if not audios:
+        return []
+    workers = workers or int(os.getenv('AUDIO_ANALYSIS_WORKERS', 0)) or os.cpu_count() or 1
+    workers = max(1, min(workers, len(audios)))
+
+    arrays = [(index, np.asarray(audio).ravel()) for index, audio in enumerate(audios) if not isinstance(audio, str)]
+    total = sum(array.size for _, array in arrays)
+
+    block = shared_memory.SharedMemory(create=True, size=max(total, 1) * 4) if arrays else None
+    try:
+        tasks: List[Tuple[int, Any, tuple]] = []
+        if block is not None:
+            buffer = np.ndarray((total,), dtype=np.float32, buffer=block.buf)
+            offset = 0
+            for index, array in arrays:
+                buffer[offset:offset + array.size] = array
+                tasks.append((index, _extract_shared, (block.name, offset, array.size)))
+                offset += array.size
+            del buffer
+        for index, audio in enumerate(audios):
+            if isinstance(audio, str):
+                tasks.append((index, _extract_file, (audio, dtype)))
+
+        results: List[Dict[str, Any]] = [{} for _ in audios]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(sample_rate, speech_only)) as pool:
+            futures = [(index, pool.submit(fn, task)) for index, fn, task in tasks]
+            for index, future in futures:
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"Error extracting audio features for response {index}: {str(e)}")
+        return results
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
@@ -0,0 +1,184 @@
+"""
+Single-pass audio feature extraction for AnalysisEngine.
+
+The signal is framed once (a strided view, no copies) and every feature -
+RMS, zero crossing rate, YIN pitch, jitter, shimmer and speech rate
+variation - is computed from those shared frames with vectorized NumPy,
+instead of re-framing the signal per feature. All outputs are float32.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from typing import Dict
+
+
+def frame_signal(audio: np.ndarray, frame_length: int, hop_length: int, center: bool = True) -> np.ndarray:
+    """
+    Frames of `audio` as a (n_frames, frame_length) read-only view
+
+    With `center` the signal is zero padded by half a frame on both sides
+    so frame i is centered on sample i * hop_length, as librosa does with
+    center=True; without it frame i starts at sample i * hop_length and
+    trailing samples that do not fill a frame are left out.
+    """
+    audio = np.ascontiguousarray(audio, dtype=np.float32).ravel()
+    if not center:
+        if len(audio) < frame_length:
+            return np.empty((0, frame_length), dtype=np.float32)
+        n_frames = 1 + (len(audio) - frame_length) // hop_length
+        stride = audio.strides[0]
+        return as_strided(audio, shape=(n_frames, frame_length), strides=(hop_length * stride, stride), writeable=False)
+
+    pad = frame_length // 2
+    padded = np.pad(audio, (pad, pad))
+    if len(padded) < frame_length:
+        padded = np.pad(padded, (0, frame_length - len(padded)))
+    n_frames = 1 + (len(padded) - frame_length) // hop_length
+    stride = padded.strides[0]
+    return as_strided(padded, shape=(n_frames, frame_length), strides=(hop_length * stride, stride), writeable=False)
+
+
+class AudioFeatureExtractor:
+    """Frame-level speech features sharing one framing pass"""
+
+    def __init__(self,
+                 sample_rate: int = 16000,
+                 frame_length: int = 1024,
+                 hop_length: int = 256,
+                 fmin: float = 75.0,
+                 fmax: float = 300.0,
+                 yin_threshold: float = 0.1,
+                 silence_rms: float = 0.01):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.min_lag = max(1, int(np.floor(sample_rate / fmax)))
+        self.max_lag = int(np.ceil(sample_rate / fmin))
+        # YIN compares the first `window` samples of a frame with the frame shifted by up to max_lag
+        self.window = frame_length - self.max_lag - 1
+        if self.window <= self.max_lag:
+            raise ValueError("frame_length is too short for fmin; it must exceed twice the longest pitch period")
+        self.yin_threshold = yin_threshold
+        self.silence_rms = silence_rms
+        self.n_fft = 1 << int(np.ceil(np.log2(frame_length + self.window)))
+
+    def extract(self, audio: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Per-frame and summary features of a mono signal at `sample_rate`
+
+        Returns rms, zcr, pitch (Hz, NaN where unvoiced), voiced (bool),
+        jitter and shimmer (relative period / amplitude changes between
+        consecutive voiced frames) and rate_var (energy peaks per second
+        in consecutive one-second windows).
+        """
+        frame = self.frame_features(frame_signal(audio, self.frame_length, self.hop_length))
+        voiced = frame["voiced"]
+
+        return {
+            "rms": frame["rms"],
+            "zcr": frame["zcr"],
+            "pitch": frame["pitch"],
+            "voiced": voiced,
+            "jitter": self.relative_change(frame["period"], voiced),
+            "shimmer": self.relative_change(frame["peak"], voiced),
+            "rate_var": self.speech_rate(frame["rms"])
+        }
+
+    def frame_features(self, frames: np.ndarray) -> Dict[str, np.ndarray]:
+        """rms, zcr, period (samples), pitch (Hz), voiced and peak amplitude of each frame"""
+        if not len(frames):
+            empty = np.empty(0, dtype=np.float32)
+            return {"rms": empty, "zcr": empty, "period": empty, "pitch": empty,
+                    "voiced": np.empty(0, dtype=bool), "peak": empty}
+
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1)).astype(np.float32)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1).astype(np.float32) / self.frame_length
+
+        periods = self._yin_periods(frames)
+        voiced = np.isfinite(periods) & (rms >= self.silence_rms)
+        periods = np.where(voiced, periods, np.nan).astype(np.float32)
+
+        return {
+            "rms": rms,
+            "zcr": zcr,
+            "period": periods,
+            "pitch": (self.sample_rate / periods).astype(np.float32),
+            "voiced": voiced,
+            "peak": np.max(np.abs(frames), axis=1).astype(np.float32)
+        }
+
+    def _yin_periods(self, frames: np.ndarray) -> np.ndarray:
+        """Pitch period in samples per frame (NaN where no period is found), vectorized over frames"""
+        window = self.window
+        max_lag = self.max_lag
+
+        # r(tau) = sum_j x[j] x[j + tau] for j < window, for every frame at once via one batched FFT
+        spectrum = np.fft.rfft(frames, self.n_fft, axis=1)
+        head = np.fft.rfft(frames[:, :window], self.n_fft, axis=1)
+        correlation = np.fft.irfft(np.conj(head) * spectrum, self.n_fft, axis=1)[:, :max_lag + 1]
+
+        # Energy of x[tau : tau + window] for every lag from a cumulative sum of squares
+        energy = np.cumsum(np.square(frames[:, :max_lag + window], dtype=np.float64), axis=1)
+        energy = np.concatenate([np.zeros((len(frames), 1)), energy], axis=1)
+        lag_energy = energy[:, window:window + max_lag + 1] - energy[:, :max_lag + 1]
+
+        difference = np.maximum(lag_energy[:, :1] + lag_energy - 2 * correlation, 0)
+
+        # Cumulative mean normalized difference
+        lags = np.arange(1, max_lag + 1)
+        running = np.cumsum(difference[:, 1:], axis=1)
+        cmnd = np.ones_like(difference)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cmnd[:, 1:] = np.where(running > 0, difference[:, 1:] * lags / running, 1.0)
+
+        # First local minimum below the threshold within [min_lag, max_lag)
+        lo, hi = self.min_lag, max_lag
+        center = cmnd[:, lo:hi]
+        trough = (center < cmnd[:, lo - 1:hi - 1]) & (center <= cmnd[:, lo + 1:hi + 1]) & (center < self.yin_threshold)
+        found = trough.any(axis=1)
+        offset = np.argmax(trough, axis=1)
+        period = (offset + lo).astype(np.float64)
+
+        # Parabolic interpolation around the chosen lag for sub-sample precision
+        rows = np.arange(len(frames))
+        tau = offset + lo
+        left = cmnd[rows, tau - 1]
+        middle = cmnd[rows, tau]
+        right = cmnd[rows, np.minimum(tau + 1, max_lag)]
+        curvature = left - 2 * middle + right
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(np.abs(curvature) > 1e-12, 0.5 * (left - right) / curvature, 0.0)
+        period += np.clip(shift, -1, 1)
+
+        return np.where(found, period, np.nan)
+
+    @staticmethod
+    def relative_change(values: np.ndarray, voiced: np.ndarray) -> np.ndarray:
+        """|v[i] - v[i-1]| / mean(v) over pairs of consecutive voiced frames"""
+        pairs = voiced[1:] & voiced[:-1]
+        if not pairs.any():
+            return np.empty(0, dtype=np.float32)
+        changes = np.abs(np.diff(values))[pairs]
+        mean = np.mean(values[voiced])
+        if not mean:
+            return np.empty(0, dtype=np.float32)
+        return (changes / mean).astype(np.float32)
+
+    def speech_rate(self, rms: np.ndarray) -> np.ndarray:
+        """Energy peaks (a syllable-rate proxy) per second in consecutive one-second windows"""
+        if len(rms) < 3:
+            return np.empty(0, dtype=np.float32)
+        # ~80 ms moving average so only syllable-scale energy peaks remain
+        width = max(1, int(round(0.08 * self.sample_rate / self.hop_length)))
+        envelope = np.convolve(rms, np.ones(width, dtype=np.float32) / width, mode='same')
+        threshold = max(self.silence_rms, 0.5 * float(np.mean(envelope)))
+        middle = envelope[1:-1]
+        peaks = (middle > envelope[:-2]) & (middle >= envelope[2:]) & (middle > threshold)
+
+        frames_per_second = max(1, int(round(self.sample_rate / self.hop_length)))
+        n_windows = len(peaks) // frames_per_second
+        if n_windows == 0:
+            return np.empty(0, dtype=np.float32)
+        counts = peaks[:n_windows * frames_per_second].reshape(n_windows, frames_per_second).sum(axis=1)
+        return counts.astype(np.float32)
@@ -0,0 +1,274 @@
+"""
+Streaming audio analysis for long interview recordings.
+
+Audio is read in fixed-size chunks (from a WAV file, a raw PCM file via
+np.memmap, or an array) and framed across chunk boundaries; only running
+statistics are kept (Welford mean/variance for pitch, energy, jitter and
+shimmer, running counts for ZCR and speech rate), so memory stays
+constant however long the recording is. With an EnergyVAD, silence is cut
+from the stream (SpeechGate) before framing, as the other audio scorers do.
+"""
+
+import os
+import wave
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from audio_features import AudioFeatureExtractor, frame_signal
+from vad import EnergyVAD, SpeechGate
+
+AudioSource = Union[str, np.ndarray]
+
+
+class RunningStats:
+    """Welford mean/variance, updated with whole arrays at a time (Chan et al. merge)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        n = values.size
+        if not n:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.square(values - batch_mean).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def merge(self, other: 'RunningStats'):
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+
+class SegmentStats:
+    """Running statistics of one stretch of audio (a segment or the whole interview)"""
+
+    def __init__(self):
+        self.pitch = RunningStats()
+        self.rms = RunningStats()
+        self.zcr = RunningStats()
+        self.period = RunningStats()
+        self.peak = RunningStats()
+        self.period_change = RunningStats()
+        self.peak_change = RunningStats()
+        self.rate = RunningStats()
+        self.frames = 0
+        self.voiced_frames = 0
+        self.zero_crossings = 0
+
+    def merge(self, other: 'SegmentStats'):
+        for name in ('pitch', 'rms', 'zcr', 'period', 'peak', 'period_change', 'peak_change', 'rate'):
+            getattr(self, name).merge(getattr(other, name))
+        self.frames += other.frames
+        self.voiced_frames += other.voiced_frames
+        self.zero_crossings += other.zero_crossings
+
+    def summary(self) -> Dict[str, float]:
+        """Scalars the AnalysisEngine scores are computed from"""
+        return {
+            "pitch_std": self.pitch.std,
+            "rms_std": self.rms.std,
+            "zcr_mean": self.zcr.mean,
+            "jitter": self.period_change.mean / self.period.mean if self.period.mean else 0.0,
+            "shimmer": self.peak_change.mean / self.peak.mean if self.peak.mean else 0.0,
+            "rate_variation": self.rate.std / self.rate.mean if self.rate.mean else 0.0,
+            "voiced_ratio": self.voiced_frames / self.frames if self.frames else 0.0,
+            "zero_crossings": self.zero_crossings
+        }
+
+
+def iter_audio_chunks(source: AudioSource,
+                      chunk_samples: int,
+                      sample_rate: int = 16000,
+                      dtype: str = 'int16') -> Iterator[np.ndarray]:
+    """
+    Mono float32 chunks of at most `chunk_samples` samples
+
+    `source` is a .wav path (PCM, any channel count - channels are
+    averaged), a raw PCM path read through np.memmap with `dtype`, or an
+    array (itself possibly memory-mapped). Only one chunk is converted to
+    float32 at a time.
+    """
+    if isinstance(source, str) and source.lower().endswith('.wav'):
+        with wave.open(source, 'rb') as wav:
+            if wav.getframerate() != sample_rate:
+                raise ValueError(f"{source} is {wav.getframerate()} Hz, expected {sample_rate} Hz")
+            width = wav.getsampwidth()
+            if width not in (1, 2, 4):
+                raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+            channels = wav.getnchannels()
+            sample_dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+            while True:
+                data = wav.readframes(chunk_samples)
+                if not data:
+                    return
+                samples = np.frombuffer(data, dtype=sample_dtype).reshape(-1, channels)
+                yield _to_float32(samples)
+        return
+
+    if isinstance(source, str):
+        if not os.path.exists(source):
+            raise FileNotFoundError(source)
+        source = np.memmap(source, dtype=dtype, mode='r')
+
+    for start in range(0, len(source), chunk_samples):
+        yield _to_float32(source[start:start + chunk_samples])
+
+
+def _to_float32(samples: np.ndarray) -> np.ndarray:
+    """Mono float32 in [-1, 1] from integer or float PCM"""
+    samples = np.asarray(samples)
+    if samples.dtype == np.uint8:
+        samples = (samples.astype(np.float32) - 128) / 128
+    elif np.issubdtype(samples.dtype, np.integer):
+        samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
+    else:
+        samples = samples.astype(np.float32, copy=False)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1, dtype=np.float32)
+    return samples
+
+
+class StreamingAudioAnalyzer:
+    """
+    Feeds chunks of a recording through AudioFeatureExtractor
+
+    Frames continue across chunk boundaries (the unframed tail of each
+    chunk is carried over), segment statistics are closed every
+    `segment_seconds` and folded into the whole-recording statistics.
+    With a `vad` only speech is analyzed, so segments and durations count
+    speech time.
+    """
+
+    def __init__(self, extractor: AudioFeatureExtractor = None, segment_seconds: float = 60.0,
+                 vad: EnergyVAD = None):
+        self.extractor = extractor or AudioFeatureExtractor()
+        self.gate = SpeechGate(vad) if vad is not None else None
+        self.sample_rate = self.extractor.sample_rate
+        self.frames_per_second = max(1, int(round(self.sample_rate / self.extractor.hop_length)))
+        self.frames_per_segment = max(1, int(round(segment_seconds * self.sample_rate / self.extractor.hop_length)))
+        self.reset()
+
+    def reset(self):
+        self.total = SegmentStats()
+        self.segment = SegmentStats()
+        self.segments: List[Dict[str, float]] = []
+        self._carry = np.empty(0, dtype=np.float32)
+        self._previous: Optional[Dict[str, float]] = None  # Last frame's period/peak/voiced, for boundary pairs
+        self._rate_rms = np.empty(0, dtype=np.float32)
+        self._frames_seen = 0
+        self._samples_seen = 0
+        if self.gate is not None:
+            self.gate.reset()
+
+    def feed(self, chunk: np.ndarray) -> List[Dict[str, float]]:
+        """Add a chunk of samples; returns the summaries of segments completed by it"""
+        chunk = np.asarray(chunk, dtype=np.float32).ravel()
+        self._samples_seen += chunk.size
+        if self.gate is not None:
+            chunk = self.gate.feed(chunk)
+        return self._feed_samples(chunk)
+
+    def _feed_samples(self, samples: np.ndarray) -> List[Dict[str, float]]:
+        buffer = np.concatenate([self._carry, samples])
+        frames = frame_signal(buffer, self.extractor.frame_length, self.extractor.hop_length, center=False)
+        consumed = len(frames) * self.extractor.hop_length
+        self._carry = buffer[consumed:].copy()
+
+        completed = []
+        start = 0
+        while start < len(frames):
+            room = self.frames_per_segment - self.segment.frames
+            end = min(len(frames), start + room)
+            self._add_frames(frames[start:end])
+            start = end
+            if self.segment.frames >= self.frames_per_segment:
+                completed.append(self._close_segment())
+        return completed
+
+    def finish(self) -> Dict[str, Any]:
+        """Close the last (partial) segment; returns per-segment and whole-recording summaries"""
+        if self.gate is not None:
+            self._feed_samples(self.gate.flush())
+        if self.segment.frames:
+            self._close_segment()
+        return {
+            "segments": self.segments,
+            "overall": dict(self.total.summary(),
+                            duration_seconds=self._seconds(self._frames_seen),
+                            recording_seconds=round(self._samples_seen / self.sample_rate, 2))
+        }
+
+    def analyze(self, source: AudioSource, chunk_seconds: float = 10.0, dtype: str = 'int16') -> Dict[str, Any]:
+        self.reset()
+        chunk_samples = max(self.extractor.frame_length, int(chunk_seconds * self.sample_rate))
+        for chunk in iter_audio_chunks(source, chunk_samples, self.sample_rate, dtype):
+            self.feed(chunk)
+        return self.finish()
+
+    def _add_frames(self, frames: np.ndarray):
+        features = self.extractor.frame_features(frames)
+        voiced = features["voiced"]
+        segment = self.segment
+
+        segment.frames += len(frames)
+        segment.voiced_frames += int(voiced.sum())
+        segment.zero_crossings += int(round(float(features["zcr"].sum()) * self.extractor.frame_length))
+        segment.rms.update(features["rms"])
+        segment.zcr.update(features["zcr"])
+        segment.pitch.update(features["pitch"][voiced])
+        segment.period.update(features["period"][voiced])
+        segment.peak.update(features["peak"][voiced])
+
+        # Changes between consecutive voiced frames, including the pair across the chunk boundary
+        periods, peaks = features["period"], features["peak"]
+        if self._previous is not None:
+            periods = np.concatenate([[self._previous["period"]], periods])
+            peaks = np.concatenate([[self._previous["peak"]], peaks])
+            voiced = np.concatenate([[self._previous["voiced"]], voiced])
+        pairs = voiced[1:] & voiced[:-1]
+        segment.period_change.update(np.abs(np.diff(periods))[pairs])
+        segment.peak_change.update(np.abs(np.diff(peaks))[pairs])
+        self._previous = {"period": periods[-1], "peak": peaks[-1], "voiced": bool(voiced[-1])}
+
+        # Speech rate is counted per whole second of frames (plus the neighbours peak picking needs)
+        self._rate_rms = np.concatenate([self._rate_rms, features["rms"]])
+        while len(self._rate_rms) >= self.frames_per_second + 2:
+            segment.rate.update(self.extractor.speech_rate(self._rate_rms[:self.frames_per_second + 2]))
+            self._rate_rms = self._rate_rms[self.frames_per_second:]
+
+        self._frames_seen += len(frames)
+
+    def _seconds(self, frames: int) -> float:
+        return round(frames * self.extractor.hop_length / self.sample_rate, 2)
+
+    def _close_segment(self) -> Dict[str, float]:
+        index = len(self.segments)
+        summary = dict(self.segment.summary(),
+                       index=index,
+                       start_seconds=self._seconds(index * self.frames_per_segment),
+                       duration_seconds=self._seconds(self.segment.frames))
+        self.segments.append(summary)
+        self.total.merge(self.segment)
+        self.segment = SegmentStats()
+        return summary
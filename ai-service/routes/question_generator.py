@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify
-from services.groq_question_generator import GroqQuestionGenerator
+from services.service_registry import services
 import logging
 
 logger = logging.getLogger(__name__)
 
 question_generator_bp = Blueprint('question_generator', __name__)
-groq_generator = GroqQuestionGenerator()
+# Shared with InterviewService; built on first request
+groq_generator = services.proxy('groq_generator')
 
 @question_generator_bp.route('/generate-questions', methods=['POST'])
 def generate_questions():
@@ -0,0 +1,60 @@
+"""
+Decoding Profiles - Task-aware generation budgets for structured LLM tasks
+Each profile caps max_tokens near the size of the expected output, adds
+stop sequences tied to the output format, an optional early-stop pattern
+that ends decoding once the last required field has been written, and
+JSON-constrained decoding where the task returns JSON
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+DECODING_PROFILES: Dict[str, Dict[str, Any]] = {
+    # ResumeService.screen_resume: numbered list ending with "4. Recommendation: ..."
+    'resume_screening': {
+        'max_tokens': 320,
+        'temperature': 0.5,
+        'stop': ['</s>', '[INST]'],
+        'stop_pattern': r'Recommendation:\s*\**\s*(Highly Recommended|Not Recommended|Recommended|Consider)',
+    },
+    # ResumeScreeningService._llm_analysis: sections ending with "HIRING RECOMMENDATION: ..."
+    'ats_analysis': {
+        'max_tokens': 450,
+        'temperature': 0.3,
+        'stop': ['</s>', '[INST]'],
+        'stop_pattern': r'HIRING RECOMMENDATION:\s*\**\s*(Strong Yes|Yes|Maybe|No)\b',
+    },
+    'chat': {
+        'max_tokens': 384,
+        'temperature': 0.7,
+        'stop': ['</s>', '\nUser:', '\nHuman:', '\nCurrent question:'],
+    },
+    'json_extract': {
+        'max_tokens': 768,
+        'temperature': 0.3,
+        'stop': ['</s>'],
+        'json': True,
+    },
+}
+
+_COMPILED_PATTERNS: Dict[str, Any] = {}
+
+
+def get_profile(name: Optional[str]) -> Dict[str, Any]:
+    """Decoding settings for a task (empty for unknown names)"""
+    return DECODING_PROFILES.get(name or '', {})
+
+
+def stop_pattern(profile: Dict[str, Any]):
+    """Compiled early-stop regex of a profile, or None"""
+    pattern = profile.get('stop_pattern')
+    if not pattern:
+        return None
+    if pattern not in _COMPILED_PATTERNS:
+        _COMPILED_PATTERNS[pattern] = re.compile(pattern, re.IGNORECASE)
+    return _COMPILED_PATTERNS[pattern]
+
+
+def budget_for_items(count: int, tokens_per_item: int, overhead: int = 100, cap: int = 8000) -> int:
+    """max_tokens for a response listing `count` items of roughly `tokens_per_item` tokens"""
+    return max(overhead, min(overhead + max(count, 1) * tokens_per_item, cap))
@@ -0,0 +1,131 @@
+"""
+Evaluation Cache - Persistent LRU cache of graded answers
+Identical (question, answer) pairs are graded once across interviews;
+entries carry the rubric version so grades invalidate when prompts change
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'evaluation_cache.db')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r'\s+', ' ', (text or '').lower()).strip()
+    return text.rstrip('.!?;, ')
+
+
+class EvaluationCache:
+    """SQLite-backed LRU cache shared by all evaluator threads"""
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.path = path or os.getenv('EVALUATION_CACHE_PATH', DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries or int(os.getenv('EVALUATION_CACHE_MAX_ENTRIES', 50000))
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                cache_key TEXT PRIMARY KEY,
+                rubric_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_evaluations_last_used ON evaluations (last_used)')
+        self._conn.commit()
+
+        logger.info(f"✅ Evaluation cache ready: {self.path}")
+
+    @staticmethod
+    def make_key(evaluator: str, model: str, question: str, answer: str, expected_answer: str = None) -> str:
+        """Cache key for a normalized (question, answer, expected_answer) graded by evaluator/model"""
+        payload = '\x1f'.join([
+            evaluator, model or '',
+            normalize_text(question), normalize_text(answer), normalize_text(expected_answer or '')
+        ])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, rubric_version: str) -> Optional[Dict[str, Any]]:
+        """Cached result, or None if missing or graded under another rubric version"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT rubric_version, result FROM evaluations WHERE cache_key = ?', (key,)
+                ).fetchone()
+
+                if row is None or row[0] != rubric_version:
+                    if row is not None:
+                        self._conn.execute('DELETE FROM evaluations WHERE cache_key = ?', (key,))
+                        self._conn.commit()
+                    self.misses += 1
+                    return None
+
+                self._conn.execute('UPDATE evaluations SET last_used = ? WHERE cache_key = ?', (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+                return json.loads(row[1])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"⚠️ Evaluation cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, rubric_version: str, result: Dict[str, Any]):
+        """Store a graded result, evicting least recently used entries past max_entries"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO evaluations (cache_key, rubric_version, result, created_at, last_used) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, rubric_version, json.dumps(result), now, now)
+                )
+                self._writes_since_evict += 1
+                # Evict in bulk every few hundred writes rather than on every insert
+                if self._writes_since_evict >= 256:
+                    self._writes_since_evict = 0
+                    self._evict()
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Evaluation cache write failed: {str(e)}")
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM evaluations').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM evaluations WHERE cache_key IN '
+                '(SELECT cache_key FROM evaluations ORDER BY last_used ASC LIMIT ?)',
+                (excess,)
+            )
+            logger.info(f"🧹 Evicted {excess} least recently used evaluations")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM evaluations')
+            self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
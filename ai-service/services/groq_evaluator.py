@@ -4,22 +4,89 @@ Ultra-fast evaluation using Groq's LPU inference
 """
 
 import os
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from services.evaluation_cache import EvaluationCache
+from services.json_stream_parser import load_json_items
 
 logger = logging.getLogger(__name__)
 
 class GroqEvaluator:
     """Ultra-fast AI evaluation using GROQ API"""
     
+    CODE_OUTPUT_KEYWORDS = [
+        'output of', 'output is', 'what is output', 'what will be output',
+        'console.log', 'print', 'return value', 'what does it print'
+    ]
+    
+    # Bump when _create_evaluation_prompt changes so cached grades are invalidated
+    # (changes to the system prompts below are picked up automatically)
+    RUBRIC_VERSION = '1'
+    
+    SYSTEM_PROMPT = """You are an expert technical interviewer. Evaluate answers accurately and provide structured feedback.
+
+Output format (JSON):
+{
+  "score": <0-100>,
+  "technical_accuracy": <0-100>,
+  "completeness": <0-100>,
+  "feedback": "<brief constructive feedback>"
+}"""
+    
+    # Rubric is sent once per batch request instead of once per answer
+    BATCH_SYSTEM_PROMPT = """You are an expert technical interviewer. Evaluate every interview answer accurately and independently.
+
+For each item provide:
+- score (0-100): Overall correctness
+- technical_accuracy (0-100): Technical correctness
+- completeness (0-100): Coverage of key concepts (for code output, completeness = correctness)
+- feedback: Brief, constructive feedback (1-2 sentences)
+
+If an item has a reference_answer, grade against it.
+If an item has "code_output": true it is a CODE OUTPUT question: short answers like "hello", "10", "undefined" are VALID and CORRECT if they match the expected output (correct: 90-100, partially correct: 60-80, wrong: 0-40). DO NOT penalize brevity.
+
+Output format (JSON):
+{
+  "results": [
+    {"index": <item index>, "score": <0-100>, "technical_accuracy": <0-100>, "completeness": <0-100>, "feedback": "<brief constructive feedback>"}
+  ]
+}
+Return exactly one result per item, using the item's index."""
+    
     def __init__(self):
         self.api_key = os.getenv('GROQ_API_KEY')
         self.api_base = "https://api.groq.com/openai/v1"
         # Use fastest model: llama-3.3-70b-versatile or mixtral-8x7b-32768
         self.model = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
         
+        # One long-lived HTTP session so concurrent evaluations reuse pooled connections
+        self.max_concurrency = max(int(os.getenv('EVALUATION_CONCURRENCY', 5)), 1)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.keyword_evaluator = None
+        
+        # Batched grading limits: prompt tokens per request and items per request
+        self.batch_token_budget = int(os.getenv('GROQ_BATCH_TOKEN_BUDGET', 6000))
+        self.batch_max_items = int(os.getenv('GROQ_BATCH_MAX_ITEMS', 20))
+        
+        # Grades are cached across interviews, keyed by normalized Q&A + model + rubric
+        self.rubric_version = hashlib.sha256(
+            (self.RUBRIC_VERSION + self.SYSTEM_PROMPT + self.BATCH_SYSTEM_PROMPT).encode('utf-8')
+        ).hexdigest()[:16]
+        self.cache = None
+        if os.getenv('EVALUATION_CACHE', 'true').lower() in ('1', 'true', 'yes'):
+            try:
+                self.cache = EvaluationCache()
+            except Exception as e:
+                logger.warning(f"⚠️ Evaluation cache disabled: {str(e)}")
+        
         if not self.api_key:
             logger.warning("⚠️ No GROQ_API_KEY found. Get free key at: https://console.groq.com/")
         else:
@@ -34,6 +101,10 @@ class GroqEvaluator:
         if not self.api_key:
             return self._fallback_evaluation(question, answer)
         
+        cached = self._cache_get(question, answer, expected_answer)
+        if cached is not None:
+            return cached
+        
         try:
             # Create structured evaluation prompt
             prompt = self._create_evaluation_prompt(question, answer, expected_answer)
@@ -41,7 +112,7 @@ class GroqEvaluator:
             logger.info(f"🚀 Calling GROQ API for evaluation...")
             
             # Call GROQ API with JSON mode for structured output
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_base}/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -52,15 +123,7 @@ class GroqEvaluator:
                     "messages": [
                         {
                             "role": "system",
-                            "content": """You are an expert technical interviewer. Evaluate answers accurately and provide structured feedback.
-
-Output format (JSON):
-{
-  "score": <0-100>,
-  "technical_accuracy": <0-100>,
-  "completeness": <0-100>,
-  "feedback": "<brief constructive feedback>"
-}"""
+                            "content": self.SYSTEM_PROMPT
                         },
                         {
                             "role": "user",
@@ -78,7 +141,13 @@ Output format (JSON):
                 result = response.json()
                 ai_response = result['choices'][0]['message']['content']
                 logger.info(f"✅ GROQ evaluation completed in {result.get('usage', {}).get('total_time', 0):.2f}s")
-                return self._parse_json_response(ai_response, question, answer)
+                data = self._load_grade(ai_response)
+                if data is None:
+                    # Degraded grade (text or keyword fallback): used for this answer only, never cached
+                    return self._parse_json_response(ai_response, question, answer)
+                evaluation = self._format_result(data, question, answer)
+                self._cache_set(question, answer, expected_answer, evaluation)
+                return evaluation
             else:
                 logger.error(f"❌ GROQ API error: {response.status_code}")
                 return self._fallback_evaluation(question, answer)
@@ -90,10 +159,7 @@ Output format (JSON):
     def _create_evaluation_prompt(self, question: str, answer: str, expected_answer: str = None) -> str:
         """Create evaluation prompt"""
         # Detect if this is a code output question
-        is_code_output = any(keyword in question.lower() for keyword in [
-            'output of', 'output is', 'what is output', 'what will be output',
-            'console.log', 'print', 'return value', 'what does it print'
-        ])
+        is_code_output = self._is_code_output_question(question)
         
         prompt = f"""Evaluate this technical interview answer:
 
@@ -129,35 +195,43 @@ Respond ONLY with valid JSON.
         
         return prompt
     
+    def _is_code_output_question(self, question: str) -> bool:
+        """Detect if this is a code output question"""
+        question_lower = question.lower()
+        return any(keyword in question_lower for keyword in self.CODE_OUTPUT_KEYWORDS)
+    
+    def _format_result(self, data: Dict[str, Any], question: str, answer: str) -> Dict[str, Any]:
+        """Build the evaluation result from GROQ's score fields"""
+        score = int(data.get('score', 50))
+        technical = int(data.get('technical_accuracy', score))
+        completeness = int(data.get('completeness', score))
+        feedback = data.get('feedback', 'Answer evaluated.')
+        
+        # Add emoji based on score
+        if score >= 85:
+            feedback = f"✓ {feedback}"
+        elif score >= 70:
+            feedback = f"⚠ {feedback}"
+        else:
+            feedback = f"✗ {feedback}"
+        
+        return {
+            "question": question,
+            "answer": answer[:200],
+            "score": score,
+            "max_score": 100,
+            "technical_accuracy": technical,
+            "completeness": completeness,
+            "communication": 75,  # Default
+            "feedback": feedback
+        }
+    
     def _parse_json_response(self, ai_response: str, question: str, answer: str) -> Dict[str, Any]:
         """Parse JSON response from GROQ"""
         try:
             # Parse JSON response
             data = json.loads(ai_response)
-            
-            score = int(data.get('score', 50))
-            technical = int(data.get('technical_accuracy', score))
-            completeness = int(data.get('completeness', score))
-            feedback = data.get('feedback', 'Answer evaluated.')
-            
-            # Add emoji based on score
-            if score >= 85:
-                feedback = f"✓ {feedback}"
-            elif score >= 70:
-                feedback = f"⚠ {feedback}"
-            else:
-                feedback = f"✗ {feedback}"
-            
-            return {
-                "question": question,
-                "answer": answer[:200],
-                "score": score,
-                "max_score": 100,
-                "technical_accuracy": technical,
-                "completeness": completeness,
-                "communication": 75,  # Default
-                "feedback": feedback
-            }
+            return self._format_result(data, question, answer)
             
         except json.JSONDecodeError as e:
             logger.error(f"❌ JSON parse error: {str(e)}")
@@ -167,6 +241,13 @@ Respond ONLY with valid JSON.
             logger.error(f"❌ Parse error: {str(e)}")
             return self._fallback_evaluation(question, answer)
     
+    def _load_grade(self, ai_response: str) -> Optional[Dict[str, Any]]:
+        """Validated score fields of a JSON grade, or None if the response is not one"""
+        try:
+            return self._validate_grade(json.loads(ai_response))
+        except ValueError:
+            return None
+    
     def _parse_text_fallback(self, text: str, question: str, answer: str) -> Dict[str, Any]:
         """Fallback parser if JSON fails"""
         try:
@@ -195,13 +276,217 @@ Respond ONLY with valid JSON.
         except:
             return self._fallback_evaluation(question, answer)
     
+    def _cache_get(self, question: str, answer: str, expected_answer: str = None) -> Optional[Dict[str, Any]]:
+        """Previously graded result for an identical Q&A pair, if any"""
+        if self.cache is None:
+            return None
+        key = self.cache.make_key('groq', self.model, question, answer, expected_answer)
+        cached = self.cache.get(key, self.rubric_version)
+        if cached is not None:
+            logger.info("♻️ Using cached evaluation")
+            cached['question'] = question
+            cached['answer'] = answer[:200]
+        return cached
+    
+    def _cache_set(self, question: str, answer: str, expected_answer: str, evaluation: Dict[str, Any]):
+        """Store a grade parsed from valid JSON; degraded fallback grades must not be passed here"""
+        if self.cache is not None:
+            key = self.cache.make_key('groq', self.model, question, answer, expected_answer)
+            self.cache.set(key, self.rubric_version, evaluation)
+    
     def _fallback_evaluation(self, question: str, answer: str) -> Dict[str, Any]:
         """Smart fallback evaluation"""
         from services.smart_keyword_evaluator import SmartKeywordEvaluator
         
         # Use smart keyword evaluator as fallback
-        evaluator = SmartKeywordEvaluator()
-        return evaluator.evaluate(question, answer)
+        if self.keyword_evaluator is None:
+            self.keyword_evaluator = SmartKeywordEvaluator()
+        return self.keyword_evaluator.evaluate(question, answer)
+    
+    def evaluate_batch(self, qa_pairs: List[Dict], grade_failed: bool = True) -> List[Optional[Dict[str, Any]]]:
+        """
+        Evaluate many Q&A pairs with as few GROQ requests as possible
+        
+        Pairs are packed into JSON-mode requests under a prompt token budget,
+        the requests are sent concurrently and results are mapped back by
+        index. Only items missing from the response or failing validation
+        are re-evaluated one by one.
+        
+        Args:
+            qa_pairs: [{question, answer, expected_answer (optional)}]
+            grade_failed: Re-evaluate failed items here; when False they are
+                left as None for the caller to grade (e.g. concurrently)
+            
+        Returns:
+            Evaluations in the same order as qa_pairs
+        """
+        if not qa_pairs:
+            return []
+        
+        if not self.api_key:
+            return [self._fallback_evaluation(qa.get('question', ''), qa.get('answer', '')) for qa in qa_pairs]
+        
+        results: List[Optional[Dict[str, Any]]] = [
+            self._cache_get(qa.get('question', ''), qa.get('answer', ''), qa.get('expected_answer'))
+            for qa in qa_pairs
+        ]
+        pending = [i for i, result in enumerate(results) if result is None]
+        batches = self._pack_batches(qa_pairs, pending)
+        if batches:
+            logger.info(f"🚀 Batch grading {len(pending)} answers in {len(batches)} GROQ request(s)...")
+        
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(batches), self.max_concurrency)) as executor:
+                graded_batches = list(executor.map(lambda batch: self._request_batch(qa_pairs, batch), batches))
+        else:
+            graded_batches = [self._request_batch(qa_pairs, batch) for batch in batches]
+        
+        for graded in graded_batches:
+            for index, data in graded.items():
+                qa = qa_pairs[index]
+                results[index] = self._format_result(data, qa.get('question', ''), qa.get('answer', ''))
+                self._cache_set(qa.get('question', ''), qa.get('answer', ''), qa.get('expected_answer'), results[index])
+        
+        failed = [i for i, result in enumerate(results) if result is None]
+        if failed and grade_failed:
+            logger.warning(f"⚠️ {len(failed)} answer(s) failed batch validation, evaluating individually...")
+            with ThreadPoolExecutor(max_workers=min(len(failed), self.max_concurrency)) as executor:
+                regraded = executor.map(
+                    lambda i: self.evaluate_answer(qa_pairs[i].get('question', ''), qa_pairs[i].get('answer', ''),
+                                                   qa_pairs[i].get('expected_answer')),
+                    failed
+                )
+                for i, result in zip(failed, regraded):
+                    results[i] = result
+        
+        return results
+    
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough token estimate (~4 characters per token)"""
+        return len(text or '') // 4 + 1
+    
+    def _pack_batches(self, qa_pairs: List[Dict], indices: List[int]) -> List[List[int]]:
+        """Greedily pack item indices into batches that fit the token budget"""
+        batches = []
+        current = []
+        current_tokens = self._estimate_tokens(self.BATCH_SYSTEM_PROMPT)
+        
+        for i in indices:
+            qa = qa_pairs[i]
+            item_tokens = 30 + sum(
+                self._estimate_tokens(qa.get(field) or '')
+                for field in ('question', 'answer', 'expected_answer')
+            )
+            
+            if current and (current_tokens + item_tokens > self.batch_token_budget or len(current) >= self.batch_max_items):
+                batches.append(current)
+                current = []
+                current_tokens = self._estimate_tokens(self.BATCH_SYSTEM_PROMPT)
+            
+            current.append(i)
+            current_tokens += item_tokens
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _request_batch(self, qa_pairs: List[Dict], indices: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Grade one batch in a single JSON-mode call; returns validated results by index"""
+        items = []
+        for i in indices:
+            qa = qa_pairs[i]
+            item = {
+                "index": i,
+                "question": qa.get('question', ''),
+                "answer": qa.get('answer', '')
+            }
+            if qa.get('expected_answer'):
+                item["reference_answer"] = qa['expected_answer']
+            if self._is_code_output_question(item["question"]):
+                item["code_output"] = True
+            items.append(item)
+        
+        try:
+            response = self.session.post(
+                f"{self.api_base}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": self.BATCH_SYSTEM_PROMPT},
+                        {"role": "user", "content": f"Evaluate these {len(items)} technical interview answers:\n\n{json.dumps({'items': items})}\n\nRespond ONLY with valid JSON."}
+                    ],
+                    "temperature": 0.2,  # Low temp for consistent evaluation
+                    "max_tokens": min(120 * len(items) + 100, 8000),
+                    "response_format": {"type": "json_object"}  # Force JSON output
+                },
+                timeout=30
+            )
+        except requests.RequestException as e:
+            logger.error(f"❌ GROQ batch error: {str(e)}")
+            return {}
+        
+        if response.status_code != 200:
+            logger.error(f"❌ GROQ batch API error: {response.status_code}")
+            return {}
+        
+        try:
+            content = response.json()['choices'][0]['message']['content']
+            entries = load_json_items(content, 'results')
+        except (ValueError, KeyError, IndexError) as e:
+            logger.error(f"❌ GROQ batch parse error: {str(e)}")
+            return {}
+        
+        expected = set(indices)
+        graded = {}
+        for entry in entries:
+            data = self._validate_batch_entry(entry)
+            if data is not None and data['index'] in expected and data['index'] not in graded:
+                graded[data['index']] = data
+        
+        logger.info(f"✅ GROQ batch graded {len(graded)}/{len(indices)} answers")
+        return graded
+    
+    def _validate_batch_entry(self, entry: Any) -> Optional[Dict[str, Any]]:
+        """Check one batch result against the per-item schema"""
+        if not isinstance(entry, dict):
+            return None
+        try:
+            index = int(entry['index'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        data = self._validate_grade(entry)
+        if data is None:
+            return None
+        return dict(data, index=index)
+    
+    def _validate_grade(self, entry: Any) -> Optional[Dict[str, Any]]:
+        """Check one grade against the result schema (score fields 0-100)"""
+        if not isinstance(entry, dict):
+            return None
+        try:
+            score = int(entry['score'])
+            technical = int(entry.get('technical_accuracy', score))
+            completeness = int(entry.get('completeness', score))
+        except (KeyError, TypeError, ValueError):
+            return None
+        
+        if not all(0 <= value <= 100 for value in (score, technical, completeness)):
+            return None
+        
+        feedback = entry.get('feedback')
+        if not isinstance(feedback, str) or not feedback.strip():
+            feedback = 'Answer evaluated.'
+        
+        return {
+            "score": score,
+            "technical_accuracy": technical,
+            "completeness": completeness,
+            "feedback": feedback.strip()
+        }
     
     def evaluate_multiple(self, qa_pairs: List[Dict]) -> Dict[str, Any]:
         """Batch evaluate multiple Q&A pairs"""
@@ -210,12 +495,7 @@ Respond ONLY with valid JSON.
         total_technical = 0
         total_completeness = 0
         
-        for qa in qa_pairs:
-            evaluation = self.evaluate_answer(
-                qa.get('question', ''),
-                qa.get('answer', ''),
-                qa.get('expected_answer')
-            )
+        for evaluation in self.evaluate_batch(qa_pairs):
             results.append(evaluation)
             total_score += evaluation['score']
             total_technical += evaluation['technical_accuracy']
@@ -0,0 +1,116 @@
+"""
+GROQ Key Scheduler - Share request capacity across all configured API keys
+Each key has a requests-per-minute window, a concurrency limit and a
+cooldown after 429 responses; callers lease whichever key is free first
+instead of sleeping for a fixed time between calls
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class KeyLease:
+    """A key handed out by the scheduler; report the response so rate limits are honoured"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.status_code: Optional[int] = None
+        self.retry_after: Optional[float] = None
+
+    def report(self, response):
+        self.status_code = response.status_code
+        try:
+            self.retry_after = float(response.headers.get('retry-after'))
+        except (AttributeError, TypeError, ValueError):
+            self.retry_after = None
+
+
+class GroqKeyScheduler:
+    """Thread-safe per-key rate limiting with least-loaded key selection"""
+
+    def __init__(self, api_keys: List[str], requests_per_minute: int = None, concurrency_per_key: int = None):
+        self.api_keys = list(api_keys)
+        self.requests_per_minute = requests_per_minute or int(os.getenv('GROQ_KEY_RPM', 30))
+        self.concurrency_per_key = concurrency_per_key or int(os.getenv('GROQ_KEY_CONCURRENCY', 4))
+        self.default_cooldown = float(os.getenv('GROQ_RATE_LIMIT_COOLDOWN', 10))
+
+        self._recent: Dict[str, deque] = {key: deque() for key in self.api_keys}
+        self._in_flight: Dict[str, int] = {key: 0 for key in self.api_keys}
+        self._cooldown_until: Dict[str, float] = {key: 0.0 for key in self.api_keys}
+        self._condition = threading.Condition()
+
+    @property
+    def capacity(self) -> int:
+        """Number of requests that may be in flight at once across all keys"""
+        return len(self.api_keys) * self.concurrency_per_key
+
+    def _available_at(self, key: str, now: float) -> float:
+        recent = self._recent[key]
+        while recent and recent[0] <= now - 60:
+            recent.popleft()
+        if self._in_flight[key] >= self.concurrency_per_key:
+            return float('inf')  # Freed by release(), which notifies waiters
+        available = max(now, self._cooldown_until[key])
+        if len(recent) >= self.requests_per_minute:
+            available = max(available, recent[0] + 60)
+        return available
+
+    def acquire(self, timeout: float = None) -> str:
+        """Block until a key has capacity and reserve one request on it"""
+        if not self.api_keys:
+            raise RuntimeError('No GROQ API keys configured')
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                key = min(self.api_keys, key=lambda k: (self._available_at(k, now), self._in_flight[k], len(self._recent[k])))
+                available = self._available_at(key, now)
+                if available <= now:
+                    self._in_flight[key] += 1
+                    self._recent[key].append(now)
+                    return key
+
+                wait = None if available == float('inf') else available - now
+                if deadline is not None:
+                    if now >= deadline:
+                        raise TimeoutError('Timed out waiting for a GROQ API key')
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def release(self, key: str, status_code: int = None, retry_after: float = None):
+        with self._condition:
+            self._in_flight[key] -= 1
+            if status_code == 429:
+                cooldown = retry_after if retry_after is not None else self.default_cooldown
+                self._cooldown_until[key] = max(self._cooldown_until[key], time.monotonic() + cooldown)
+                logger.warning(f"⚠️ Key {self.api_keys.index(key) + 1} rate limited, cooling down for {cooldown:.0f}s")
+            self._condition.notify_all()
+
+    @contextmanager
+    def lease(self, timeout: float = None) -> Iterator[KeyLease]:
+        """`with scheduler.lease() as lease:` use lease.key, then lease.report(response)"""
+        lease = KeyLease(self.acquire(timeout))
+        try:
+            yield lease
+        finally:
+            self.release(lease.key, lease.status_code, lease.retry_after)
+
+    def map(self, fn: Callable[[T], R], items: List[T]) -> List[R]:
+        """Run `fn` over `items` concurrently (up to the scheduler's capacity); results keep input order"""
+        if not items:
+            return []
+        workers = max(1, min(len(items), self.capacity))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='groq-batch') as executor:
+            return list(executor.map(fn, items))
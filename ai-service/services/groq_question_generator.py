@@ -5,18 +5,29 @@ Get free API key: https://console.groq.com/
 """
 
 import os
+import re
 import json
 import requests
 import logging
+import threading
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set
 from supabase import create_client, Client
+from services.decoding_profiles import budget_for_items
+from services.groq_key_scheduler import GroqKeyScheduler
+from services.near_duplicate_index import NearDuplicateIndex
+from services.question_bank_snapshot import DIFFICULTIES, QuestionBankSnapshot
+from services.template_usage_store import TemplateUsageStore
+from services.json_stream_parser import IncrementalJSONParser, load_json_items, load_json_object, strip_code_fences
 
 logger = logging.getLogger(__name__)
 
 class GroqQuestionGenerator:
     """Ultra-fast question generation using GROQ API"""
     
+    # Output tokens per generated MCQ (question, 4 options, answer, brief explanation)
+    APTITUDE_TOKENS_PER_QUESTION = 170
+    
     def __init__(self):
         # Load multiple API keys for rotation
         self.api_keys = []
@@ -37,6 +48,10 @@ class GroqQuestionGenerator:
         
         self.current_key_index = 0
         self.api_base = "https://api.groq.com/openai/v1"
+        # Batches are fanned out across all keys within their rate limits
+        self.key_scheduler = GroqKeyScheduler(self.api_keys)
+        self.aptitude_batch_questions = int(os.getenv('GROQ_APTITUDE_BATCH_QUESTIONS', 15))
+        self.aptitude_batch_rounds = int(os.getenv('GROQ_APTITUDE_BATCH_ROUNDS', 3))
         # Use fastest model for question generation
         self.model = os.getenv('GROQ_MODEL', 'llama-3.1-70b-versatile')
         
@@ -51,10 +66,14 @@ class GroqQuestionGenerator:
             except Exception as e:
                 logger.warning(f"⚠️ Failed to initialize Supabase client: {str(e)}")
         
-        # Global template tracking to prevent repetition
-        self.used_reading_templates = set()
-        self.used_listening_templates = set()
-        self.used_grammar_templates = set()
+        # Template tracking to prevent repetition, shared by all worker processes
+        self.template_usage = TemplateUsageStore()
+        
+        # Aptitude bank questions carry their near-duplicate signatures in the database;
+        # rows the bank summary reports without them are signed in the background
+        self.signature_backfill_batch = int(os.getenv('APTITUDE_SIGNATURE_BACKFILL_BATCH', 500))
+        self._backfill_lock = threading.Lock()
+        self._backfill_running = False
         
         if self.api_keys:
             logger.info(f"✅ GROQ Question Generator initialized with {len(self.api_keys)} API keys (Model: {self.model})")
@@ -67,20 +86,14 @@ class GroqQuestionGenerator:
             return None
         return self.api_keys[self.current_key_index]
     
-    def reset_template_tracking(self):
-        """Reset template tracking when all templates are exhausted"""
-        self.used_reading_templates.clear()
-        self.used_listening_templates.clear()
-        self.used_grammar_templates.clear()
+    def reset_template_tracking(self, scope: str = None):
+        """Reset template tracking for one job scope (or all of them)"""
+        self.template_usage.reset(scope)
         logger.info("🔄 Template tracking reset - all templates available again")
     
-    def get_template_usage_stats(self):
+    def get_template_usage_stats(self, scope: str = None):
         """Get current template usage statistics"""
-        return {
-            'reading_used': len(self.used_reading_templates),
-            'listening_used': len(self.used_listening_templates),
-            'grammar_used': len(self.used_grammar_templates)
-        }
+        return {f'{kind}_used': used for kind, used in self.template_usage.stats(scope).items()}
     
     def rotate_api_key(self):
         """Rotate to the next API key"""
@@ -94,43 +107,114 @@ class GroqQuestionGenerator:
         logger.info(f"🔄 Rotated API key from index {old_index} to {self.current_key_index}")
         return True
 
-    def _check_existing_questions(self, topic_configs: List[Dict]) -> Dict[str, Dict[str, int]]:
-        """Check existing questions in database and return counts by topic and difficulty"""
+    def _iter_streamed_items(self, response, items_key: str = None):
+        """Yield JSON array items from a streamed (SSE) chat completion as soon as each one closes"""
+        parser = IncrementalJSONParser(items_key)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta:
+                    for item in parser.feed(delta):
+                        yield item
+                if parser.is_complete:
+                    break
+        finally:
+            response.close()
+        
+        if not parser.is_complete:
+            logger.warning(f"⚠️ Streamed response ended before the JSON array closed - kept {len(parser.items)} complete items")
+
+    def _check_existing_questions(self, topic_configs: List[Dict]) -> QuestionBankSnapshot:
+        """
+        Summarize existing questions for all requested topics in one RPC
+        
+        Returns a per-request snapshot with counts by topic and difficulty and
+        a few sample questions; generated questions are checked for duplicates
+        against the signatures stored in the bank.
+        """
         if not self.supabase:
             logger.warning("⚠️ No database connection - cannot check existing questions")
-            return {}
+            return QuestionBankSnapshot(tc['topic'] for tc in topic_configs)
         
+        snapshot = QuestionBankSnapshot((tc['topic'] for tc in topic_configs), self._find_bank_duplicates)
+        topics = list(snapshot.counts)
         try:
-            existing_counts = {}
-            self.existing_questions_content = {}  # Store existing question content for duplicate checking
-            
-            for topic_config in topic_configs:
-                topic = topic_config['topic']
-                existing_counts[topic] = {'easy': 0, 'medium': 0, 'hard': 0}
-                self.existing_questions_content[topic] = []
-                
-                # Query existing questions for this topic (get full content for duplicate checking)
-                response = self.supabase.table('aptitude_questions').select('difficulty, question_text').eq('topic', topic).execute()
-                
-                if response.data:
-                    # Count questions by difficulty and store content
-                    for question in response.data:
-                        difficulty = question.get('difficulty', 'medium')
-                        if difficulty in existing_counts[topic]:
-                            existing_counts[topic][difficulty] += 1
-                        
-                        # Store question text for duplicate checking
-                        question_text = question.get('question_text', '').lower().strip()
-                        if question_text:
-                            self.existing_questions_content[topic].append(question_text)
-                
-                logger.info(f"📊 Existing {topic}: {existing_counts[topic]} (content stored for duplicate check)")
-            
-            return existing_counts
+            response = self.supabase.rpc('aptitude_question_bank_summary', {
+                'p_topics': topics,
+                'p_samples': QuestionBankSnapshot.SAMPLES_PER_TOPIC,
+                'p_sample_length': QuestionBankSnapshot.SAMPLE_LENGTH
+            }).execute()
+            unsigned = 0
+            for row in response.data or []:
+                snapshot.add_summary(row.get('topic'), row.get('difficulty'), row.get('question_count') or 0, row.get('samples'))
+                unsigned += row.get('unsigned_count') or 0
+            if unsigned:
+                self._start_signature_backfill()
+            
+            for topic in topics:
+                logger.info(f"📊 Existing {topic}: {snapshot.counts[topic]}")
+            return snapshot
             
         except Exception as e:
             logger.error(f"❌ Error checking existing questions: {str(e)}")
-            return {}
+            return QuestionBankSnapshot(topics, self._find_bank_duplicates)
+
+    def _find_bank_duplicates(self, candidates: List[Dict], threshold: float) -> Set[int]:
+        """Keys of candidate questions that repeat or nearly repeat a stored aptitude question (one RPC)"""
+        try:
+            response = self.supabase.rpc('find_aptitude_near_duplicates', {
+                'p_candidates': candidates,
+                'p_threshold': threshold
+            }).execute()
+            return {row['candidate'] for row in response.data or []}
+        except Exception as e:
+            logger.warning(f"⚠️ Near-duplicate lookup failed, keeping {len(candidates)} questions unchecked: {str(e)}")
+            return set()
+
+    def _start_signature_backfill(self):
+        """Sign stored questions that have no near-duplicate signature yet, in the background"""
+        with self._backfill_lock:
+            if self._backfill_running:
+                return
+            self._backfill_running = True
+        threading.Thread(target=self._backfill_signatures, name='aptitude-signature-backfill', daemon=True).start()
+
+    def _backfill_signatures(self):
+        signer = QuestionBankSnapshot(())
+        signed = 0
+        try:
+            while True:
+                response = self.supabase.table('aptitude_questions') \
+                    .select('id, question_text') \
+                    .is_('minhash', 'null') \
+                    .limit(self.signature_backfill_batch) \
+                    .execute()
+                rows = response.data or []
+                if not rows:
+                    break
+                updated = self.supabase.rpc('set_aptitude_question_signatures', {
+                    'p_rows': [{'id': row['id'], **signer.signature_fields(row.get('question_text', ''))} for row in rows]
+                }).execute().data
+                if not updated:
+                    break
+                signed += updated
+                if len(rows) < self.signature_backfill_batch:
+                    break
+            if signed:
+                logger.info(f"✅ Backfilled near-duplicate signatures for {signed} aptitude questions")
+        except Exception as e:
+            logger.warning(f"⚠️ Aptitude signature backfill stopped: {str(e)}")
+        finally:
+            with self._backfill_lock:
+                self._backfill_running = False
 
     def _calculate_missing_questions(self, topic_configs: List[Dict], existing_counts: Dict[str, Dict[str, int]]) -> List[Dict]:
         """Calculate only the missing questions needed to reach target"""
@@ -175,61 +259,62 @@ class GroqQuestionGenerator:
                 for topic_config in topic_questions.values():
                     target_total += topic_config.get('easy', 0) + topic_config.get('medium', 0) + topic_config.get('hard', 0)
             
-            # Check existing questions if application_id provided
-            existing_count = 0
+            # Check existing questions if application_id provided (also used for deduplication)
+            existing_questions = []
             if application_id:
                 try:
                     backend_url = "http://localhost:3000"
                     response = requests.get(f"{backend_url}/api/applications/{application_id}/questions", 
-                                          params={'type': 'communication'})
+                                          params={'type': 'communication'}, timeout=10)
                     if response.status_code == 200:
                         existing_questions = response.json().get('questions', [])
-                        existing_count = len(existing_questions)
-                        logger.info(f"📊 Found {existing_count} existing communication questions")
+                        logger.info(f"📊 Found {len(existing_questions)} existing communication questions")
                     else:
                         logger.warning(f"⚠️ Could not fetch existing questions: HTTP {response.status_code}")
                 except Exception as e:
                     logger.warning(f"⚠️ Could not check existing questions: {str(e)}")
+            existing_count = len(existing_questions)
             
-            # Generate one batch (try reading first, then listening, then grammar)
-            all_questions = []
-            batch_size = min(10, target_total - existing_count)  # Generate up to 10 questions per batch
-            
-            # Get existing questions to avoid duplicates
-            existing_questions = []
-            if application_id:
-                try:
-                    backend_url = "http://localhost:3000"
-                    response = requests.get(f"{backend_url}/api/applications/{application_id}/questions", 
-                                          params={'type': 'communication'})
-                    if response.status_code == 200:
-                        existing_questions = response.json().get('questions', [])
-                        logger.info(f"📋 Found {len(existing_questions)} existing questions for deduplication")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not fetch existing questions for deduplication: {str(e)}")
+            # Template fallbacks rotate per application (or per job title)
+            scope = application_id or job_title
             
-            # Try reading questions first
-            if 'reading' in skills and len(all_questions) < batch_size:
-                reading_questions = self._generate_small_reading_batch(reading_config, job_title, batch_size, existing_questions + all_questions)
-                all_questions.extend(reading_questions)
-                if reading_questions:  # Add delay if questions were generated
-                    import time
-                    time.sleep(2)  # 2 second delay between API calls
+            # Generate one batch (reading first, then listening, then grammar)
+            batch_size = min(10, target_total - existing_count)  # Generate up to 10 questions per batch
+            generators = [
+                (skill, generator, config, per_call)
+                for skill, generator, config, per_call in (
+                    ('reading', self._generate_small_reading_batch, reading_config, 3),
+                    ('listening', self._generate_small_listening_batch, listening_config, 3),
+                    ('grammar', self._generate_small_grammar_batch, grammar_config, 5),
+                )
+                if skill in skills
+            ]
             
-            # Then listening if we still need more
-            if 'listening' in skills and len(all_questions) < batch_size:
-                remaining = batch_size - len(all_questions)
-                listening_questions = self._generate_small_listening_batch(listening_config, job_title, remaining, existing_questions + all_questions)
-                all_questions.extend(listening_questions)
-                if listening_questions:  # Add delay if questions were generated
-                    import time
-                    time.sleep(2)  # 2 second delay between API calls
+            # Each skill only deduplicates against its own questions, so the skills
+            # are generated concurrently; the key scheduler paces the API calls
+            shares = []
+            remaining = batch_size
+            for skill, generator, config, per_call in generators:
+                share = max(0, min(per_call, remaining))
+                shares.append(share)
+                remaining -= share
+            
+            calls = [
+                (generator, config, share)
+                for (skill, generator, config, per_call), share in zip(generators, shares) if share > 0
+            ]
+            batches = self.key_scheduler.map(
+                lambda call: call[0](call[1], job_title, call[2], existing_questions, scope),
+                calls
+            )
+            all_questions = [question for batch in batches for question in batch]
             
-            # Finally grammar if we still need more
-            if 'grammar' in skills and len(all_questions) < batch_size:
-                remaining = batch_size - len(all_questions)
-                grammar_questions = self._generate_small_grammar_batch(grammar_config, job_title, remaining, existing_questions + all_questions)
-                all_questions.extend(grammar_questions)
+            # Top up in skill order if a skill came back short
+            for skill, generator, config, per_call in generators:
+                if len(all_questions) >= batch_size:
+                    break
+                more = generator(config, job_title, batch_size - len(all_questions), existing_questions + all_questions, scope)
+                all_questions.extend(more)
             
             # Calculate progress
             new_total = existing_count + len(all_questions)
@@ -381,7 +466,7 @@ Return ONLY a JSON array of passages like this:
                         content = result['choices'][0]['message']['content'].strip()
                         
                         # Parse the JSON array of passages
-                        passages = json.loads(content)
+                        passages = load_json_items(content)
                         
                         # Validate exact count - trim if too many, warn if too few
                         if len(passages) > count:
@@ -482,7 +567,7 @@ Generate exactly {total_questions} passages total."""
                 content = result['choices'][0]['message']['content'].strip()
                 
                 # Parse the JSON array of passages
-                passages_data = json.loads(content)
+                passages_data = load_json_items(content)
                 
                 questions = []
                 for passage_data in passages_data:
@@ -647,7 +732,7 @@ Return ONLY a JSON array of sentences like this:
                         content = result['choices'][0]['message']['content'].strip()
                         
                         # Parse the JSON array of sentences
-                        sentences = json.loads(content)
+                        sentences = load_json_items(content)
                         
                         # Validate exact count - trim if too many, warn if too few
                         if len(sentences) > count:
@@ -750,7 +835,7 @@ Generate exactly {total_questions} sentences total."""
                 content = result['choices'][0]['message']['content'].strip()
                 
                 # Parse the JSON array of sentences
-                sentences_data = json.loads(content)
+                sentences_data = load_json_items(content)
                 
                 questions = []
                 for sentence_data in sentences_data:
@@ -966,7 +1051,7 @@ Return ONLY a JSON array of questions like this:
                             content = result['choices'][0]['message']['content'].strip()
                             
                             # Parse the JSON array of questions
-                            ai_questions = json.loads(content)
+                            ai_questions = load_json_items(content)
                             
                             # Validate exact count - trim if too many, warn if too few
                             if len(ai_questions) > count:
@@ -1101,7 +1186,7 @@ Generate exactly {total_questions} questions total covering all specified topics
                 content = result['choices'][0]['message']['content'].strip()
                 
                 # Parse the JSON array of questions
-                questions_data = json.loads(content)
+                questions_data = load_json_items(content)
                 
                 questions = []
                 for q_data in questions_data:
@@ -1339,9 +1424,39 @@ Generate exactly {total_questions} questions total covering all specified topics
         logger.info(f"✅ Generated {len(questions)} grammar questions using templates")
         return questions
 
-    def _generate_small_reading_batch(self, reading_config: Dict, job_title: str, max_questions: int, existing_questions: List[Dict] = None) -> List[Dict]:
-        """Generate a small batch of reading questions with AI + template fallback"""
+    @staticmethod
+    def _communication_text(question: Dict) -> str:
+        """Text compared when checking communication questions for near-duplicates"""
+        skill = question.get('skill')
+        if skill == 'reading':
+            return question.get('passage') or ''
+        if skill == 'listening':
+            return question.get('audio_text') or ''
+        # Grammar stems repeat ("Choose the correct article..."), so compare the options too
+        options = question.get('options') or {}
+        option_texts = options.values() if isinstance(options, dict) else options
+        return ' '.join([question.get('content') or ''] + [str(option) for option in option_texts])
+
+    def _existing_question_index(self, existing_questions: List[Dict], skill: str) -> NearDuplicateIndex:
+        """Near-duplicate index over the existing questions of one skill"""
+        index = NearDuplicateIndex()
+        for question in existing_questions or []:
+            if question.get('skill') == skill:
+                index.add(self._communication_text(question))
+        return index
+
+    def _drop_near_duplicates(self, questions: List[Dict], seen: NearDuplicateIndex) -> List[Dict]:
+        """Keep generated questions that do not nearly repeat an existing or earlier one"""
+        unique = [question for question in questions if seen.add_if_new(self._communication_text(question))]
+        if len(unique) < len(questions):
+            logger.info(f"♻️ Dropped {len(questions) - len(unique)} near-duplicate generated questions")
+        return unique
+
+    def _generate_small_reading_batch(self, reading_config: Dict, job_title: str, max_questions: int, existing_questions: List[Dict] = None,
+                                   scope: str = None) -> List[Dict]:
+        """Generate a small batch of reading questions with AI + template fallback (template usage is tracked per `scope`, default the job title)"""
         questions_to_generate = min(max_questions, 3)  # Max 3 reading questions per batch
+        seen = self._existing_question_index(existing_questions, 'reading')
         
         # Try AI first if we have API keys
         if self.api_keys:
@@ -1363,28 +1478,30 @@ Return ONLY a JSON array of passages like this:
 ]"""
 
             try:
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.get_current_api_key()}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are an expert assessment creator. Generate unique reading passages in valid JSON format only."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.8,
-                        "max_tokens": 1000
-                    },
-                    timeout=30
-                )
+                with self.key_scheduler.lease() as lease:
+                    response = requests.post(
+                        f"{self.api_base}/chat/completions",
+                        headers={
+                            "Authorization": f"Bearer {lease.key}",
+                            "Content-Type": "application/json"
+                        },
+                        json={
+                            "model": self.model,
+                            "messages": [
+                                {"role": "system", "content": "You are an expert assessment creator. Generate unique reading passages in valid JSON format only."},
+                                {"role": "user", "content": prompt}
+                            ],
+                            "temperature": 0.8,
+                            "max_tokens": budget_for_items(questions_to_generate, 150, overhead=50)
+                        },
+                        timeout=30
+                    )
+                    lease.report(response)
                 
                 if response.status_code == 200:
                     result = response.json()
                     content = result['choices'][0]['message']['content'].strip()
-                    passages = json.loads(content)
+                    passages = load_json_items(content)
                     
                     questions = []
                     for i, passage in enumerate(passages[:questions_to_generate]):
@@ -1400,8 +1517,10 @@ Return ONLY a JSON array of passages like this:
                             'instructions': 'Read the paragraph aloud at a natural pace.'
                         })
                     
-                    logger.info(f"✅ AI generated {len(questions)} reading passages")
-                    return questions
+                    questions = self._drop_near_duplicates(questions, seen)
+                    if questions:
+                        logger.info(f"✅ AI generated {len(questions)} reading passages")
+                        return questions
                     
             except Exception as e:
                 logger.warning(f"⚠️ AI generation failed: {str(e)}")
@@ -1409,14 +1528,6 @@ Return ONLY a JSON array of passages like this:
         # Fallback to templates when AI fails or rate limited
         logger.info(f"📝 Using template fallback for {questions_to_generate} reading passages...")
         
-        # Get existing passages to avoid duplicates
-        existing_passages = set()
-        if existing_questions:
-            for q in existing_questions:
-                if q.get('skill') == 'reading' and q.get('passage'):
-                    # Use first 50 characters as unique identifier
-                    existing_passages.add(q['passage'][:50])
-        
         reading_templates = [
             f"Software development is a collaborative process that requires clear communication between team members. In {job_title} roles, professionals must effectively convey technical concepts to both technical and non-technical stakeholders. This includes writing clear documentation, participating in code reviews, and explaining complex algorithms in simple terms. Strong communication skills are essential for project success and team coordination.",
             
@@ -1440,16 +1551,18 @@ Return ONLY a JSON array of passages like this:
         ]
         
         questions = []
-        template_index = 0
         generated_count = 0
         skipped_count = 0
         
-        while generated_count < questions_to_generate and template_index < len(reading_templates):
-            passage = reading_templates[template_index]
-            passage_key = passage[:50]
+        # Claim templates from the shared usage store; a full pass over the set
+        # without a usable passage falls through to dynamic variations
+        for _ in range(len(reading_templates)):
+            if generated_count >= questions_to_generate:
+                break
+            passage = reading_templates[self.template_usage.claim_next('reading', len(reading_templates), scope or job_title)]
             
-            # Skip if this passage already exists OR was used globally
-            if passage_key not in existing_passages and template_index not in self.used_reading_templates:
+            # Skip if this passage nearly repeats an existing one
+            if seen.add_if_new(passage):
                 questions.append({
                     'title': f'Reading Assessment - Template {generated_count + 1}',
                     'content': 'Please read the following passage aloud clearly and naturally.',
@@ -1461,42 +1574,9 @@ Return ONLY a JSON array of passages like this:
                     'evaluation_criteria': ['pronunciation', 'fluency', 'pace', 'clarity'],
                     'instructions': 'Read the paragraph aloud at a natural pace.'
                 })
-                existing_passages.add(passage_key)  # Add to prevent duplicates in this batch
-                self.used_reading_templates.add(template_index)  # Mark template as used globally
                 generated_count += 1
             else:
                 skipped_count += 1
-            
-            template_index += 1
-        
-        # If we couldn't generate enough questions and all templates are used, reset and try again
-        if generated_count < questions_to_generate and len(self.used_reading_templates) >= len(reading_templates):
-            logger.warning(f"⚠️ All reading templates exhausted, resetting to generate remaining {questions_to_generate - generated_count} questions")
-            self.used_reading_templates.clear()
-            
-            # Continue generating from unused templates
-            while generated_count < questions_to_generate and template_index < len(reading_templates) * 2:  # Allow second pass
-                actual_index = template_index % len(reading_templates)
-                passage = reading_templates[actual_index]
-                passage_key = passage[:50]
-                
-                if passage_key not in existing_passages and actual_index not in self.used_reading_templates:
-                    questions.append({
-                        'title': f'Reading Assessment - Template {generated_count + 1}',
-                        'content': 'Please read the following passage aloud clearly and naturally.',
-                        'passage': passage,
-                        'skill': 'reading',
-                        'type': 'reading_aloud',
-                        'difficulty': 'medium',
-                        'time_limit': 180,
-                        'evaluation_criteria': ['pronunciation', 'fluency', 'pace', 'clarity'],
-                        'instructions': 'Read the paragraph aloud at a natural pace.'
-                    })
-                    existing_passages.add(passage_key)
-                    self.used_reading_templates.add(actual_index)
-                    generated_count += 1
-                
-                template_index += 1
         
         # FINAL FALLBACK: If still not enough questions, generate dynamic variations
         if generated_count < questions_to_generate:
@@ -1529,9 +1609,11 @@ Return ONLY a JSON array of passages like this:
         logger.info(f"✅ Generated {len(questions)} unique reading passages using templates (skipped {skipped_count} duplicates/used templates)")
         return questions
 
-    def _generate_small_listening_batch(self, listening_config: Dict, job_title: str, max_questions: int, existing_questions: List[Dict] = None) -> List[Dict]:
-        """Generate a small batch of listening questions with AI + template fallback"""
+    def _generate_small_listening_batch(self, listening_config: Dict, job_title: str, max_questions: int, existing_questions: List[Dict] = None,
+                                   scope: str = None) -> List[Dict]:
+        """Generate a small batch of listening questions with AI + template fallback (template usage is tracked per `scope`, default the job title)"""
         questions_to_generate = min(max_questions, 3)  # Max 3 listening questions per batch
+        seen = self._existing_question_index(existing_questions, 'listening')
         
         # Try AI first if we have API keys
         if self.api_keys:
@@ -1553,28 +1635,30 @@ Return ONLY a JSON array of sentences like this:
 ]"""
 
             try:
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.get_current_api_key()}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are an expert assessment creator. Generate unique listening sentences in valid JSON format only."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.8,
-                        "max_tokens": 500
-                    },
-                    timeout=30
-                )
+                with self.key_scheduler.lease() as lease:
+                    response = requests.post(
+                        f"{self.api_base}/chat/completions",
+                        headers={
+                            "Authorization": f"Bearer {lease.key}",
+                            "Content-Type": "application/json"
+                        },
+                        json={
+                            "model": self.model,
+                            "messages": [
+                                {"role": "system", "content": "You are an expert assessment creator. Generate unique listening sentences in valid JSON format only."},
+                                {"role": "user", "content": prompt}
+                            ],
+                            "temperature": 0.8,
+                            "max_tokens": budget_for_items(questions_to_generate, 40, overhead=50)
+                        },
+                        timeout=30
+                    )
+                    lease.report(response)
                 
                 if response.status_code == 200:
                     result = response.json()
                     content = result['choices'][0]['message']['content'].strip()
-                    sentences = json.loads(content)
+                    sentences = load_json_items(content)
                     
                     questions = []
                     for i, sentence in enumerate(sentences[:questions_to_generate]):
@@ -1591,8 +1675,10 @@ Return ONLY a JSON array of sentences like this:
                             'instructions': 'Listen carefully, then repeat exactly as you heard it.'
                         })
                     
-                    logger.info(f"✅ AI generated {len(questions)} listening sentences")
-                    return questions
+                    questions = self._drop_near_duplicates(questions, seen)
+                    if questions:
+                        logger.info(f"✅ AI generated {len(questions)} listening sentences")
+                        return questions
                     
             except Exception as e:
                 logger.warning(f"⚠️ AI generation failed: {str(e)}")
@@ -1600,13 +1686,6 @@ Return ONLY a JSON array of sentences like this:
         # Fallback to templates when AI fails or rate limited
         logger.info(f"📝 Using template fallback for {questions_to_generate} listening sentences...")
         
-        # Get existing sentences to avoid duplicates
-        existing_sentences = set()
-        if existing_questions:
-            for q in existing_questions:
-                if q.get('skill') == 'listening' and q.get('audio_text'):
-                    existing_sentences.add(q['audio_text'])
-        
         listening_templates = [
             f"Effective {job_title} professionals collaborate closely with cross-functional teams to deliver high-quality software solutions.",
             f"Modern {job_title} roles require continuous learning and adaptation to emerging technologies and industry best practices.",
@@ -1623,15 +1702,16 @@ Return ONLY a JSON array of sentences like this:
         ]
         
         questions = []
-        template_index = 0
         generated_count = 0
         skipped_count = 0
         
-        while generated_count < questions_to_generate and template_index < len(listening_templates):
-            sentence = listening_templates[template_index]
+        for _ in range(len(listening_templates)):
+            if generated_count >= questions_to_generate:
+                break
+            sentence = listening_templates[self.template_usage.claim_next('listening', len(listening_templates), scope or job_title)]
             
-            # Skip if this sentence already exists OR was used globally
-            if sentence not in existing_sentences and template_index not in self.used_listening_templates:
+            # Skip if this sentence nearly repeats an existing one
+            if seen.add_if_new(sentence):
                 questions.append({
                     'title': f'Sentence Repetition - Template {generated_count + 1}',
                     'content': 'Listen to the sentence and repeat it exactly as you heard it.',
@@ -1644,13 +1724,9 @@ Return ONLY a JSON array of sentences like this:
                     'evaluation_criteria': ['accuracy', 'pronunciation', 'fluency'],
                     'instructions': 'Listen carefully, then repeat exactly as you heard it.'
                 })
-                existing_sentences.add(sentence)  # Add to prevent duplicates in this batch
-                self.used_listening_templates.add(template_index)  # Mark template as used globally
                 generated_count += 1
             else:
                 skipped_count += 1
-            
-            template_index += 1
         
         # FINAL FALLBACK: If still not enough questions, generate dynamic variations
         if generated_count < questions_to_generate:
@@ -1684,9 +1760,11 @@ Return ONLY a JSON array of sentences like this:
         logger.info(f"✅ Generated {len(questions)} unique listening sentences using templates (skipped {skipped_count} duplicates/used templates)")
         return questions
 
-    def _generate_small_grammar_batch(self, grammar_config: Dict, job_title: str, max_questions: int, existing_questions: List[Dict] = None) -> List[Dict]:
-        """Generate a small batch of grammar questions with AI + template fallback"""
+    def _generate_small_grammar_batch(self, grammar_config: Dict, job_title: str, max_questions: int, existing_questions: List[Dict] = None,
+                                   scope: str = None) -> List[Dict]:
+        """Generate a small batch of grammar questions with AI + template fallback (template usage is tracked per `scope`, default the job title)"""
         questions_to_generate = min(max_questions, 5)  # Max 5 grammar questions per batch
+        seen = self._existing_question_index(existing_questions, 'grammar')
         
         # Try AI first if we have API keys
         if self.api_keys:
@@ -1715,28 +1793,30 @@ Return ONLY a JSON array like this:
 ]"""
 
             try:
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.get_current_api_key()}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are an expert grammar assessment creator. Generate unique grammar questions in valid JSON format only."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 1500
-                    },
-                    timeout=30
-                )
+                with self.key_scheduler.lease() as lease:
+                    response = requests.post(
+                        f"{self.api_base}/chat/completions",
+                        headers={
+                            "Authorization": f"Bearer {lease.key}",
+                            "Content-Type": "application/json"
+                        },
+                        json={
+                            "model": self.model,
+                            "messages": [
+                                {"role": "system", "content": "You are an expert grammar assessment creator. Generate unique grammar questions in valid JSON format only."},
+                                {"role": "user", "content": prompt}
+                            ],
+                            "temperature": 0.7,
+                            "max_tokens": budget_for_items(questions_to_generate, 120, overhead=50)
+                        },
+                        timeout=30
+                    )
+                    lease.report(response)
                 
                 if response.status_code == 200:
                     result = response.json()
                     content = result['choices'][0]['message']['content'].strip()
-                    questions_data = json.loads(content)
+                    questions_data = load_json_items(content)
                     
                     questions = []
                     for i, q_data in enumerate(questions_data[:questions_to_generate]):
@@ -1754,8 +1834,10 @@ Return ONLY a JSON array like this:
                             'instructions': 'Select the most grammatically correct option.'
                         })
                     
-                    logger.info(f"✅ AI generated {len(questions)} grammar questions")
-                    return questions
+                    questions = self._drop_near_duplicates(questions, seen)
+                    if questions:
+                        logger.info(f"✅ AI generated {len(questions)} grammar questions")
+                        return questions
                     
             except Exception as e:
                 logger.warning(f"⚠️ AI generation failed: {str(e)}")
@@ -1763,13 +1845,6 @@ Return ONLY a JSON array like this:
         # Fallback to templates when AI fails or rate limited
         logger.info(f"📝 Using template fallback for {questions_to_generate} grammar questions...")
         
-        # Get existing questions to avoid duplicates
-        existing_question_texts = set()
-        if existing_questions:
-            for q in existing_questions:
-                if q.get('skill') == 'grammar' and q.get('content'):
-                    existing_question_texts.add(q['content'])
-        
         grammar_templates = [
             {
                 "question": "Which sentence uses the correct present perfect tense?",
@@ -1854,16 +1929,17 @@ Return ONLY a JSON array like this:
         ]
         
         questions = []
-        template_index = 0
         generated_count = 0
         skipped_count = 0
         
-        while generated_count < questions_to_generate and template_index < len(grammar_templates):
-            template = grammar_templates[template_index]
+        for _ in range(len(grammar_templates)):
+            if generated_count >= questions_to_generate:
+                break
+            template = grammar_templates[self.template_usage.claim_next('grammar', len(grammar_templates), scope or job_title)]
             question_text = template['question']
             
-            # Skip if this question already exists OR was used globally
-            if question_text not in existing_question_texts and template_index not in self.used_grammar_templates:
+            # Skip if this question nearly repeats an existing one
+            if seen.add_if_new(self._communication_text({'skill': 'grammar', 'content': question_text, 'options': template['options']})):
                 questions.append({
                     'title': f'Grammar Assessment - Template {generated_count + 1}',
                     'content': question_text,
@@ -1877,13 +1953,9 @@ Return ONLY a JSON array like this:
                     'evaluation_criteria': ['grammatical_accuracy', 'language_knowledge'],
                     'instructions': 'Select the most grammatically correct option.'
                 })
-                existing_question_texts.add(question_text)  # Add to prevent duplicates in this batch
-                self.used_grammar_templates.add(template_index)  # Mark template as used globally
                 generated_count += 1
             else:
                 skipped_count += 1
-            
-            template_index += 1
         
         # FINAL FALLBACK: If still not enough questions, generate dynamic variations
         if generated_count < questions_to_generate:
@@ -2079,10 +2151,10 @@ Return ONLY a JSON array like this:
 
         # Step 1: Check existing questions in database
         logger.info("🔍 Checking existing questions in database...")
-        existing_counts = self._check_existing_questions(topic_configs)
+        existing = self._check_existing_questions(topic_configs)
         
         # Step 2: Calculate only missing questions needed
-        missing_configs = self._calculate_missing_questions(topic_configs, existing_counts)
+        missing_configs = self._calculate_missing_questions(topic_configs, existing.counts)
         
         if not missing_configs:
             logger.info("✅ All required questions already exist in database!")
@@ -2099,7 +2171,7 @@ Return ONLY a JSON array like this:
         # Step 3: Generate only missing questions
         if missing_total > 30:
             logger.info(f"⚠️ {missing_total} missing questions is large, splitting into smaller batches...")
-            return self._generate_aptitude_in_batches(missing_configs, time_per_question, job_title)
+            return self._generate_aptitude_in_batches(missing_configs, time_per_question, job_title, existing)
         
         # Use missing_configs instead of original topic_configs
         topic_configs = missing_configs
@@ -2119,21 +2191,7 @@ Return ONLY a JSON array like this:
 
         # Create optimized prompt for single API call
         # Build existing questions context for duplicate prevention
-        existing_context = ""
-        if hasattr(self, 'existing_questions_content') and self.existing_questions_content:
-            existing_samples = []
-            for topic, questions in self.existing_questions_content.items():
-                if questions:
-                    # Show a few examples of existing questions to avoid duplicates
-                    sample_questions = questions[:3]  # First 3 questions as examples
-                    existing_samples.append(f"{topic.upper()}: {', '.join(sample_questions[:100] + '...' if len(sample_questions) > 100 else sample_questions for sample_questions in sample_questions)}")
-            
-            if existing_samples:
-                existing_context = f"""
-EXISTING QUESTIONS TO AVOID DUPLICATING:
-{chr(10).join(existing_samples)}
-
-DUPLICATE PREVENTION: Ensure your questions are completely different from the above existing questions. Use different scenarios, numbers, concepts, and wording."""
+        existing_context = existing.prompt_context()
 
         prompt = f"""Generate exactly {total_questions} multiple choice aptitude questions for a {job_title} position.
 
@@ -2169,56 +2227,43 @@ Generate exactly {total_questions} questions following the topic and difficulty
         try:
             logger.info(f"🚀 Making single API call for all {total_questions} questions...")
             
-            # API key rotation with retry logic
-            max_key_attempts = len(self.api_keys)
-            max_retries_per_key = 2
-            
-            for key_attempt in range(max_key_attempts):
-                current_api_key = self.get_current_api_key()
-                logger.info(f"🔑 Using API key {self.current_key_index + 1}/{len(self.api_keys)}")
-                
-                for retry in range(max_retries_per_key):
-                    response = requests.post(
-                        "https://api.groq.com/openai/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {current_api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": self.model,
-                            "messages": [
-                                {"role": "system", "content": "You are an expert aptitude test creator. Generate professional MCQ questions in valid JSON format only. Follow the exact count and difficulty requirements for each topic. Keep responses concise."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            "temperature": 0.7,
-                            "max_tokens": 6000  # Reduced to prevent truncation
-                        },
-                        timeout=120  # Longer timeout for larger request
-                    )
-                    
-                    if response.status_code == 429:
-                        if retry < max_retries_per_key - 1:
-                            retry_delay = 5 * (retry + 1)  # 5s, 10s delays
-                            logger.warning(f"⚠️ Rate limited (429) on key {self.current_key_index + 1}, retrying in {retry_delay}s... (attempt {retry + 1}/{max_retries_per_key})")
-                            time.sleep(retry_delay)
-                            continue
-                        else:
-                            # This key is rate limited, try next key
-                            logger.warning(f"⚠️ Key {self.current_key_index + 1} rate limited, rotating to next key...")
-                            if not self.rotate_api_key():
-                                # No more keys to rotate to
-                                break
-                            break  # Break retry loop, continue with next key
-                    else:
-                        # Success or other error, exit all loops
-                        break
+            # Keys are leased from the scheduler, which honours per-key RPM, concurrency and
+            # 429 cooldowns; a rate-limited attempt is retried on whichever key frees up first
+            max_attempts = len(self.api_keys) + 1
+            response = None
+            for attempt in range(max_attempts):
+                try:
+                    with self.key_scheduler.lease(timeout=60) as lease:
+                        logger.info(f"🔑 Using API key {self.api_keys.index(lease.key) + 1}/{len(self.api_keys)}")
+                        response = requests.post(
+                            "https://api.groq.com/openai/v1/chat/completions",
+                            headers={
+                                "Authorization": f"Bearer {lease.key}",
+                                "Content-Type": "application/json"
+                            },
+                            json={
+                                "model": self.model,
+                                "messages": [
+                                    {"role": "system", "content": "You are an expert aptitude test creator. Generate professional MCQ questions in valid JSON format only. Follow the exact count and difficulty requirements for each topic. Keep responses concise."},
+                                    {"role": "user", "content": prompt}
+                                ],
+                                "temperature": 0.7,
+                                # Sized to the requested question count (capped to prevent truncation)
+                                "max_tokens": budget_for_items(total_questions, self.APTITUDE_TOKENS_PER_QUESTION, overhead=200)
+                            },
+                            timeout=120  # Longer timeout for larger request
+                        )
+                        lease.report(response)
+                except TimeoutError:
+                    logger.warning("⚠️ No GROQ API key became available within 60s")
+                    break
                 
-                # If we got a non-429 response, break out of key rotation loop
                 if response.status_code != 429:
                     break
+                logger.warning(f"⚠️ Rate limited (429), retrying on the next available key... (attempt {attempt + 1}/{max_attempts})")
             
             # If all keys are rate limited
-            if response.status_code == 429:
+            if response is None or response.status_code == 429:
                 logger.error(f"❌ All {len(self.api_keys)} API keys are rate limited")
                 return {
                     'success': False,
@@ -2261,71 +2306,26 @@ Generate exactly {total_questions} questions following the topic and difficulty
                     }
 
                 # Clean markdown code blocks from GROQ response
-                if content.startswith('```'):
-                    content = content.split('\n', 1)[1] if '\n' in content else content[3:]
-                if content.endswith('```'):
-                    content = content.rsplit('\n```', 1)[0] if '\n```' in content else content[:-3]
-
-                content = content.strip()
+                content = strip_code_fences(content)
                 logger.info(f"🧹 Cleaned content preview: {content[:200]}...")
 
                 try:
-                    questions_data = json.loads(content)
-                    generated_questions = questions_data.get('questions', [])
-                    
-                    # Validate exact count - trim if too many, warn if too few
-                    if len(generated_questions) > total_questions:
-                        logger.warning(f"⚠️ AI generated {len(generated_questions)} questions, expected {total_questions}. Trimming to exact count.")
-                        generated_questions = generated_questions[:total_questions]
-                    elif len(generated_questions) < total_questions:
-                        logger.warning(f"⚠️ AI generated {len(generated_questions)} questions, expected {total_questions}. Using what was generated.")
-                    
-                    logger.info(f"✅ Successfully generated {len(generated_questions)} aptitude questions (requested: {total_questions})")
-                    
-                    return {
-                        'success': True,
-                        'questions': generated_questions,
-                        'total_questions': len(generated_questions),
-                        'metadata': {'generated_by': 'groq_ai_single', 'type': 'aptitude_by_topic'}
-                    }
-                    
+                    generated_questions = load_json_object(content, 'questions').get('questions', [])
                 except json.JSONDecodeError as e:
-                    logger.error(f"❌ JSON parsing error: {str(e)}")
-                    logger.error(f"❌ Raw content length: {len(content)} characters")
-                    
-                    # Check if response was truncated
-                    if "Unterminated string" in str(e) or not content.endswith('}'):
-                        logger.error("❌ Response appears to be truncated - try reducing question count")
-                        return {
-                            'success': False,
-                            'questions': [{
-                                'topic': 'error',
-                                'question': 'ERROR: AI response was truncated. Try generating fewer questions.',
-                                'options': {'A': 'ERROR', 'B': 'Response', 'C': 'truncated', 'D': 'reduce count'},
-                                'correct_answer': 'A',
-                                'difficulty': 'error',
-                                'time_limit': 60,
-                                'error': True
-                            }],
-                            'total_questions': 1,
-                            'metadata': {'generated_by': 'error', 'type': 'truncated_response_error'}
-                        }
-                    else:
-                        logger.error(f"❌ Raw content preview: {content[:500]}...")
-                        return {
-                            'success': False,
-                            'questions': [{
-                                'topic': 'error',
-                                'question': f'ERROR: AI response parsing failed. {str(e)}',
-                                'options': {'A': 'ERROR', 'B': 'JSON parsing', 'C': 'failed', 'D': 'invalid format'},
-                                'correct_answer': 'A',
-                                'difficulty': 'error',
-                                'time_limit': 60,
-                                'error': True
-                            }],
-                            'total_questions': 1,
-                            'metadata': {'generated_by': 'error', 'type': 'json_parse_error'}
-                        }
+                    # Nothing recoverable (truncated before the first question closed) -
+                    # the reconciliation stage below requests every question in batches
+                    logger.error(f"❌ JSON parsing error: {str(e)} ({len(content)} characters)")
+                    generated_questions = []
+                
+                if len(generated_questions) != total_questions:
+                    logger.warning(f"⚠️ AI generated {len(generated_questions)} questions, expected {total_questions}. Reconciling per topic and difficulty.")
+                
+                # File valid, non-duplicate questions under their topic/difficulty and
+                # request only what is still missing
+                return self._generate_aptitude_in_batches(
+                    topic_configs, time_per_question, job_title, existing,
+                    seed_questions=generated_questions, generated_by='groq_ai_single'
+                )
             else:
                 logger.error(f"❌ API error: {response.status_code}")
                 return {
@@ -2360,38 +2360,80 @@ Generate exactly {total_questions} questions following the topic and difficulty
                 'metadata': {'generated_by': 'error', 'type': 'exception_error'}
             }
 
-    def _generate_aptitude_in_batches(self, topic_configs: List[Dict], time_per_question: int, job_title: str) -> Dict[str, Any]:
-        """Split large requests into smaller batches to avoid truncation"""
-        all_questions = []
-        batch_size = 2  # 2 topics per batch (max ~24 questions)
-        
-        for i in range(0, len(topic_configs), batch_size):
-            batch_topics = topic_configs[i:i + batch_size]
-            batch_total = sum(tc['total'] for tc in batch_topics)
-            
-            logger.info(f"📦 Processing batch {i//batch_size + 1}: {batch_total} questions for {len(batch_topics)} topics")
-            
-            # Generate questions for this batch
-            batch_result = self._generate_single_batch(batch_topics, time_per_question, job_title)
-            
-            if batch_result['success']:
-                all_questions.extend(batch_result['questions'])
-                logger.info(f"✅ Batch {i//batch_size + 1}: Generated {len(batch_result['questions'])} questions")
-            else:
-                logger.error(f"❌ Batch {i//batch_size + 1} failed")
+    def _generate_aptitude_in_batches(self, topic_configs: List[Dict], time_per_question: int, job_title: str,
+                                      existing: QuestionBankSnapshot = None, seed_questions: List[Dict] = None,
+                                      generated_by: str = 'groq_ai_batched') -> Dict[str, Any]:
+        """
+        Generate exact per-topic/per-difficulty counts in concurrent batches
+        
+        `seed_questions` (e.g. from a single large call) are filed first.
+        Missing counts are then requested as per-topic batches fanned out
+        across the API keys by the key scheduler and merged by topic and
+        difficulty. Invalid or duplicate questions are dropped, and topics
+        whose batch failed or came back short are re-requested for the
+        missing counts only, for at most aptitude_batch_rounds rounds.
+        """
+        wanted = {
+            (tc['topic'], diff): tc.get(diff, 0)
+            for tc in topic_configs for diff in DIFFICULTIES if tc.get(diff, 0) > 0
+        }
+        collected = {slot: [] for slot in wanted}
+        
+        if seed_questions:
+            by_topic = {}
+            for question in seed_questions:
+                topic = self._resolve_aptitude_topic(question, topic_configs)
+                if topic is not None:
+                    by_topic.setdefault(topic, []).append(question)
+            for tc in topic_configs:
+                self._merge_batch_questions(tc, by_topic.get(tc['topic'], []), collected, wanted, existing)
+        
+        pending = self._plan_aptitude_batches(self._aptitude_shortfall(topic_configs, collected, wanted))
+        follow_up_requests = 0
+        
+        for round_number in range(1, self.aptitude_batch_rounds + 1):
+            if not pending:
+                break
+            logger.info(f"📦 Round {round_number}: {len(pending)} batches ({sum(b['total'] for b in pending)} questions) across {len(self.api_keys)} API keys")
             
-            # Add delay between batches to avoid rate limiting
-            if i + batch_size < len(topic_configs):
-                logger.info("⏳ Waiting 3 seconds before next batch...")
-                time.sleep(3)
+            results = self.key_scheduler.map(
+                lambda batch: self._generate_single_batch([batch], time_per_question, job_title),
+                pending
+            )
+            follow_up_requests += len(pending)
+            # Merge in batch order so the outcome does not depend on completion order
+            for batch, result in zip(pending, results):
+                if result['success']:
+                    placed = self._merge_batch_questions(batch, result['questions'], collected, wanted, existing)
+                    logger.info(f"✅ {batch['topic']}: kept {placed}/{batch['total']} questions")
+                else:
+                    logger.error(f"❌ Batch for {batch['topic']} failed")
+            
+            pending = self._plan_aptitude_batches(self._aptitude_shortfall(topic_configs, collected, wanted))
+        
+        if pending:
+            logger.warning(f"⚠️ Still missing {sum(b['total'] for b in pending)} questions after {self.aptitude_batch_rounds} rounds")
+        
+        all_questions = [
+            question
+            for tc in topic_configs for diff in DIFFICULTIES
+            for question in collected.get((tc['topic'], diff), [])
+        ]
         
         if all_questions:
-            logger.info(f"🎉 Successfully generated {len(all_questions)} total aptitude questions from {len(topic_configs)} topics")
+            requested = sum(wanted.values())
+            logger.info(f"🎉 Successfully generated {len(all_questions)}/{requested} aptitude questions from {len(topic_configs)} topics ({follow_up_requests} batch requests)")
             return {
                 'success': True,
                 'questions': all_questions,
                 'total_questions': len(all_questions),
-                'metadata': {'generated_by': 'groq_ai_batched', 'type': 'aptitude_by_topic'}
+                'metadata': {
+                    'generated_by': generated_by,
+                    'type': 'aptitude_by_topic',
+                    'requested': requested,
+                    'batch_requests': follow_up_requests,
+                    'complete': len(all_questions) == requested
+                }
             }
         else:
             logger.error("❌ No questions generated from any batch")
@@ -2410,6 +2452,105 @@ Generate exactly {total_questions} questions following the topic and difficulty
                 'metadata': {'generated_by': 'error', 'type': 'all_batches_failed'}
             }
 
+    def _plan_aptitude_batches(self, topic_configs: List[Dict]) -> List[Dict]:
+        """One batch per topic, split by difficulty so no batch asks for more than aptitude_batch_questions"""
+        batches = []
+        for tc in topic_configs:
+            batch = {'topic': tc['topic'], 'total': 0}
+            for diff in DIFFICULTIES:
+                remaining = tc.get(diff, 0)
+                while remaining > 0:
+                    if batch['total'] >= self.aptitude_batch_questions:
+                        batches.append(batch)
+                        batch = {'topic': tc['topic'], 'total': 0}
+                    take = min(remaining, self.aptitude_batch_questions - batch['total'])
+                    batch[diff] = batch.get(diff, 0) + take
+                    batch['total'] += take
+                    remaining -= take
+            if batch['total']:
+                batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _aptitude_shortfall(topic_configs: List[Dict], collected: Dict, wanted: Dict) -> List[Dict]:
+        """Per-topic configs for the counts still missing"""
+        shortfall = []
+        for tc in topic_configs:
+            missing = {diff: wanted.get((tc['topic'], diff), 0) - len(collected.get((tc['topic'], diff), [])) for diff in DIFFICULTIES}
+            if any(count > 0 for count in missing.values()):
+                shortfall.append({'topic': tc['topic'], **missing, 'total': sum(missing.values())})
+        return shortfall
+
+    @staticmethod
+    def _resolve_aptitude_topic(question: Dict, topic_configs: List[Dict]) -> str:
+        """Requested topic a generated question belongs to ("Logical Reasoning" -> logical_reasoning)"""
+        if not isinstance(question, dict):
+            return None
+        if len(topic_configs) == 1:
+            return topic_configs[0]['topic']
+        label = re.sub(r'[^a-z0-9]+', '_', str(question.get('topic', '')).lower()).strip('_')
+        for tc in topic_configs:
+            if re.sub(r'[^a-z0-9]+', '_', tc['topic'].lower()).strip('_') == label:
+                return tc['topic']
+        return None
+
+    @staticmethod
+    def _validate_aptitude_question(question: Any) -> Dict:
+        """Cleaned copy of a generated MCQ with four options and a valid answer, or None"""
+        if not isinstance(question, dict):
+            return None
+        text = question.get('question')
+        if not isinstance(text, str) or len(text.strip()) < 10:
+            return None
+        
+        options = question.get('options')
+        if isinstance(options, list) and len(options) == 4:
+            options = dict(zip('ABCD', options))
+        if not isinstance(options, dict) or sorted(str(key).strip().upper() for key in options) != ['A', 'B', 'C', 'D']:
+            return None
+        options = {str(key).strip().upper(): str(value).strip() for key, value in options.items()}
+        if not all(options.values()) or len(set(value.lower() for value in options.values())) < 4:
+            return None
+        
+        # Accept "a", "A)", "Option A" and the like
+        answer = re.sub(r'^option\s*', '', str(question.get('correct_answer', '')).strip(), flags=re.IGNORECASE)[:1].upper()
+        if answer not in options:
+            return None
+        
+        cleaned = dict(question)
+        cleaned['question'] = text.strip()
+        cleaned['options'] = options
+        cleaned['correct_answer'] = answer
+        return cleaned
+
+    def _merge_batch_questions(self, batch: Dict, questions: List[Dict], collected: Dict, wanted: Dict,
+                               existing: QuestionBankSnapshot = None) -> int:
+        """File a batch's valid questions under (topic, difficulty) slots that still have room; returns how many were kept"""
+        topic = batch['topic']
+        placed = 0
+        questions = [question for question in map(self._validate_aptitude_question, questions) if question is not None]
+        if existing is not None:
+            # One bank lookup for the whole batch
+            questions = existing.screen(questions)
+        for question in questions:
+            difficulty = str(question.get('difficulty', '')).lower()
+            if batch.get(difficulty, 0) <= 0 or len(collected[(topic, difficulty)]) >= wanted[(topic, difficulty)]:
+                # Mislabelled or surplus difficulty - use any slot of this batch that is still short
+                difficulty = next(
+                    (diff for diff in DIFFICULTIES
+                     if batch.get(diff, 0) > 0 and len(collected[(topic, diff)]) < wanted[(topic, diff)]),
+                    None
+                )
+                if difficulty is None:
+                    continue
+            if existing is not None and not existing.accept(question):
+                continue
+            question['topic'] = topic
+            question['difficulty'] = difficulty
+            collected[(topic, difficulty)].append(question)
+            placed += 1
+        return placed
+
     def _generate_single_batch(self, topic_configs: List[Dict], time_per_question: int, job_title: str) -> Dict[str, Any]:
         """Generate questions for a single batch of topics"""
         batch_total = sum(tc['total'] for tc in topic_configs)
@@ -2454,61 +2595,57 @@ REQUIREMENTS:
 Generate exactly {batch_total} questions following the topic and difficulty distribution above."""
 
         try:
-            current_api_key = self.get_current_api_key()
-            
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {current_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": "You are an expert aptitude test creator. Generate professional MCQ questions in valid JSON format only. Follow the exact count and difficulty requirements for each topic. Keep responses concise."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 4000  # Smaller for batch processing
-                },
-                timeout=90
-            )
+            # The key stays leased while the response streams in
+            with self.key_scheduler.lease() as lease:
+                # Stream the completion so each question is parsed as soon as it closes
+                # and a truncated response still keeps every complete question
+                response = requests.post(
+                    "https://api.groq.com/openai/v1/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {lease.key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": self.model,
+                        "messages": [
+                            {"role": "system", "content": "You are an expert aptitude test creator. Generate professional MCQ questions in valid JSON format only. Follow the exact count and difficulty requirements for each topic. Keep responses concise."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": 0.7,
+                        "max_tokens": budget_for_items(batch_total, self.APTITUDE_TOKENS_PER_QUESTION, overhead=200),
+                        "stream": True
+                    },
+                    timeout=90,
+                    stream=True
+                )
+                lease.report(response)
+                
+                if response.status_code == 200:
+                    generated_questions = []
+                    for question in self._iter_streamed_items(response, 'questions'):
+                        generated_questions.append(question)
+                        if len(generated_questions) >= batch_total:
+                            break
+                    response.close()
             
             if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content'].strip()
+                if not generated_questions:
+                    logger.error("❌ Batch JSON parsing error: no complete questions in streamed response")
+                    return {'success': False, 'questions': []}
                 
-                # Clean markdown code blocks
-                if content.startswith('```'):
-                    content = content.split('\n', 1)[1] if '\n' in content else content[3:]
-                if content.endswith('```'):
-                    content = content.rsplit('\n```', 1)[0] if '\n```' in content else content[:-3]
-                content = content.strip()
+                # Validate exact count - warn if too few
+                if len(generated_questions) < batch_total:
+                    logger.warning(f"⚠️ AI generated {len(generated_questions)} questions, expected {batch_total}. Using what was generated.")
                 
-                try:
-                    questions_data = json.loads(content)
-                    generated_questions = questions_data.get('questions', [])
-                    
-                    # Validate exact count - trim if too many, warn if too few
-                    if len(generated_questions) > batch_total:
-                        logger.warning(f"⚠️ AI generated {len(generated_questions)} questions, expected {batch_total}. Trimming to exact count.")
-                        generated_questions = generated_questions[:batch_total]
-                    elif len(generated_questions) < batch_total:
-                        logger.warning(f"⚠️ AI generated {len(generated_questions)} questions, expected {batch_total}. Using what was generated.")
-                    
-                    return {
-                        'success': True,
-                        'questions': generated_questions,
-                        'total_questions': len(generated_questions)
-                    }
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"❌ Batch JSON parsing error: {str(e)}")
-                    return {'success': False, 'questions': []}
+                return {
+                    'success': True,
+                    'questions': generated_questions,
+                    'total_questions': len(generated_questions)
+                }
                     
             elif response.status_code == 429:
-                logger.warning("⚠️ Rate limited in batch, rotating API key...")
-                self.rotate_api_key()
+                # The scheduler cools this key down; the batch is retried in the next round
+                logger.warning("⚠️ Rate limited in batch")
                 return {'success': False, 'questions': []}
             else:
                 logger.error(f"❌ Batch API error: {response.status_code}")
@@ -2603,7 +2740,7 @@ Return ONLY a JSON object in this exact format:
             if response.status_code == 200:
                 result = response.json()
                 content = result['choices'][0]['message']['content'].strip()
-                questions_data = json.loads(content)
+                questions_data = load_json_object(content, 'questions')
                 
                 generated_count = len(questions_data.get('questions', []))
                 if generated_count != total_questions:
@@ -2762,7 +2899,7 @@ Return ONLY a JSON object in this exact format:
             if response.status_code == 200:
                 result = response.json()
                 content = result['choices'][0]['message']['content']
-                questions_data = json.loads(content)
+                questions_data = load_json_object(content, 'questions')
                 
                 logger.info(f"✅ Generated {len(questions_data.get('questions', []))} aptitude questions")
                 return {'success': True, **questions_data}
@@ -2799,3 +2936,77 @@ Return ONLY a JSON object in this exact format:
                 'total_questions': 1,
                 'metadata': {'generated_by': 'error', 'type': 'aptitude_generation_error'}
             }
+
+    def generate_interview_questions(self, job_role: str, category: str, difficulty: str, num_questions: int) -> Dict[str, Any]:
+        """
+        Generate category interview questions (technical, behavioral, general, coding)
+        
+        Returns {'questions': [...], 'metadata': {...}} like the Gemini path of
+        InterviewService; raises on any failure so callers can fall back.
+        """
+        if not self.api_keys:
+            raise RuntimeError('No GROQ API keys configured')
+        
+        prompt = f"""Generate {num_questions} {difficulty} {category} interview questions for a {job_role} position.
+
+Requirements:
+- All questions must be {difficulty} level and {category} focused
+- Questions should be relevant to the {job_role} role
+- For coding questions, include a relevant code snippet
+
+Return ONLY a JSON object in this exact format:
+{{
+  "questions": [
+    {{
+      "text": "Question text here",
+      "type": "{category}",
+      "duration": 180,
+      "expected_answer": "Brief description of what a good answer includes",
+      "code_snippet": "optional code here",
+      "language": "javascript"
+    }}
+  ]
+}}"""
+        
+        with self.key_scheduler.lease() as lease:
+            response = requests.post(
+                f"{self.api_base}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {lease.key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": "You are an expert technical interviewer. Generate interview questions in valid JSON format only."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.8,
+                    "max_tokens": budget_for_items(num_questions, 200),
+                    "response_format": {"type": "json_object"}
+                },
+                timeout=30
+            )
+            lease.report(response)
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"GROQ returned {response.status_code}")
+        
+        content = response.json()['choices'][0]['message']['content']
+        questions = [q for q in load_json_object(content, 'questions').get('questions', []) if isinstance(q, dict) and q.get('text')]
+        if not questions:
+            raise ValueError('GROQ returned no questions')
+        
+        for question in questions:
+            question['type'] = category
+        logger.info(f"✅ GROQ generated {len(questions)} {difficulty} {category} questions")
+        return {
+            'questions': questions[:num_questions],
+            'metadata': {
+                'job_role': job_role,
+                'category': category,
+                'difficulty': difficulty,
+                'total_questions': len(questions[:num_questions]),
+                'generated_by': 'groq'
+            }
+        }
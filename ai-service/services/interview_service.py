@@ -4,19 +4,105 @@ Generates questions and evaluates candidate responses using GROQ (FREE & FAST)
 """
 
 import logging
+import os
 from typing import Optional, List, Dict, Any
-import json
 from .professional_evaluator import ProfessionalEvaluator
 from .groq_question_generator import GroqQuestionGenerator
+from .json_stream_parser import load_json_object, loads_lenient
+from .llm_router import LLMRouter, AllProvidersFailed
+from .question_pool import QuestionPool
 
 logger = logging.getLogger(__name__)
 
+# Fallback questions by category and difficulty; '{job_role}' is filled in when served
+FALLBACK_QUESTIONS_BY_CATEGORY = {
+    'technical': {
+        'easy': [
+            {'text': 'What programming languages are you familiar with for {job_role} work?', 'type': 'technical', 'duration': 120, 'expected_answer': 'List relevant languages with basic experience'},
+            {'text': 'Explain what version control is and why it\'s important.', 'type': 'technical', 'duration': 150, 'expected_answer': 'Git, tracking changes, collaboration'},
+            {'text': 'What is the difference between frontend and backend development?', 'type': 'technical', 'duration': 120, 'expected_answer': 'Client-side vs server-side responsibilities'}
+        ],
+        'intermediate': [
+            {'text': 'Describe your experience with frameworks commonly used in {job_role} development.', 'type': 'technical', 'duration': 180, 'expected_answer': 'Specific frameworks with practical examples'},
+            {'text': 'How do you approach debugging complex technical issues?', 'type': 'technical', 'duration': 200, 'expected_answer': 'Systematic debugging methodology'},
+            {'text': 'Explain the concept of API design and best practices.', 'type': 'technical', 'duration': 240, 'expected_answer': 'REST principles, documentation, versioning'}
+        ],
+        'advanced': [
+            {'text': 'Design a scalable architecture for a {job_role} application handling millions of users.', 'type': 'technical', 'duration': 300, 'expected_answer': 'Microservices, load balancing, caching strategies'},
+            {'text': 'How would you optimize performance in a large-scale application?', 'type': 'technical', 'duration': 280, 'expected_answer': 'Profiling, caching, database optimization'},
+            {'text': 'Discuss security considerations for modern web applications.', 'type': 'technical', 'duration': 250, 'expected_answer': 'Authentication, authorization, data protection'}
+        ]
+    },
+    'behavioral': {
+        'easy': [
+            {'text': 'Why are you interested in working as a {job_role}?', 'type': 'behavioral', 'duration': 120, 'expected_answer': 'Genuine interest and career alignment'},
+            {'text': 'Describe a time when you learned something new quickly.', 'type': 'behavioral', 'duration': 150, 'expected_answer': 'Learning approach and adaptability'},
+            {'text': 'How do you handle feedback on your work?', 'type': 'behavioral', 'duration': 120, 'expected_answer': 'Openness to improvement and growth mindset'}
+        ],
+        'intermediate': [
+            {'text': 'Tell me about a challenging project you worked on and how you overcame obstacles.', 'type': 'behavioral', 'duration': 200, 'expected_answer': 'Problem-solving skills and persistence'},
+            {'text': 'Describe a situation where you had to work with a difficult team member.', 'type': 'behavioral', 'duration': 180, 'expected_answer': 'Conflict resolution and communication skills'},
+            {'text': 'How do you prioritize tasks when you have multiple deadlines?', 'type': 'behavioral', 'duration': 160, 'expected_answer': 'Time management and prioritization strategies'}
+        ],
+        'advanced': [
+            {'text': 'Describe a time when you had to lead a technical decision as a {job_role}.', 'type': 'behavioral', 'duration': 240, 'expected_answer': 'Leadership skills and technical judgment'},
+            {'text': 'Tell me about a time when you had to advocate for a technical solution to non-technical stakeholders.', 'type': 'behavioral', 'duration': 220, 'expected_answer': 'Communication and influence skills'},
+            {'text': 'How do you handle situations where you disagree with your manager\'s technical approach?', 'type': 'behavioral', 'duration': 200, 'expected_answer': 'Professional disagreement and collaboration'}
+        ]
+    },
+    'coding': {
+        'easy': [
+            {'text': 'Write a function to reverse a string.', 'type': 'coding', 'duration': 180, 'expected_answer': 'Basic string manipulation', 'code_snippet': '// Write your solution here\nfunction reverseString(str) {\n  // Your code\n}', 'language': 'javascript'},
+            {'text': 'Find the largest number in an array.', 'type': 'coding', 'duration': 150, 'expected_answer': 'Array iteration and comparison', 'code_snippet': '// Write your solution here\nfunction findMax(arr) {\n  // Your code\n}', 'language': 'javascript'},
+            {'text': 'Check if a number is even or odd.', 'type': 'coding', 'duration': 120, 'expected_answer': 'Modulo operation understanding', 'code_snippet': '// Write your solution here\nfunction isEven(num) {\n  // Your code\n}', 'language': 'javascript'}
+        ],
+        'intermediate': [
+            {'text': 'Implement a function to check if a string is a palindrome.', 'type': 'coding', 'duration': 240, 'expected_answer': 'String manipulation and algorithm thinking', 'code_snippet': '// Write your solution here\nfunction isPalindrome(str) {\n  // Your code\n}', 'language': 'javascript'},
+            {'text': 'Write a function to find duplicate elements in an array.', 'type': 'coding', 'duration': 220, 'expected_answer': 'Hash map or set usage', 'code_snippet': '// Write your solution here\nfunction findDuplicates(arr) {\n  // Your code\n}', 'language': 'javascript'},
+            {'text': 'Implement a basic binary search algorithm.', 'type': 'coding', 'duration': 300, 'expected_answer': 'Binary search logic and complexity understanding', 'code_snippet': '// Write your solution here\nfunction binarySearch(arr, target) {\n  // Your code\n}', 'language': 'javascript'}
+        ],
+        'advanced': [
+            {'text': 'Design and implement a LRU (Least Recently Used) cache.', 'type': 'coding', 'duration': 400, 'expected_answer': 'Data structure design with hash map and doubly linked list', 'code_snippet': '// Design LRU Cache\nclass LRUCache {\n  constructor(capacity) {\n    // Your implementation\n  }\n}', 'language': 'javascript'},
+            {'text': 'Implement a function to merge two sorted linked lists.', 'type': 'coding', 'duration': 350, 'expected_answer': 'Linked list manipulation and merge logic', 'code_snippet': '// ListNode definition\nclass ListNode {\n  constructor(val, next) {\n    this.val = val;\n    this.next = next || null;\n  }\n}\n\nfunction mergeLists(l1, l2) {\n  // Your code\n}', 'language': 'javascript'},
+            {'text': 'Write a function to find the longest common subsequence of two strings.', 'type': 'coding', 'duration': 380, 'expected_answer': 'Dynamic programming approach', 'code_snippet': '// Write your solution here\nfunction longestCommonSubsequence(str1, str2) {\n  // Your code\n}', 'language': 'javascript'}
+        ]
+    },
+    'general': {
+        'easy': [
+            {'text': 'What do you know about the {job_role} role and its responsibilities?', 'type': 'general', 'duration': 120, 'expected_answer': 'Basic understanding of role requirements'},
+            {'text': 'What are your career goals for the next 2-3 years?', 'type': 'general', 'duration': 150, 'expected_answer': 'Clear career direction and growth mindset'},
+            {'text': 'How do you stay updated with technology trends?', 'type': 'general', 'duration': 120, 'expected_answer': 'Continuous learning approach'}
+        ],
+        'intermediate': [
+            {'text': 'What trends do you see in the {job_role} field that excite you?', 'type': 'general', 'duration': 180, 'expected_answer': 'Industry awareness and passion'},
+            {'text': 'How do you approach learning new technologies or tools?', 'type': 'general', 'duration': 160, 'expected_answer': 'Learning methodology and adaptability'},
+            {'text': 'What do you think makes a successful development team?', 'type': 'general', 'duration': 200, 'expected_answer': 'Team dynamics and collaboration understanding'}
+        ],
+        'advanced': [
+            {'text': 'How would you mentor a junior {job_role} joining your team?', 'type': 'general', 'duration': 220, 'expected_answer': 'Leadership and knowledge transfer skills'},
+            {'text': 'What role do you think AI and automation will play in software development?', 'type': 'general', 'duration': 240, 'expected_answer': 'Strategic thinking about industry evolution'},
+            {'text': 'How do you balance technical debt with feature development?', 'type': 'general', 'duration': 200, 'expected_answer': 'Strategic technical decision making'}
+        ]
+    }
+}
+
+
 class InterviewService:
-    def __init__(self, llm_service, gemini_service=None):
+    def __init__(self, llm_service, gemini_service=None, groq_generator=None):
         self.llm = llm_service
         self.gemini = gemini_service
-        self.groq_generator = GroqQuestionGenerator()
+        self.groq_generator = groq_generator or GroqQuestionGenerator()
         self.professional_evaluator = ProfessionalEvaluator()
+        self.router = LLMRouter('interview_questions')
+        
+        # Category questions are served from a locally stored pool, refilled in the background
+        self.question_pool = None
+        if os.getenv('QUESTION_POOL_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            try:
+                self.question_pool = QuestionPool(self._generate_pool_questions)
+            except Exception as e:
+                logger.warning(f"⚠️ Question pool disabled: {e}")
+        
         logger.info("✅ Interview service initialized with GROQ generator and professional evaluator")
     
     def generate_questions(self, job_title: str, interview_type: str = 'technical', num_questions: int = 5) -> Dict[str, Any]:
@@ -31,28 +117,66 @@ class InterviewService:
         
         return self._generate_questions_llm(job_title, interview_type, num_questions)
     
-    def generate_questions_by_category(self, job_role: str, category: str, difficulty: str, num_questions: int = 5) -> Dict[str, Any]:
-        """Generate interview questions based on job role, category, and difficulty level"""
+    def generate_questions_by_category(self, job_role: str, category: str, difficulty: str, num_questions: int = 5,
+                                       candidate_id: str = None) -> Dict[str, Any]:
+        """
+        Generate interview questions based on job role, category, and difficulty level
+        
+        Served from the question pool when it holds enough questions (never
+        repeating questions already given to `candidate_id`); otherwise
+        generated live and added to the pool.
+        """
+        
+        if self.question_pool is not None:
+            questions = self.question_pool.take(job_role, category, difficulty, num_questions, candidate=candidate_id)
+            if len(questions) == num_questions:
+                logger.info(f"⚡ Served {num_questions} {difficulty} {category} questions from pool")
+                total_duration = sum(q['duration'] for q in questions)
+                return {
+                    'questions': questions,
+                    'metadata': {
+                        'job_role': job_role,
+                        'category': category,
+                        'difficulty': difficulty,
+                        'total_questions': len(questions)
+                    },
+                    'estimated_duration': (total_duration // 60) + 2  # Add 2 min buffer
+                }
+            logger.info(f"📭 Question pool short ({len(questions)}/{num_questions}), generating live")
         
-        # Use GROQ first (FREE and ULTRA-FAST)
         try:
-            logger.info(f"🚀 Using GROQ for question generation: {num_questions} {difficulty} {category} questions")
-            return self.groq_generator.generate_questions(job_role, category, difficulty, num_questions)
-        except Exception as e:
-            logger.error(f"GROQ error, trying Gemini: {e}")
-        
-        # Fallback to Gemini if GROQ fails
-        if self.gemini and self.gemini.is_available():
-            try:
-                logger.info("🔄 Falling back to Gemini...")
-                return self._generate_questions_by_category_gemini(job_role, category, difficulty, num_questions)
-            except Exception as e:
-                logger.error(f"Gemini error, using fallback: {e}")
+            logger.info(f"🚀 Generating {num_questions} {difficulty} {category} questions")
+            return self._add_to_pool(job_role, category, difficulty,
+                                     self._generate_questions_routed(job_role, category, difficulty, num_questions))
+        except AllProvidersFailed as e:
+            logger.error(f"AI generation failed, using fallback: {e}")
         
         # Final fallback
         logger.info("📝 Using fallback questions...")
         return self._generate_questions_by_category_llm(job_role, category, difficulty, num_questions)
     
+    def _generate_questions_routed(self, job_role: str, category: str, difficulty: str, num_questions: int) -> Dict[str, Any]:
+        """GROQ (FREE and ULTRA-FAST) preferred, then Gemini; the router favours whichever is faster and healthy"""
+        providers = [('groq', lambda: self.groq_generator.generate_interview_questions(job_role, category, difficulty, num_questions))]
+        if self.gemini and self.gemini.is_available():
+            providers.append(('gemini', lambda: self._generate_questions_by_category_gemini(job_role, category, difficulty, num_questions,
+                                                                                              use_fallback=False)))
+        return self.router.call(providers, accept=lambda result: bool(result.get('questions')))
+    
+    def _add_to_pool(self, job_role: str, category: str, difficulty: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep live-generated questions for future requests"""
+        if self.question_pool is not None:
+            self.question_pool.add(job_role, category, difficulty, result.get('questions', []))
+        return result
+    
+    def _generate_pool_questions(self, job_role: str, category: str, difficulty: str, count: int) -> List[Dict]:
+        """Question pool refill source: AI-generated questions only (never fallback templates)"""
+        try:
+            return self._generate_questions_routed(job_role, category, difficulty, count)['questions']
+        except AllProvidersFailed as e:
+            logger.warning(f"Pool refill failed: {e}")
+            return []
+    
     def _generate_questions_gemini(self, job_title: str, interview_type: str, num_questions: int) -> Dict[str, Any]:
         """Generate questions using Gemini AI"""
         prompt = f"""Generate {num_questions} interview questions for a {job_title} position.
@@ -87,23 +211,20 @@ Generate questions now:"""
 
         response = self.gemini.generate(prompt, max_tokens=2000, temperature=0.8)
         
-        # Try to parse JSON response
+        # Parse JSON response, keeping every complete question if it was truncated
         try:
-            # Extract JSON from response
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                data = json.loads(json_str)
+            data = load_json_object(response, 'questions')
+            if data.get('questions'):
                 return data
-        except:
+        except ValueError:
             pass
         
         # Fallback if parsing fails
         return self._get_fallback_questions(job_title, interview_type, num_questions)
     
-    def _generate_questions_by_category_gemini(self, job_role: str, category: str, difficulty: str, num_questions: int) -> Dict[str, Any]:
-        """Generate questions using Gemini AI based on category and difficulty"""
+    def _generate_questions_by_category_gemini(self, job_role: str, category: str, difficulty: str, num_questions: int,
+                                               use_fallback: bool = True) -> Dict[str, Any]:
+        """Generate questions using Gemini AI based on category and difficulty (raises ValueError on bad output unless use_fallback)"""
         
         difficulty_descriptions = {
             'easy': 'Entry-level questions suitable for junior candidates or basic understanding',
@@ -163,18 +284,17 @@ Generate questions now:"""
 
         response = self.gemini.generate(prompt, max_tokens=3000, temperature=0.8)
         
-        # Try to parse JSON response
+        # Parse JSON response, keeping every complete question if it was truncated
         try:
-            # Extract JSON from response
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                data = json.loads(json_str)
+            data = load_json_object(response, 'questions')
+            if data.get('questions'):
                 return data
-        except Exception as e:
+        except ValueError as e:
             logger.error(f"Failed to parse Gemini response: {e}")
         
+        if not use_fallback:
+            raise ValueError("Gemini returned no usable questions")
+        
         # Fallback if parsing fails
         return self._get_fallback_questions_by_category(job_role, category, difficulty, num_questions)
     
@@ -292,79 +412,8 @@ print(process_data([1, -2, 3, -4, 5]))''',
     def _get_fallback_questions_by_category(self, job_role: str, category: str, difficulty: str, num_questions: int) -> Dict[str, Any]:
         """Fallback questions by category if AI generation fails"""
         
-        questions_by_category = {
-            'technical': {
-                'easy': [
-                    {'text': f'What programming languages are you familiar with for {job_role} work?', 'type': 'technical', 'duration': 120, 'expected_answer': 'List relevant languages with basic experience'},
-                    {'text': 'Explain what version control is and why it\'s important.', 'type': 'technical', 'duration': 150, 'expected_answer': 'Git, tracking changes, collaboration'},
-                    {'text': 'What is the difference between frontend and backend development?', 'type': 'technical', 'duration': 120, 'expected_answer': 'Client-side vs server-side responsibilities'}
-                ],
-                'intermediate': [
-                    {'text': f'Describe your experience with frameworks commonly used in {job_role} development.', 'type': 'technical', 'duration': 180, 'expected_answer': 'Specific frameworks with practical examples'},
-                    {'text': 'How do you approach debugging complex technical issues?', 'type': 'technical', 'duration': 200, 'expected_answer': 'Systematic debugging methodology'},
-                    {'text': 'Explain the concept of API design and best practices.', 'type': 'technical', 'duration': 240, 'expected_answer': 'REST principles, documentation, versioning'}
-                ],
-                'advanced': [
-                    {'text': f'Design a scalable architecture for a {job_role} application handling millions of users.', 'type': 'technical', 'duration': 300, 'expected_answer': 'Microservices, load balancing, caching strategies'},
-                    {'text': 'How would you optimize performance in a large-scale application?', 'type': 'technical', 'duration': 280, 'expected_answer': 'Profiling, caching, database optimization'},
-                    {'text': 'Discuss security considerations for modern web applications.', 'type': 'technical', 'duration': 250, 'expected_answer': 'Authentication, authorization, data protection'}
-                ]
-            },
-            'behavioral': {
-                'easy': [
-                    {'text': f'Why are you interested in working as a {job_role}?', 'type': 'behavioral', 'duration': 120, 'expected_answer': 'Genuine interest and career alignment'},
-                    {'text': 'Describe a time when you learned something new quickly.', 'type': 'behavioral', 'duration': 150, 'expected_answer': 'Learning approach and adaptability'},
-                    {'text': 'How do you handle feedback on your work?', 'type': 'behavioral', 'duration': 120, 'expected_answer': 'Openness to improvement and growth mindset'}
-                ],
-                'intermediate': [
-                    {'text': 'Tell me about a challenging project you worked on and how you overcame obstacles.', 'type': 'behavioral', 'duration': 200, 'expected_answer': 'Problem-solving skills and persistence'},
-                    {'text': 'Describe a situation where you had to work with a difficult team member.', 'type': 'behavioral', 'duration': 180, 'expected_answer': 'Conflict resolution and communication skills'},
-                    {'text': 'How do you prioritize tasks when you have multiple deadlines?', 'type': 'behavioral', 'duration': 160, 'expected_answer': 'Time management and prioritization strategies'}
-                ],
-                'advanced': [
-                    {'text': f'Describe a time when you had to lead a technical decision as a {job_role}.', 'type': 'behavioral', 'duration': 240, 'expected_answer': 'Leadership skills and technical judgment'},
-                    {'text': 'Tell me about a time when you had to advocate for a technical solution to non-technical stakeholders.', 'type': 'behavioral', 'duration': 220, 'expected_answer': 'Communication and influence skills'},
-                    {'text': 'How do you handle situations where you disagree with your manager\'s technical approach?', 'type': 'behavioral', 'duration': 200, 'expected_answer': 'Professional disagreement and collaboration'}
-                ]
-            },
-            'coding': {
-                'easy': [
-                    {'text': 'Write a function to reverse a string.', 'type': 'coding', 'duration': 180, 'expected_answer': 'Basic string manipulation', 'code_snippet': '// Write your solution here\nfunction reverseString(str) {\n  // Your code\n}', 'language': 'javascript'},
-                    {'text': 'Find the largest number in an array.', 'type': 'coding', 'duration': 150, 'expected_answer': 'Array iteration and comparison', 'code_snippet': '// Write your solution here\nfunction findMax(arr) {\n  // Your code\n}', 'language': 'javascript'},
-                    {'text': 'Check if a number is even or odd.', 'type': 'coding', 'duration': 120, 'expected_answer': 'Modulo operation understanding', 'code_snippet': '// Write your solution here\nfunction isEven(num) {\n  // Your code\n}', 'language': 'javascript'}
-                ],
-                'intermediate': [
-                    {'text': 'Implement a function to check if a string is a palindrome.', 'type': 'coding', 'duration': 240, 'expected_answer': 'String manipulation and algorithm thinking', 'code_snippet': '// Write your solution here\nfunction isPalindrome(str) {\n  // Your code\n}', 'language': 'javascript'},
-                    {'text': 'Write a function to find duplicate elements in an array.', 'type': 'coding', 'duration': 220, 'expected_answer': 'Hash map or set usage', 'code_snippet': '// Write your solution here\nfunction findDuplicates(arr) {\n  // Your code\n}', 'language': 'javascript'},
-                    {'text': 'Implement a basic binary search algorithm.', 'type': 'coding', 'duration': 300, 'expected_answer': 'Binary search logic and complexity understanding', 'code_snippet': '// Write your solution here\nfunction binarySearch(arr, target) {\n  // Your code\n}', 'language': 'javascript'}
-                ],
-                'advanced': [
-                    {'text': 'Design and implement a LRU (Least Recently Used) cache.', 'type': 'coding', 'duration': 400, 'expected_answer': 'Data structure design with hash map and doubly linked list', 'code_snippet': '// Design LRU Cache\nclass LRUCache {\n  constructor(capacity) {\n    // Your implementation\n  }\n}', 'language': 'javascript'},
-                    {'text': 'Implement a function to merge two sorted linked lists.', 'type': 'coding', 'duration': 350, 'expected_answer': 'Linked list manipulation and merge logic', 'code_snippet': '// ListNode definition\nclass ListNode {\n  constructor(val, next) {\n    this.val = val;\n    this.next = next || null;\n  }\n}\n\nfunction mergeLists(l1, l2) {\n  // Your code\n}', 'language': 'javascript'},
-                    {'text': 'Write a function to find the longest common subsequence of two strings.', 'type': 'coding', 'duration': 380, 'expected_answer': 'Dynamic programming approach', 'code_snippet': '// Write your solution here\nfunction longestCommonSubsequence(str1, str2) {\n  // Your code\n}', 'language': 'javascript'}
-                ]
-            },
-            'general': {
-                'easy': [
-                    {'text': f'What do you know about the {job_role} role and its responsibilities?', 'type': 'general', 'duration': 120, 'expected_answer': 'Basic understanding of role requirements'},
-                    {'text': 'What are your career goals for the next 2-3 years?', 'type': 'general', 'duration': 150, 'expected_answer': 'Clear career direction and growth mindset'},
-                    {'text': 'How do you stay updated with technology trends?', 'type': 'general', 'duration': 120, 'expected_answer': 'Continuous learning approach'}
-                ],
-                'intermediate': [
-                    {'text': f'What trends do you see in the {job_role} field that excite you?', 'type': 'general', 'duration': 180, 'expected_answer': 'Industry awareness and passion'},
-                    {'text': 'How do you approach learning new technologies or tools?', 'type': 'general', 'duration': 160, 'expected_answer': 'Learning methodology and adaptability'},
-                    {'text': 'What do you think makes a successful development team?', 'type': 'general', 'duration': 200, 'expected_answer': 'Team dynamics and collaboration understanding'}
-                ],
-                'advanced': [
-                    {'text': f'How would you mentor a junior {job_role} joining your team?', 'type': 'general', 'duration': 220, 'expected_answer': 'Leadership and knowledge transfer skills'},
-                    {'text': 'What role do you think AI and automation will play in software development?', 'type': 'general', 'duration': 240, 'expected_answer': 'Strategic thinking about industry evolution'},
-                    {'text': 'How do you balance technical debt with feature development?', 'type': 'general', 'duration': 200, 'expected_answer': 'Strategic technical decision making'}
-                ]
-            }
-        }
-        
         # Get questions for the specified category and difficulty
-        category_questions = questions_by_category.get(category, {})
+        category_questions = FALLBACK_QUESTIONS_BY_CATEGORY.get(category, {})
         difficulty_questions = category_questions.get(difficulty, [])
         
         # If not enough questions, mix difficulties
@@ -379,9 +428,14 @@ print(process_data([1, -2, 3, -4, 5]))''',
         
         # If still not enough, pad with general questions
         if len(selected_questions) < num_questions:
-            general_questions = questions_by_category.get('general', {}).get('intermediate', [])
+            general_questions = FALLBACK_QUESTIONS_BY_CATEGORY.get('general', {}).get('intermediate', [])
             remaining = num_questions - len(selected_questions)
-            selected_questions.extend(general_questions[:remaining])
+            selected_questions = selected_questions + general_questions[:remaining]
+        
+        # Fill in the role (copies, so the shared templates are never modified)
+        selected_questions = [
+            dict(q, text=q['text'].replace('{job_role}', job_role)) for q in selected_questions
+        ]
         
         # Calculate estimated duration
         total_duration = sum(q['duration'] for q in selected_questions)
@@ -506,16 +560,11 @@ Evaluate NOW with fair, accurate scoring:"""
         response = self.gemini.generate(prompt, max_tokens=2000, temperature=0.3)
         
         # Try to parse JSON response
-        try:
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                data = json.loads(json_str)
-                logger.info(f"✅ Interview evaluated: Score {data.get('overall_score', 0)}/100")
-                return data
-        except Exception as e:
-            logger.error(f"Failed to parse Gemini response: {e}")
+        data = loads_lenient(response)
+        if isinstance(data, dict):
+            logger.info(f"✅ Interview evaluated: Score {data.get('overall_score', 0)}/100")
+            return data
+        logger.error("Failed to parse Gemini response")
         
         # Fallback
         return self._evaluate_basic(questions, answers)
@@ -637,11 +686,8 @@ Evaluate NOW:"""
                 logger.info(f"📝 Ollama evaluation response length: {len(result)}")
                 
                 # Parse JSON from response
-                start = result.find('{')
-                end = result.rfind('}') + 1
-                if start >= 0 and end > start:
-                    json_str = result[start:end]
-                    data = json.loads(json_str)
+                data = loads_lenient(result)
+                if isinstance(data, dict):
                     logger.info(f"✅ Interview evaluated: Score {data.get('overall_score', 0)}/100")
                     return data
                 else:
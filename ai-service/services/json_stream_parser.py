@@ -0,0 +1,239 @@
+"""
+Incremental JSON Parser - Tolerant parsing of LLM output
+Consumes streamed tokens, yields each completed array item as soon as it
+closes, and salvages every complete item from truncated responses
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\r\n'
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove markdown code fences (```json ... ```) wrapped around LLM output"""
+    text = (text or '').strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else text[3:]
+    if text.endswith('```'):
+        text = text[:-3]
+    return text.strip()
+
+
+def loads_lenient(text: str, default: Any = None) -> Any:
+    """
+    Parse a complete JSON value embedded anywhere in LLM output
+
+    Handles code fences, leading prose and trailing chatter. Returns
+    `default` when no complete JSON object/array can be decoded.
+    """
+    text = strip_code_fences(text)
+    if not text:
+        return default
+
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    decoder = json.JSONDecoder()
+    starts = sorted(pos for pos in (text.find('{'), text.find('[')) if pos >= 0)
+    for start in starts:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            return value
+        except ValueError:
+            continue
+
+    return default
+
+
+class IncrementalJSONParser:
+    """
+    Streaming parser for LLM responses that contain a JSON array of items
+
+    The items array is either the top-level array or the array stored under
+    `items_key` in the top-level object (the first array value when no key
+    is given). Feed raw text chunks as they arrive; every item is decoded
+    as soon as its closing bracket/quote is seen, so a response cut off
+    mid-item still yields all items completed before the cut.
+    """
+
+    def __init__(self, items_key: Optional[str] = None):
+        self.items_key = items_key
+        self.items: List[Any] = []
+        self.skipped = 0
+
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_buf: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._items_depth: Optional[int] = None
+        self._item_buf: Optional[List[str]] = None
+        self._done = False
+
+    @property
+    def is_complete(self) -> bool:
+        """True once the closing bracket of the items array has been seen"""
+        return self._done
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk of text and return the items completed by it"""
+        completed = []
+        if self._done or not chunk:
+            return completed
+
+        for ch in chunk:
+            if self._done:
+                break
+
+            if self._item_buf is not None:
+                self._item_buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_buf is not None:
+                        self._last_key = ''.join(self._key_buf)
+                        self._key_buf = None
+                    elif self._at_items_level() and self._item_buf is not None and self._item_buf[0] == '"':
+                        self._complete_item(completed)
+                elif self._key_buf is not None:
+                    self._key_buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._at_items_level() and self._item_buf is None:
+                    self._item_buf = [ch]
+                elif self._in_top_object() and self._expect_key:
+                    self._key_buf = []
+            elif ch in '{[':
+                if self._at_items_level() and self._item_buf is None:
+                    self._item_buf = [ch]
+                self._stack.append(ch)
+                if ch == '{' and len(self._stack) == 1:
+                    self._expect_key = True
+                elif ch == '[' and self._items_depth is None and self._is_items_array():
+                    self._items_depth = len(self._stack)
+            elif ch in '}]':
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._items_depth is None:
+                    continue
+                depth = len(self._stack)
+                if depth == self._items_depth and self._item_buf is not None and self._item_buf[0] in '{[':
+                    self._complete_item(completed)
+                elif depth == self._items_depth - 1:
+                    if self._item_buf is not None:
+                        self._item_buf.pop()  # closing bracket of the array
+                        self._complete_item(completed)
+                    self._done = True
+            elif ch == ',':
+                if self._in_top_object():
+                    self._expect_key = True
+                if self._at_items_level() and self._item_buf is not None:
+                    self._item_buf.pop()  # separator
+                    self._complete_item(completed)
+            elif ch == ':':
+                if self._in_top_object():
+                    self._expect_key = False
+            elif ch not in _WHITESPACE and self._at_items_level() and self._item_buf is None:
+                # Scalar item (number, true/false/null)
+                self._item_buf = [ch]
+
+        return completed
+
+    def _at_items_level(self) -> bool:
+        return self._items_depth is not None and len(self._stack) == self._items_depth
+
+    def _in_top_object(self) -> bool:
+        return len(self._stack) == 1 and self._stack[0] == '{'
+
+    def _is_items_array(self) -> bool:
+        if len(self._stack) == 1:
+            return True
+        if len(self._stack) == 2 and self._stack[0] == '{':
+            return self.items_key is None or self._last_key == self.items_key
+        return False
+
+    def _complete_item(self, completed: List[Any]):
+        raw = ''.join(self._item_buf).strip()
+        self._item_buf = None
+        if not raw:
+            return
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            self.skipped += 1
+            logger.debug(f"Skipping malformed JSON item: {raw[:80]}...")
+            return
+        self.items.append(item)
+        completed.append(item)
+
+
+def iter_json_items(chunks: Iterable[str], items_key: Optional[str] = None) -> Iterator[Any]:
+    """Yield array items from a stream of text chunks as soon as each one closes"""
+    parser = IncrementalJSONParser(items_key)
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.is_complete:
+            break
+
+
+def salvage_json_items(text: str, items_key: Optional[str] = None) -> List[Any]:
+    """Return every complete array item found in (possibly truncated) text"""
+    parser = IncrementalJSONParser(items_key)
+    parser.feed(text or '')
+    return parser.items
+
+
+def load_json_items(text: str, items_key: Optional[str] = None) -> List[Any]:
+    """
+    Drop-in replacement for json.loads() on LLM array responses
+
+    Returns the items array (bare or under `items_key`), salvaging complete
+    items when the response is truncated or malformed. Raises
+    json.JSONDecodeError only when nothing at all can be recovered.
+    """
+    data = loads_lenient(text)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        if items_key and isinstance(data.get(items_key), list):
+            return data[items_key]
+        if not items_key:
+            for value in data.values():
+                if isinstance(value, list):
+                    return value
+
+    items = salvage_json_items(text, items_key)
+    if items:
+        logger.warning(f"⚠️ Salvaged {len(items)} complete items from truncated/malformed JSON response")
+        return items
+
+    raise json.JSONDecodeError("No complete JSON items found in response", text or '', 0)
+
+
+def load_json_object(text: str, items_key: str) -> Dict[str, Any]:
+    """
+    Parse a JSON object response such as {"questions": [...], ...}
+
+    Falls back to {items_key: <salvaged items>} when the object is
+    truncated. Raises json.JSONDecodeError when nothing can be recovered.
+    """
+    data = loads_lenient(text)
+    if isinstance(data, dict):
+        return data
+    return {items_key: load_json_items(text, items_key)}
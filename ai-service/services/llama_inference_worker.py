@@ -0,0 +1,196 @@
+"""
+LLaMA Inference Worker - Dedicated threads that own llama-cpp models
+Callers submit prompts over an internal queue and get futures back; each
+worker thread has its own Llama instance, so the non-thread-safe model is
+never shared, and identical in-flight requests are coalesced into one.
+Evaluated states of static prompt prefixes are cached per worker so only
+the variable suffix of a prompt is evaluated
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class LlamaInferenceWorker:
+    """
+    Pool of inference threads over llama-cpp-python
+
+    LLAMA_WORKERS model instances are loaded (each costs a copy of the
+    weights in RAM) and the CPU threads are split between them, so
+    concurrent requests decode in parallel instead of contending for one
+    model. With the default single worker, requests are decoded one after
+    another with all threads, which is still faster than interleaving.
+    """
+
+    def __init__(self, model_path: str, n_ctx: int = None, n_threads: int = None, n_batch: int = None,
+                 n_gpu_layers: int = None, workers: int = None):
+        from llama_cpp import Llama
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
+
+        self.workers = max(1, workers or int(os.getenv('LLAMA_WORKERS', 1)))
+        self.n_ctx = n_ctx or int(os.getenv('LLAMA_N_CTX', 4096))
+        self.n_threads = n_threads or int(os.getenv('LLAMA_N_THREADS', 0)) or max(1, (os.cpu_count() or 4) // self.workers)
+        self.n_batch = n_batch or int(os.getenv('LLAMA_N_BATCH', 512))
+        self.n_gpu_layers = n_gpu_layers if n_gpu_layers is not None else int(os.getenv('LLAMA_N_GPU_LAYERS', 0))
+        # Each saved state holds the KV cache of its prefix (~0.5 MB per token for a 7B model)
+        self.prefix_cache_size = int(os.getenv('LLAMA_PREFIX_CACHE_SIZE', 4))
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._in_flight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+        # Load every model before starting so load errors reach the caller
+        models = [
+            Llama(
+                model_path=model_path,
+                n_ctx=self.n_ctx,
+                n_threads=self.n_threads,
+                n_batch=self.n_batch,
+                n_gpu_layers=self.n_gpu_layers,
+                verbose=False
+            )
+            for _ in range(self.workers)
+        ]
+        for index, model in enumerate(models):
+            thread = threading.Thread(target=self._run, args=(model,), name=f'llama-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"✅ LLaMA inference workers ready: {self.workers} x {self.n_threads} threads, n_ctx={self.n_ctx}")
+
+    @staticmethod
+    def _request_key(prompt: str, params: Dict[str, Any]) -> Tuple:
+        return (prompt,) + tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                                        for name, value in params.items()))
+
+    def submit(self, prompt: str, cache_prefix: str = None, json_mode: bool = False,
+               stop_pattern=None, **params) -> Future:
+        """
+        Queue a completion; the future resolves to the generated text
+
+        `params` are passed to Llama.__call__ (max_tokens, temperature,
+        top_p, stop, ...). `cache_prefix` is the static start of `prompt`
+        whose evaluated state is cached and restored for later prompts.
+        `json_mode` constrains decoding to JSON with a grammar, and
+        decoding ends as soon as the output matches the compiled regex
+        `stop_pattern`. A request identical to one still queued or
+        running shares that request's future.
+        """
+        key = self._request_key(prompt, dict(params, json_mode=json_mode, stop_pattern=getattr(stop_pattern, 'pattern', None)))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda _: self._forget(key))
+        self._queue.put((future, prompt, cache_prefix, json_mode, stop_pattern, params))
+        return future
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, **params) -> str:
+        return self.submit(prompt, **params).result(timeout)
+
+    @staticmethod
+    def _load_json_grammar():
+        """JSON grammar for constrained decoding (None if this llama-cpp build lacks it)"""
+        try:
+            from llama_cpp import LlamaGrammar
+            from llama_cpp.llama_grammar import JSON_GBNF
+            return LlamaGrammar.from_string(JSON_GBNF, verbose=False)
+        except Exception as e:
+            logger.warning(f"⚠️ JSON grammar unavailable, decoding unconstrained: {str(e)}")
+            return None
+
+    @property
+    def pending(self) -> int:
+        """Requests queued or being decoded"""
+        return len(self._in_flight)
+
+    def _forget(self, key: Tuple):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _run(self, model):
+        prefix_states: "OrderedDict[str, Any]" = OrderedDict()
+        current_prefix = None  # Prefix whose tokens the model's KV cache currently starts with
+        json_grammar = False  # Loaded on first use; grammars keep parse state, so one per worker
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            future, prompt, cache_prefix, json_mode, early_stop, params = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if json_mode:
+                    if json_grammar is False:
+                        json_grammar = self._load_json_grammar()
+                    if json_grammar is not None:
+                        params = dict(params, grammar=json_grammar)
+                if cache_prefix and self.prefix_cache_size > 0:
+                    current_prefix = self._restore_prefix(model, cache_prefix, current_prefix, prefix_states)
+                else:
+                    current_prefix = None
+                # llama-cpp only evaluates the tokens after the longest prefix already in its KV cache
+                if early_stop is None:
+                    response = model(prompt, echo=False, **params)
+                    future.set_result(response['choices'][0]['text'].strip())
+                else:
+                    future.set_result(self._generate_until(model, prompt, early_stop, params))
+            except Exception as e:
+                current_prefix = None
+                future.set_exception(e)
+
+    @staticmethod
+    def _generate_until(model, prompt: str, early_stop, params: Dict[str, Any]) -> str:
+        """Stream tokens and stop decoding once the output matches `early_stop`"""
+        text = ''
+        stream = model(prompt, echo=False, stream=True, **params)
+        try:
+            for chunk in stream:
+                text += chunk['choices'][0]['text']
+                if early_stop.search(text):
+                    break
+        finally:
+            stream.close()
+        return text.strip()
+
+    def _restore_prefix(self, model, prefix: str, current_prefix: Optional[str], states: "OrderedDict[str, Any]") -> str:
+        """Make the model's KV cache start with `prefix`, from the state cache when possible"""
+        key = hashlib.sha1(prefix.encode('utf-8')).hexdigest()
+        if key == current_prefix:
+            return key  # The previous request left this prefix in place
+
+        state = states.get(key)
+        if state is not None:
+            states.move_to_end(key)
+            model.load_state(state)
+            return key
+
+        model.reset()
+        model.eval(model.tokenize(prefix.encode('utf-8')))
+        states[key] = model.save_state()
+        while len(states) > self.prefix_cache_size:
+            states.popitem(last=False)
+        return key
+
+    def close(self, timeout: float = 5):
+        """Stop the workers once the queued requests are done"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
@@ -0,0 +1,224 @@
+"""
+LLM Router - Latency-aware routing across AI providers
+Keeps rolling latency and error stats per provider, tries the fastest
+healthy one first, skips providers whose circuit breaker is open and can
+hedge: when the first provider has not answered by its p95 latency, the
+next one is started too and whichever succeeds first wins
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Shared by every router; hedged calls that lose keep running here until their own timeout
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('LLM_ROUTER_WORKERS', 16)), thread_name_prefix='llm-router')
+
+
+class AllProvidersFailed(Exception):
+    """Every provider failed, timed out or had its circuit open"""
+
+
+class ProviderHealth:
+    """Rolling latency window, recent outcomes and circuit breaker state of one provider"""
+
+    def __init__(self, window: int):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class LLMRouter:
+    """
+    Routes one task (resume analysis, PDF extraction, ...) across providers
+
+    Providers are passed per call as (name, fn) pairs in the caller's
+    preferred order; `fn` takes no arguments and raises (or returns an
+    output rejected by `accept`) on failure. Measured providers go first,
+    ordered by median latency weighted by their error rate; untried ones
+    follow in the caller's order, so they are only measured when the
+    providers ahead of them fail or are hedged. Providers named in
+    `local_providers` (a single local model worker) are never started as a
+    hedge, only after everything ahead of them failed. After LLM_ROUTER_FAILURE_THRESHOLD consecutive failures a
+    provider is skipped for LLM_ROUTER_COOLDOWN seconds, then a single
+    trial call decides whether it is used again.
+    """
+
+    def __init__(self, task: str, failure_threshold: int = None, cooldown: float = None, hedge: bool = None,
+                 hedge_min_delay: float = None, hedge_default_delay: float = None, window: int = None,
+                 local_providers: Sequence[str] = ()):
+        self.task = task
+        self.local_providers = frozenset(local_providers)
+        self.failure_threshold = failure_threshold or int(os.getenv('LLM_ROUTER_FAILURE_THRESHOLD', 3))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('LLM_ROUTER_COOLDOWN', 60))
+        if hedge is None:
+            hedge = os.getenv('LLM_ROUTER_HEDGE', 'false').lower() in ('1', 'true', 'yes')
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else float(os.getenv('LLM_ROUTER_HEDGE_MIN_DELAY', 1.0))
+        # Hedge delay for a provider without latency samples yet
+        self.hedge_default_delay = hedge_default_delay if hedge_default_delay is not None else float(os.getenv('LLM_ROUTER_HEDGE_DELAY', 8.0))
+        self.window = window or int(os.getenv('LLM_ROUTER_WINDOW', 50))
+
+        self._health: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get_health(self, name: str) -> ProviderHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = ProviderHealth(self.window)
+        return health
+
+    def _admit(self, name: str, now: float) -> bool:
+        """Whether `name` may be called now; moves an open circuit to half-open after the cooldown"""
+        health = self._get_health(name)
+        if health.state == CLOSED:
+            return True
+        if health.state == OPEN and now >= health.open_until:
+            health.state = HALF_OPEN
+            health.trial_in_flight = False
+        if health.state == HALF_OPEN and not health.trial_in_flight:
+            health.trial_in_flight = True
+            return True
+        return False
+
+    def _expected_latency(self, name: str) -> float:
+        health = self._get_health(name)
+        median = health.percentile(0.5)
+        if median is None:
+            return float('inf')  # Untried: behind every measured provider, in the caller's order
+        return median / max(1 - health.error_rate, 0.1)
+
+    def _order(self, providers: Sequence[Tuple[str, Callable[[], Any]]]) -> List[Tuple[str, Callable[[], Any]]]:
+        now = time.monotonic()
+        with self._lock:
+            ready = [provider for provider in providers if self._admit(provider[0], now)]
+            # sorted() is stable, so untried providers keep the caller's order
+            return sorted(ready, key=lambda provider: self._expected_latency(provider[0]))
+
+    def _hedge_delay(self, name: str) -> float:
+        with self._lock:
+            p95 = self._get_health(name).percentile(0.95)
+        return self.hedge_default_delay if p95 is None else max(self.hedge_min_delay, p95)
+
+    def record(self, name: str, latency: float, success: bool):
+        with self._lock:
+            health = self._get_health(name)
+            health.outcomes.append(1 if success else 0)
+            if success:
+                health.latencies.append(latency)
+                health.consecutive_failures = 0
+                if health.state != CLOSED:
+                    logger.info(f"✅ {self.task}: {name} recovered, circuit closed")
+                health.state = CLOSED
+                return
+
+            health.consecutive_failures += 1
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+                health.state = OPEN
+                health.open_until = time.monotonic() + self.cooldown
+                health.trial_in_flight = False
+                logger.warning(f"⚠️ {self.task}: {name} circuit open for {self.cooldown:.0f}s "
+                               f"after {health.consecutive_failures} consecutive failures")
+
+    def _timed(self, name: str, fn: Callable[[], Any], accept: Optional[Callable[[Any], bool]]) -> Any:
+        start = time.monotonic()
+        try:
+            result = fn()
+            if accept is not None and not accept(result):
+                raise ValueError(f"{name} returned an unusable response")
+        except Exception:
+            self.record(name, time.monotonic() - start, False)
+            raise
+        self.record(name, time.monotonic() - start, True)
+        return result
+
+    def call(self, providers: Sequence[Tuple[str, Callable[[], Any]]],
+             accept: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Result of the first provider to succeed
+
+        Without hedging, providers are tried one after another. With it, the
+        next provider is also started once the running ones have taken
+        longer than the p95 latency of the last one started, so a slow
+        provider costs at most its usual tail before an alternative runs.
+        Raises AllProvidersFailed when no provider produced a result.
+        """
+        candidates = self._order(providers)
+        if not candidates:
+            raise AllProvidersFailed(f"{self.task}: no provider available (all circuits open)")
+
+        pending: Dict[Any, str] = {}
+        errors: List[str] = []
+        try:
+            while candidates or pending:
+                if not pending:
+                    name, fn = candidates.pop(0)
+                    pending[_executor.submit(self._timed, name, fn, accept)] = name
+                    last_started = name
+
+                can_hedge = self.hedge and candidates and candidates[0][0] not in self.local_providers
+                delay = self._hedge_delay(last_started) if can_hedge else None
+                done, _ = wait(list(pending), timeout=delay, return_when=FIRST_COMPLETED)
+                if not done:
+                    name, fn = candidates.pop(0)
+                    logger.info(f"⏱️ {self.task}: {last_started} slower than {delay:.1f}s, hedging with {name}")
+                    pending[_executor.submit(self._timed, name, fn, accept)] = name
+                    last_started = name
+                    continue
+
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors.append(f"{name}: {e}")
+                        logger.warning(f"⚠️ {self.task}: {name} failed: {e}")
+                        continue
+                    if pending:
+                        logger.info(f"🏁 {self.task}: {name} answered first, abandoning {', '.join(pending.values())}")
+                    return result
+        finally:
+            # Half-open providers that were admitted but never started get their trial back
+            with self._lock:
+                for name, _ in candidates:
+                    self._get_health(name).trial_in_flight = False
+
+        raise AllProvidersFailed(f"{self.task}: all providers failed ({'; '.join(errors)})")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider latency percentiles, error rate and circuit state"""
+        with self._lock:
+            return {
+                name: {
+                    'state': health.state,
+                    'p50': health.percentile(0.5),
+                    'p95': health.percentile(0.95),
+                    'error_rate': round(health.error_rate, 3),
+                    'samples': len(health.outcomes)
+                }
+                for name, health in self._health.items()
+            }
@@ -6,20 +6,85 @@ Supports both Ollama and llama-cpp-python
 import os
 import logging
 from typing import Optional, Dict, Any
+import json
 import requests
+from services.decoding_profiles import get_profile, stop_pattern
+from services.json_stream_parser import loads_lenient
 
 logger = logging.getLogger(__name__)
 
 class LLMService:
+    # Static per-role system prompts; they open every chat prompt so the
+    # evaluated prefix can be reused across messages
+    ROLE_SYSTEM_PROMPTS = {
+        'admin': """You are an AI HR Assistant helping an HR Admin. 
+
+Your capabilities:
+- Generate job descriptions
+- Screen candidates and explain ATS system
+- Draft professional emails (interview invites, offers, rejections)
+- Provide recruitment analytics insights
+- Explain HR policies and best practices
+- Guide through HRMS features
+
+Be helpful, professional, and provide actionable advice. If asked about system features, explain step-by-step.""",
+        
+        'hr': """You are an AI HR Assistant helping an HR professional.
+
+Your capabilities:
+- Generate job descriptions for any role
+- Explain ATS screening system (Skills 35%, Keywords 20%, Experience 25%, Education 10%, AI 10%)
+- Draft professional emails (interview invitations, job offers, rejections, reminders)
+- Guide through candidate screening process
+- Provide recruitment best practices
+- Help with employee relations questions
+
+Be conversational, helpful, and provide specific examples when possible.""",
+        
+        'manager': """You are an AI assistant helping a team manager.
+
+Your capabilities:
+- Provide guidance on team performance management
+- Help with employee development strategies
+- Explain leave and attendance policies
+- Assist with performance review questions
+- Offer leadership tips
+
+Be supportive and provide practical management advice.""",
+        
+        'employee': """You are an AI assistant helping an employee.
+
+Your capabilities:
+- Answer questions about leave policies
+- Explain payroll and benefits
+- Help with attendance queries
+- Provide general HR information
+- Guide through self-service features
+
+Be friendly and helpful. Do not share confidential company data.""",
+        
+        'candidate': """You are an AI assistant helping a job candidate.
+
+Your capabilities:
+- Help with application status questions
+- Provide interview preparation tips
+- Explain the hiring process
+- Answer job-related questions
+
+Be encouraging and professional."""
+    }
+
     def __init__(self):
         self.model = None
         self.use_ollama = os.getenv('USE_OLLAMA', 'true').lower() == 'true'
         self.ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434')
         self.ollama_model = os.getenv('OLLAMA_MODEL', 'llama2:7b-chat')
+        self.ollama_keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
         self.model_path = os.getenv('MODEL_PATH', './models/llama-2-7b-chat.gguf')
         self.max_tokens = int(os.getenv('MAX_TOKENS', 2048))
         self.temperature = float(os.getenv('TEMPERATURE', 0.7))
         self.top_p = float(os.getenv('TOP_P', 0.95))
+        self.inference_timeout = float(os.getenv('LLAMA_INFERENCE_TIMEOUT', 300))
         
         if self.use_ollama:
             self._check_ollama()
@@ -53,17 +118,14 @@ class LLMService:
     def _load_model(self):
         """Load LLaMA model using llama-cpp-python"""
         try:
-            from llama_cpp import Llama
+            from services.llama_inference_worker import LlamaInferenceWorker
             
             logger.info(f"Loading LLaMA model from {self.model_path}")
             
-            self.model = Llama(
-                model_path=self.model_path,
-                n_ctx=4096,  # Context window
-                n_threads=4,  # CPU threads
-                n_gpu_layers=0,  # Set to >0 if you have GPU
-                verbose=False
-            )
+            # The worker owns the (non-thread-safe) model; Flask threads submit
+            # prompts to it. Threads, context size, batch size and GPU layers
+            # come from LLAMA_* settings
+            self.model = LlamaInferenceWorker(self.model_path)
             
             logger.info("✅ LLaMA model loaded successfully")
         except FileNotFoundError:
@@ -80,7 +142,9 @@ class LLMService:
     
     def generate(self, prompt: str, max_tokens: Optional[int] = None, 
                  temperature: Optional[float] = None, 
-                 stop: Optional[list] = None) -> str:
+                 stop: Optional[list] = None,
+                 cache_prefix: Optional[str] = None,
+                 profile: Optional[str] = None) -> str:
         """
         Generate text from prompt
         
@@ -89,6 +153,10 @@ class LLMService:
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
             stop: Stop sequences
+            cache_prefix: Static start of `prompt` (system/instruction text)
+                whose evaluated state may be cached and reused
+            profile: Decoding profile name (see decoding_profiles) supplying
+                defaults for the above plus early stop and JSON mode
             
         Returns:
             Generated text
@@ -96,48 +164,85 @@ class LLMService:
         if not self.model:
             return self._fallback_response(prompt)
         
+        if cache_prefix and not prompt.startswith(cache_prefix):
+            cache_prefix = None
+        
+        settings = get_profile(profile)
+        max_tokens = max_tokens or settings.get('max_tokens') or self.max_tokens
+        temperature = temperature or settings.get('temperature') or self.temperature
+        stop = stop or settings.get('stop') or ["</s>", "Human:", "User:"]
+        json_mode = settings.get('json', False)
+        early_stop = stop_pattern(settings)
+        
         try:
             if self.use_ollama and self.model == "ollama":
-                return self._generate_ollama(prompt, max_tokens, temperature)
+                return self._generate_ollama(prompt, max_tokens, temperature, stop, json_mode, early_stop)
             else:
-                response = self.model(
+                return self.model.generate(
                     prompt,
-                    max_tokens=max_tokens or self.max_tokens,
-                    temperature=temperature or self.temperature,
+                    timeout=self.inference_timeout,
+                    cache_prefix=cache_prefix,
+                    json_mode=json_mode,
+                    stop_pattern=early_stop,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
                     top_p=self.top_p,
-                    stop=stop or ["</s>", "Human:", "User:"],
-                    echo=False
+                    stop=stop
                 )
-                
-                return response['choices'][0]['text'].strip()
         except Exception as e:
             logger.error(f"Error generating text: {str(e)}")
             return self._fallback_response(prompt)
     
     def _generate_ollama(self, prompt: str, max_tokens: Optional[int] = None,
-                         temperature: Optional[float] = None) -> str:
+                         temperature: Optional[float] = None, stop: Optional[list] = None,
+                         json_mode: bool = False, early_stop=None) -> str:
         """Generate text using Ollama API"""
+        payload = {
+            "model": self.ollama_model,
+            "prompt": prompt,
+            # Stream when the output can be cut short once its last field is written
+            "stream": early_stop is not None,
+            # Keep the model (and the KV cache of the shared prompt prefix) loaded between requests
+            "keep_alive": self.ollama_keep_alive,
+            "options": {
+                "num_predict": max_tokens or self.max_tokens,
+                "temperature": temperature or self.temperature,
+                "top_p": self.top_p
+            }
+        }
+        if stop:
+            payload["options"]["stop"] = stop
+        if json_mode:
+            payload["format"] = "json"
+        
         try:
             response = requests.post(
                 f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.ollama_model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "num_predict": max_tokens or self.max_tokens,
-                        "temperature": temperature or self.temperature,
-                        "top_p": self.top_p
-                    }
-                },
-                timeout=120
+                json=payload,
+                timeout=120,
+                stream=early_stop is not None
             )
             
-            if response.status_code == 200:
-                return response.json().get('response', '').strip()
-            else:
+            if response.status_code != 200:
                 logger.error(f"Ollama API error: {response.status_code}")
                 return self._fallback_response(prompt)
+            
+            if early_stop is None:
+                return response.json().get('response', '').strip()
+            
+            text = ''
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    text += chunk.get('response', '')
+                    if chunk.get('done') or early_stop.search(text):
+                        break
+            finally:
+                # Closing the stream makes Ollama stop decoding
+                response.close()
+            return text.strip()
         except Exception as e:
             logger.error(f"Error calling Ollama: {str(e)}")
             return self._fallback_response(prompt)
@@ -161,65 +266,7 @@ class LLMService:
         user_name = context.get('user_name', 'there')
         conversation_history = context.get('conversation_history', [])
         
-        system_prompts = {
-            'admin': f"""You are an AI HR Assistant helping {user_name}, an HR Admin. 
-
-Your capabilities:
-- Generate job descriptions
-- Screen candidates and explain ATS system
-- Draft professional emails (interview invites, offers, rejections)
-- Provide recruitment analytics insights
-- Explain HR policies and best practices
-- Guide through HRMS features
-
-Be helpful, professional, and provide actionable advice. If asked about system features, explain step-by-step.""",
-            
-            'hr': f"""You are an AI HR Assistant helping {user_name}, an HR professional.
-
-Your capabilities:
-- Generate job descriptions for any role
-- Explain ATS screening system (Skills 35%, Keywords 20%, Experience 25%, Education 10%, AI 10%)
-- Draft professional emails (interview invitations, job offers, rejections, reminders)
-- Guide through candidate screening process
-- Provide recruitment best practices
-- Help with employee relations questions
-
-Be conversational, helpful, and provide specific examples when possible.""",
-            
-            'manager': f"""You are an AI assistant helping {user_name}, a team manager.
-
-Your capabilities:
-- Provide guidance on team performance management
-- Help with employee development strategies
-- Explain leave and attendance policies
-- Assist with performance review questions
-- Offer leadership tips
-
-Be supportive and provide practical management advice.""",
-            
-            'employee': f"""You are an AI assistant helping {user_name}, an employee.
-
-Your capabilities:
-- Answer questions about leave policies
-- Explain payroll and benefits
-- Help with attendance queries
-- Provide general HR information
-- Guide through self-service features
-
-Be friendly and helpful. Do not share confidential company data.""",
-            
-            'candidate': f"""You are an AI assistant helping {user_name}, a job candidate.
-
-Your capabilities:
-- Help with application status questions
-- Provide interview preparation tips
-- Explain the hiring process
-- Answer job-related questions
-
-Be encouraging and professional."""
-        }
-        
-        system_prompt = system_prompts.get(user_role, system_prompts['employee'])
+        system_prompt = self.ROLE_SYSTEM_PROMPTS.get(user_role, self.ROLE_SYSTEM_PROMPTS['employee'])
         
         # Build conversation context
         conversation_context = ""
@@ -233,10 +280,16 @@ Be encouraging and professional."""
                 elif role == 'assistant':
                     conversation_context += f"Assistant: {content}\n"
         
+        # Static role prompt first, so its evaluated state is reused across messages;
+        # everything that varies per user or message follows it
+        prefix = f"""<s>[INST] <<SYS>>
+{system_prompt}
+"""
+        
         # Create prompt with context
         if conversation_context:
-            prompt = f"""<s>[INST] <<SYS>>
-{system_prompt}
+            prompt = prefix + f"""
+You are talking to {user_name}.
 
 Previous conversation:
 {conversation_context}
@@ -246,15 +299,15 @@ Current question: {message}
 
 Provide a helpful, specific response based on the conversation context. [/INST]"""
         else:
-            prompt = f"""<s>[INST] <<SYS>>
-{system_prompt}
+            prompt = prefix + f"""
+You are talking to {user_name}.
 <</SYS>>
 
 {message}
 
 Provide a helpful, specific response. [/INST]"""
         
-        return self.generate(prompt, max_tokens=512, temperature=0.7)
+        return self.generate(prompt, cache_prefix=prefix, profile='chat')
     
     def extract_json(self, text: str, prompt: str) -> Dict[str, Any]:
         """
@@ -267,28 +320,19 @@ Provide a helpful, specific response. [/INST]"""
         Returns:
             Extracted data as dictionary
         """
-        full_prompt = f"""<s>[INST] {prompt}
+        prefix = f"""<s>[INST] {prompt}
 
-Text:
-{text}
+Respond ONLY with valid JSON, no additional text.
 
-Respond ONLY with valid JSON, no additional text. [/INST]"""
+Text:
+"""
+        full_prompt = prefix + f"""{text} [/INST]"""
         
-        response = self.generate(full_prompt, max_tokens=1024, temperature=0.3)
+        response = self.generate(full_prompt, cache_prefix=prefix, profile='json_extract')
         
-        # Try to parse JSON
-        import json
-        try:
-            # Find JSON in response
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                return json.loads(json_str)
-            else:
-                return {}
-        except:
-            return {}
+        # Tolerant parse: handles code fences, surrounding prose and trailing chatter
+        data = loads_lenient(response)
+        return data if isinstance(data, dict) else {}
     
     def _fallback_response(self, prompt: str) -> str:
         """Enhanced fallback response when model is not available"""
@@ -0,0 +1,138 @@
+"""
+Near-Duplicate Index - MinHash/LSH index over word shingles
+Each question is reduced to a fixed-size MinHash signature and bucketed by
+bands, so checking a new question only compares it with the few stored
+questions that share a band instead of the whole bank. Band keys are
+stable across processes, so they can also be stored with each question and
+matched in the database
+"""
+
+import hashlib
+import os
+import re
+import threading
+from array import array
+from typing import Dict, List, Optional, Set
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """Word n-grams of the normalized text (the whole text if it is shorter than `size` words)"""
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    Thread-safe MinHash/LSH index answering "is there a stored text whose
+    estimated Jaccard similarity with this one is at least `threshold`?"
+
+    `bands` * `rows` hash functions are used; texts sharing every row of at
+    least one band become candidates and are then verified on the full
+    signature. Exact repeats are recognised by fingerprint and never re-hashed.
+    """
+
+    def __init__(self, threshold: float = None, bands: int = 20, rows: int = 3, shingle_size: int = 3):
+        self.threshold = threshold if threshold is not None else float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.6))
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+        self.shingle_size = shingle_size
+
+        self._signatures: List[array] = []
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._fingerprints: Set[bytes] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(text: str) -> bytes:
+        normalized = ' '.join(_WORD_RE.findall((text or '').lower()))
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+
+    def signature(self, text: str) -> Optional[array]:
+        """MinHash signature of `text`, or None if it has no words"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return None
+        # One SHAKE digest per shingle yields all num_perm 32-bit hash values at once
+        hashes = [array('I', hashlib.shake_128(gram.encode('utf-8')).digest(4 * self.num_perm)) for gram in grams]
+        return array('I', map(min, zip(*hashes)))
+
+    def band_keys(self, signature: array) -> List[int]:
+        """One 48-bit key per band (exact in JSON and JavaScript numbers), stable across processes"""
+        rows = self.rows
+        return [
+            int.from_bytes(hashlib.blake2b(
+                signature[band * rows:(band + 1) * rows].tobytes(), digest_size=6, person=band.to_bytes(2, 'big')
+            ).digest(), 'big')
+            for band in range(self.bands)
+        ]
+
+    def _best_match(self, signature: array, band_keys: List[int]) -> float:
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best = 0.0
+        for doc_id in candidates:
+            matches = sum(a == b for a, b in zip(signature, self._signatures[doc_id]))
+            best = max(best, matches / self.num_perm)
+        return best
+
+    def _insert(self, signature: array, band_keys: List[int]):
+        doc_id = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in enumerate(band_keys):
+            self._buckets[band].setdefault(key, []).append(doc_id)
+
+    def similarity(self, text: str) -> float:
+        """Highest estimated Jaccard similarity between `text` and any indexed text"""
+        fingerprint = self._fingerprint(text)
+        if fingerprint in self._fingerprints:
+            return 1.0
+        signature = self.signature(text)
+        if signature is None:
+            return 0.0
+        band_keys = self.band_keys(signature)
+        with self._lock:
+            return self._best_match(signature, band_keys)
+
+    def is_near_duplicate(self, text: str) -> bool:
+        return self.similarity(text) >= self.threshold
+
+    def add(self, text: str) -> bool:
+        """Index `text`; returns False if the exact text was already indexed"""
+        fingerprint = self._fingerprint(text)
+        if fingerprint in self._fingerprints:
+            return False
+        signature = self.signature(text)
+        with self._lock:
+            if fingerprint in self._fingerprints:
+                return False
+            self._fingerprints.add(fingerprint)
+            if signature is not None:
+                self._insert(signature, self.band_keys(signature))
+        return True
+
+    def add_if_new(self, text: str) -> bool:
+        """Atomically index `text` unless it is a near-duplicate of an indexed text"""
+        fingerprint = self._fingerprint(text)
+        if fingerprint in self._fingerprints:
+            return False
+        signature = self.signature(text)
+        with self._lock:
+            if fingerprint in self._fingerprints:
+                return False
+            if signature is not None:
+                band_keys = self.band_keys(signature)
+                if self._best_match(signature, band_keys) >= self.threshold:
+                    return False
+                self._insert(signature, band_keys)
+            self._fingerprints.add(fingerprint)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
@@ -9,13 +9,16 @@ import logging
 from typing import List, Dict, Any
 from services.gemini_service import GeminiService
 from services.huggingface_service import HuggingFaceService
+from services.json_stream_parser import load_json_items, strip_code_fences
+from services.llm_router import LLMRouter, AllProvidersFailed
 
 logger = logging.getLogger(__name__)
 
 class PDFQuestionExtractor:
-    def __init__(self):
-        self.gemini = GeminiService()
+    def __init__(self, gemini_service=None):
+        self.gemini = gemini_service or GeminiService()
         self.huggingface = HuggingFaceService()  # Primary extraction method
+        self.router = LLMRouter('pdf_extraction', local_providers=('ollama',))
     
     def extract_text_from_pdf(self, pdf_file) -> str:
         """Extract text content from PDF file"""
@@ -90,105 +93,32 @@ Extract up to {num_questions} questions.
             logger.info("🤖 Using AI to parse questions from PDF text...")
             logger.info(f"📤 Sending {len(text)} characters to AI for analysis")
             
-            # Try Gemini FIRST (fast, reliable, already working!)
-            response = ""
-            
+            # Gemini is preferred (fast, reliable); the router moves to Ollama when it is faster or Gemini is failing
+            providers = []
             if self.gemini and self.gemini.is_available():
-                try:
-                    logger.info("🚀 Using Gemini AI for FAST extraction...")
-                    
-                    # Simpler prompt for faster processing
-                    simple_prompt = f"""Extract all interview questions from this text and return ONLY a JSON array.
-
-TEXT:
-{text}
-
-Return format (pure JSON, no markdown):
-[
-  {{"text":"What is the difference between id and class in HTML?","type":"technical","duration":180}},
-  {{"text":"What is the box model in CSS?","type":"technical","duration":180}}
-]
-
-Question types: technical, behavioral, general, or coding
-Extract up to {num_questions} questions. Return ONLY the JSON array:"""
-
-                    response = self.gemini.generate(simple_prompt, max_tokens=2000, temperature=0.2)
-                    logger.info(f"✅ Gemini extraction complete ({len(response)} chars)")
-                except Exception as e:
-                    logger.error(f"Gemini failed: {e}")
-                    response = ""
+                providers.append(('gemini', lambda: self._extract_with_gemini(text, num_questions)))
+            providers.append(('ollama', lambda: self._extract_with_ollama(text)))
             
-            # Fallback 1: Try Ollama if Gemini fails (optimized for speed)
-            if not response or len(response.strip()) < 10:
-                try:
-                    logger.info("🔄 Gemini unavailable, trying Ollama llama3 (optimized)...")
-                    import requests
-                    
-                    # Ultra-short prompt for faster processing
-                    short_prompt = f"""Questions from PDF (return JSON only):
-
-{text[:1500]}
-
-Format:
-[{{"text":"Q1","type":"technical","duration":180}},{{"text":"Q2","type":"general","duration":180}}]
-
-JSON:"""
-
-                    ollama_response = requests.post(
-                        'http://localhost:11434/api/generate',
-                        json={
-                            'model': 'llama3:latest',
-                            'prompt': short_prompt,
-                            'stream': False,
-                            'options': {
-                                'temperature': 0.3,  # Higher temp = faster
-                                'num_predict': 1000,  # Fewer tokens = faster
-                                'top_k': 40,
-                                'top_p': 0.9
-                            }
-                        },
-                        timeout=45  # Shorter timeout
-                    )
-                    if ollama_response.status_code == 200:
-                        response = ollama_response.json().get('response', '')
-                        logger.info("✅ Ollama extraction complete")
-                except Exception as e:
-                    logger.error(f"Ollama failed: {e}")
-                    response = ""
+            try:
+                response = self.router.call(providers, accept=lambda result: len(result.strip()) >= 10)
+            except AllProvidersFailed as e:
+                logger.error(f"❌ {e}")
+                response = ""
             
             logger.info("📥 Received response from AI")
             logger.info(f"Response length: {len(response)} characters")
             logger.info(f"Response preview: {response[:300]}...")
             
             if not response or len(response.strip()) < 10:
-                raise Exception("Both Gemini and Ollama returned empty response")
+                raise Exception("Gemini and Ollama returned no usable response")
             
             # Clean response - remove markdown if present
-            response_text = response.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
+            response_text = strip_code_fences(response)
             
             logger.info(f"Cleaned response: {response_text[:300]}...")
             
-            # Parse JSON - find the JSON array within the response
-            try:
-                questions = json.loads(response_text)
-            except json.JSONDecodeError:
-                # Try to extract JSON array from text
-                start_bracket = response_text.find('[')
-                end_bracket = response_text.rfind(']')
-                
-                if start_bracket >= 0 and end_bracket > start_bracket:
-                    json_str = response_text[start_bracket:end_bracket + 1]
-                    logger.info(f"Extracted JSON from position {start_bracket} to {end_bracket}")
-                    questions = json.loads(json_str)
-                else:
-                    raise
+            # Parse JSON array - salvages complete questions from truncated output
+            questions = load_json_items(response_text, 'questions')
             
             # Ensure all questions have required fields with defaults
             processed_questions = []
@@ -224,6 +154,62 @@ JSON:"""
             logger.error(traceback.format_exc())
             return self._create_fallback_questions(text[:1000], job_title)
     
+    def _extract_with_gemini(self, text: str, num_questions: int) -> str:
+        logger.info("🚀 Using Gemini AI for FAST extraction...")
+        
+        # Simpler prompt for faster processing
+        simple_prompt = f"""Extract all interview questions from this text and return ONLY a JSON array.
+
+TEXT:
+{text}
+
+Return format (pure JSON, no markdown):
+[
+  {{"text":"What is the difference between id and class in HTML?","type":"technical","duration":180}},
+  {{"text":"What is the box model in CSS?","type":"technical","duration":180}}
+]
+
+Question types: technical, behavioral, general, or coding
+Extract up to {num_questions} questions. Return ONLY the JSON array:"""
+
+        response = self.gemini.generate(simple_prompt, max_tokens=2000, temperature=0.2)
+        logger.info(f"✅ Gemini extraction complete ({len(response)} chars)")
+        return response
+    
+    def _extract_with_ollama(self, text: str) -> str:
+        logger.info("🔄 Trying Ollama llama3 (optimized)...")
+        import requests
+        
+        # Ultra-short prompt for faster processing
+        short_prompt = f"""Questions from PDF (return JSON only):
+
+{text[:1500]}
+
+Format:
+[{{"text":"Q1","type":"technical","duration":180}},{{"text":"Q2","type":"general","duration":180}}]
+
+JSON:"""
+
+        ollama_response = requests.post(
+            'http://localhost:11434/api/generate',
+            json={
+                'model': 'llama3:latest',
+                'prompt': short_prompt,
+                'stream': False,
+                'options': {
+                    'temperature': 0.3,  # Higher temp = faster
+                    'num_predict': 1000,  # Fewer tokens = faster
+                    'top_k': 40,
+                    'top_p': 0.9
+                }
+            },
+            timeout=45  # Shorter timeout
+        )
+        if ollama_response.status_code != 200:
+            raise Exception(f"Ollama returned {ollama_response.status_code}")
+        logger.info("✅ Ollama extraction complete")
+        return ollama_response.json().get('response', '')
+    
     def _create_fallback_questions(self, text_sample: str, job_title: str) -> List[Dict[str, Any]]:
         """Create basic fallback questions if AI parsing fails"""
         logger.warning("⚠️ Using fallback questions - AI parsing failed")
@@ -302,6 +288,3 @@ JSON:"""
                 'error': str(e),
                 'questions': []
             }
-
-# Global instance
-pdf_extractor = PDFQuestionExtractor()
@@ -9,15 +9,67 @@ Uses approach similar to HireVue, HackerRank, CodeSignal
 
 import logging
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 import re
 
+from services.groq_evaluator import GroqEvaluator
+from services.reference_answer_index import ReferenceAnswerIndex
+from services.semantic_scorer import SemanticAnswerScorer
+
 logger = logging.getLogger(__name__)
 
 class ProfessionalEvaluator:
+    # Correct expansions for acronym questions
+    EXPANSIONS = {
+        'html': {
+            'correct': ['hyper text markup language', 'hypertext markup language'],
+            'keywords': ['hyper', 'text', 'markup', 'language']
+        },
+        'css': {
+            'correct': ['cascading style sheets', 'cascading style sheet'],
+            'keywords': ['cascading', 'style', 'sheets', 'sheet']
+        },
+        'js': {
+            'correct': ['javascript'],
+            'keywords': ['javascript']
+        },
+        'javascript': {
+            'correct': ['javascript'],
+            'keywords': ['javascript']
+        },
+        'sql': {
+            'correct': ['structured query language'],
+            'keywords': ['structured', 'query', 'language']
+        },
+        'api': {
+            'correct': ['application programming interface'],
+            'keywords': ['application', 'programming', 'interface']
+        },
+        'url': {
+            'correct': ['uniform resource locator'],
+            'keywords': ['uniform', 'resource', 'locator']
+        },
+        'http': {
+            'correct': ['hypertext transfer protocol', 'hyper text transfer protocol'],
+            'keywords': ['hypertext', 'transfer', 'protocol']
+        },
+        'https': {
+            'correct': ['hypertext transfer protocol secure', 'hyper text transfer protocol secure'],
+            'keywords': ['hypertext', 'transfer', 'protocol', 'secure']
+        }
+    }
+    
     def __init__(self):
         """Initialize professional evaluator with reference answers and rubrics"""
         
+        # Single long-lived GROQ client shared by all (concurrent) answer evaluations
+        self.groq_evaluator = GroqEvaluator()
+        self.max_concurrency = max(int(os.getenv('EVALUATION_CONCURRENCY', 5)), 1)
+        # Grade all answers of an interview in one (or a few) GROQ calls
+        self.batch_grading = os.getenv('GROQ_BATCH_GRADING', 'true').lower() in ('1', 'true', 'yes')
+        
         # Reference answers database (like HackerRank does)
         self.reference_answers = {
             "id class html": {
@@ -98,6 +150,16 @@ class ProfessionalEvaluator:
                 "min_acceptable": "side effects after render"
             }
         }
+        
+        # Reference answers are indexed and embedded once; known questions are graded locally
+        self.reference_index = ReferenceAnswerIndex(self.reference_answers)
+        bank_path = os.getenv('REFERENCE_ANSWERS_PATH')
+        if bank_path:
+            try:
+                self.reference_index.load_file(bank_path)
+            except Exception as e:
+                logger.error(f"❌ Failed to load reference answers from {bank_path}: {str(e)}")
+        self.semantic_scorer = SemanticAnswerScorer(index=self.reference_index)
     
     def evaluate_interview(self, questions: List[Dict], answers: List[Dict], job_title: str, candidate_name: str) -> Dict[str, Any]:
         """
@@ -111,31 +173,29 @@ class ProfessionalEvaluator:
         completeness_scores = []
         communication_scores = []
         
-        for q, a in zip(questions, answers):
-            question_text = q.get('text', '').lower()
-            answer_text = a.get('answer', '').lower().strip()
-            
-            if not answer_text or len(answer_text) < 10:
-                # No answer or too short
-                score_data = {
-                    "question": q.get('text', 'Question'),
-                    "answer": a.get('answer', ''),
-                    "score": 0,
-                    "max_score": 100,
-                    "technical_accuracy": 0,
-                    "completeness": 0,
-                    "communication": 0,
-                    "feedback": "No sufficient answer provided. Please attempt the question.",
-                    "code": q.get('code')  # Include code snippet
-                }
-                question_scores.append(score_data)
-                continue
-            
-            # Score the answer using multi-criteria
-            score_data = self._score_answer(question_text, answer_text, q.get('text', ''))
-            # Add code snippet to score data
-            score_data['code'] = q.get('code')
+        qa_pairs = list(zip(questions, answers))
+        local_results = self._semantic_grade(qa_pairs)
+        groq_results = self._batch_grade(qa_pairs, skip=local_results)
+        
+        # Score all answers concurrently; map() keeps results in question order
+        if len(qa_pairs) > 1 and self.max_concurrency > 1:
+            workers = min(self.max_concurrency, len(qa_pairs))
+            logger.info(f"⚡ Evaluating {len(qa_pairs)} answers with {workers} concurrent workers")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                scored = list(executor.map(
+                    lambda i: self._evaluate_pair(*qa_pairs[i], groq_result=groq_results.get(i), local_result=local_results.get(i)),
+                    range(len(qa_pairs))
+                ))
+        else:
+            scored = [
+                self._evaluate_pair(q, a, groq_result=groq_results.get(i), local_result=local_results.get(i))
+                for i, (q, a) in enumerate(qa_pairs)
+            ]
+        
+        for score_data, answered in scored:
             question_scores.append(score_data)
+            if not answered:
+                continue
             
             total_score += score_data['score']
             technical_scores.append(score_data['technical_accuracy'])
@@ -182,54 +242,159 @@ class ProfessionalEvaluator:
             "weaknesses": weaknesses
         }
     
-    def _score_answer(self, question_lower: str, answer_lower: str, original_question: str) -> Dict[str, Any]:
-        """Score a single answer using multi-criteria rubric"""
+    def _semantic_grade(self, qa_pairs: List[tuple]) -> Dict[int, Dict[str, Any]]:
+        """Grade answers to known (reference-matched) questions locally in one pass; returns results by pair index"""
+        indices = []
+        items = []
+        for i, (q, a) in enumerate(qa_pairs):
+            answer_text = a.get('answer', '').lower().strip()
+            if len(answer_text) < 10:
+                continue
+            indices.append(i)
+            items.append({"question": q.get('text', ''), "answer": answer_text})
         
-        logger.info(f"🎯 Scoring answer for: {original_question[:60]}...")
+        if not items:
+            return {}
+        
+        results = self.semantic_scorer.score_batch(items)
+        return {
+            i: result for i, result in zip(indices, results)
+            if result is not None and result['reference_key'] is not None
+        }
+    
+    def _batch_grade(self, qa_pairs: List[tuple], skip: Dict[int, Any] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Pre-grade all sufficiently long answers with batched GROQ calls; returns results by pair index
+        
+        Answers a batch failed to grade are left out, so evaluate_interview
+        grades them in its concurrent per-answer pass instead of one by one here.
+        """
+        if not self.batch_grading or not self.groq_evaluator.api_key:
+            return {}
+        
+        skip = skip or {}
+        indices = []
+        batch = []
+        for i, (q, a) in enumerate(qa_pairs):
+            answer_text = a.get('answer', '').lower().strip()
+            if len(answer_text) < 10 or i in skip:
+                continue
+            indices.append(i)
+            batch.append({
+                "question": q.get('text', ''),
+                "answer": answer_text,
+                "expected_answer": q.get('expected_answer')
+            })
+        
+        if not batch:
+            return {}
         
-        # Try GROQ AI evaluation first for ALL questions (more accurate!)
         try:
-            logger.info("🚀 Attempting GROQ evaluation...")
-            from services.groq_evaluator import GroqEvaluator
-            evaluator = GroqEvaluator()
-            result = evaluator.evaluate_answer(original_question, answer_lower)
-            
-            if result and result.get('score', 0) > 0:
-                logger.info(f"✅ GROQ evaluation successful: {result.get('score')}/100")
-                return result
-            else:
-                logger.warning("⚠️ GROQ returned invalid result, trying reference answers...")
+            results = self.groq_evaluator.evaluate_batch(batch, grade_failed=False)
         except Exception as e:
-            logger.warning(f"⚠️ GROQ failed: {str(e)}, trying reference answers...")
+            logger.warning(f"⚠️ GROQ batch grading failed: {str(e)}, grading answers individually...")
+            return {}
         
-        # Fallback: Find matching reference answer
-        reference = None
-        for key, ref in self.reference_answers.items():
-            if any(word in question_lower for word in key.split()):
-                reference = ref
-                logger.info(f"📚 Found reference answer for key: {key}")
-                break
+        return {i: result for i, result in zip(indices, results) if result is not None}
+    
+    def _evaluate_pair(self, q: Dict, a: Dict, groq_result: Dict[str, Any] = None, local_result: Dict[str, Any] = None) -> tuple:
+        """Score one question/answer pair; returns (score_data, answered)"""
+        question_text = q.get('text', '').lower()
+        answer_text = a.get('answer', '').lower().strip()
         
-        if not reference:
-            # Generic scoring if no reference found
-            logger.info("📝 No reference answer, using smart keyword evaluation")
-            return self._generic_score(answer_lower, original_question)
+        if not answer_text or len(answer_text) < 10:
+            # No answer or too short
+            return {
+                "question": q.get('text', 'Question'),
+                "answer": a.get('answer', ''),
+                "score": 0,
+                "max_score": 100,
+                "technical_accuracy": 0,
+                "completeness": 0,
+                "communication": 0,
+                "feedback": "No sufficient answer provided. Please attempt the question.",
+                "code": q.get('code')  # Include code snippet
+            }, False
         
-        # Multi-criteria scoring (like HackerRank)
+        try:
+            # Score the answer using multi-criteria
+            score_data = self._score_answer(
+                question_text, answer_text, q.get('text', ''),
+                expected_answer=q.get('expected_answer'),
+                groq_result=groq_result,
+                local_result=local_result
+            )
+        except Exception as e:
+            logger.error(f"❌ Evaluation failed for: {q.get('text', '')[:50]}... ({str(e)})")
+            score_data = self.groq_evaluator._fallback_evaluation(q.get('text', ''), answer_text)
         
-        # 1. Keyword/Concept Coverage (40%)
-        keyword_score = self._score_keyword_coverage(answer_lower, reference['keywords'])
+        # Add code snippet to score data
+        score_data['code'] = q.get('code')
+        return score_data, True
+    
+    def _score_answer(self, question_lower: str, answer_lower: str, original_question: str,
+                      expected_answer: str = None, groq_result: Dict[str, Any] = None,
+                      local_result: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Score a single answer using multi-criteria rubric
         
-        # 2. Key Concepts Coverage (40%)
-        concept_score = self._score_concept_coverage(answer_lower, reference['key_concepts'])
+        Known questions (matching a reference answer) are graded locally by
+        semantic similarity; GROQ is reserved for open-ended questions.
+        groq_result/local_result are results already computed in batch.
+        """
         
-        # 3. Communication Quality (20%)
-        communication_score = self._score_communication(answer_lower)
+        logger.info(f"🎯 Scoring answer for: {original_question[:60]}...")
         
-        # Weighted final score
-        technical_accuracy = int((keyword_score + concept_score) / 2)
-        completeness = concept_score
-        communication = communication_score
+        # Known question: fast local semantic grading
+        if local_result is None:
+            local_result = self.semantic_scorer.score(original_question, answer_lower)
+        if local_result is not None and local_result['reference_key'] is not None:
+            logger.info(f"⚡ Local semantic evaluation using reference: {local_result['reference_key']}")
+            return self._semantic_score_data(local_result, original_question, answer_lower)
+        
+        # Open-ended question: GROQ AI evaluation (more accurate!)
+        if groq_result is not None or self.groq_evaluator.api_key:
+            try:
+                if groq_result is not None:
+                    result = groq_result
+                else:
+                    logger.info("🚀 Attempting GROQ evaluation...")
+                    result = self.groq_evaluator.evaluate_answer(original_question, answer_lower, expected_answer)
+                
+                if result and result.get('score', 0) > 0:
+                    logger.info(f"✅ GROQ evaluation successful: {result.get('score')}/100")
+                    return result
+                else:
+                    logger.warning("⚠️ GROQ returned invalid result, trying local evaluation...")
+            except Exception as e:
+                logger.warning(f"⚠️ GROQ failed: {str(e)}, trying local evaluation...")
+        
+        # Fallback: compare against the question's expected answer
+        if expected_answer:
+            local_result = self.semantic_scorer.score(original_question, answer_lower, expected_answer)
+            if local_result is not None:
+                logger.info("📚 Scoring against expected answer")
+                return self._semantic_score_data(local_result, original_question, answer_lower)
+        
+        # Generic scoring if no reference found
+        logger.info("📝 No reference answer, using smart keyword evaluation")
+        return self._generic_score(answer_lower, original_question, try_groq=False)
+    
+    def _semantic_score_data(self, local_result: Dict[str, Any], original_question: str, answer_lower: str) -> Dict[str, Any]:
+        """Build the multi-criteria result (like HackerRank) from a semantic scorer result"""
+        
+        # 1. Technical accuracy: semantic similarity to the reference, plus keywords when known
+        technical_accuracy = local_result['technical_accuracy']
+        reference = self.reference_index.get(local_result['reference_key'])
+        if reference:
+            keyword_score = self._score_keyword_coverage(answer_lower, reference.get('keywords', []))
+            technical_accuracy = int((technical_accuracy + keyword_score) / 2)
+        
+        # 2. Key Concepts Coverage
+        completeness = local_result['completeness']
+        
+        # 3. Communication Quality
+        communication = self._score_communication(answer_lower)
         
         final_score = int(
             technical_accuracy * 0.5 +
@@ -239,11 +404,9 @@ class ProfessionalEvaluator:
         
         # Generate detailed feedback
         feedback = self._generate_feedback(
-            answer_lower, 
-            reference, 
-            technical_accuracy, 
-            completeness, 
-            communication
+            technical_accuracy,
+            local_result['matched_concepts'],
+            local_result['missed_concepts']
         )
         
         return {
@@ -277,36 +440,6 @@ class ProfessionalEvaluator:
         else:
             return 35
     
-    def _score_concept_coverage(self, answer: str, concepts: List[str]) -> int:
-        """Score based on key concept coverage"""
-        if not concepts:
-            return 70
-        
-        matched = 0
-        for concept in concepts:
-            # Check if concept words are in answer
-            concept_words = concept.lower().split()
-            if all(word in answer for word in concept_words):
-                matched += 1
-            elif any(word in answer for word in concept_words):
-                matched += 0.5  # Partial credit
-        
-        percentage = (matched / len(concepts)) * 100
-        
-        # Scale to 0-100
-        if percentage >= 90:
-            return 95
-        elif percentage >= 75:
-            return 85
-        elif percentage >= 50:
-            return 70
-        elif percentage >= 30:
-            return 55
-        elif percentage >= 15:
-            return 40
-        else:
-            return 25
-    
     def _score_communication(self, answer: str) -> int:
         """Score communication quality"""
         # Length check
@@ -319,7 +452,7 @@ class ProfessionalEvaluator:
         else:
             return 85
     
-    def _generate_feedback(self, answer: str, reference: Dict, tech_score: int, comp_score: int, comm_score: int) -> str:
+    def _generate_feedback(self, tech_score: int, matched_concepts: List[str], missed_concepts: List[str]) -> str:
         """Generate specific feedback"""
         feedback_parts = []
         
@@ -334,16 +467,6 @@ class ProfessionalEvaluator:
             feedback_parts.append("✗ Technical accuracy needs improvement.")
         
         # Concept coverage feedback
-        matched_concepts = []
-        missed_concepts = []
-        
-        for concept in reference['key_concepts']:
-            concept_words = concept.lower().split()
-            if any(word in answer for word in concept_words):
-                matched_concepts.append(concept)
-            else:
-                missed_concepts.append(concept)
-        
         if matched_concepts:
             feedback_parts.append(f"Mentioned: {', '.join(matched_concepts[:3])}")
         
@@ -352,7 +475,7 @@ class ProfessionalEvaluator:
         
         return " ".join(feedback_parts)
     
-    def _generic_score(self, answer: str, question: str) -> Dict[str, Any]:
+    def _generic_score(self, answer: str, question: str, try_groq: bool = True) -> Dict[str, Any]:
         """Generic scoring with AI evaluation for custom questions"""
         import requests
         import json
@@ -366,24 +489,22 @@ class ProfessionalEvaluator:
             logger.info(f"🔍 Evaluating custom question: {question[:50]}...")
             
             # Try using GROQ for fast AI evaluation (RECOMMENDED!)
-            try:
-                logger.info("🚀 Attempting GROQ evaluation...")
-                from services.groq_evaluator import GroqEvaluator
-                evaluator = GroqEvaluator()
-                logger.info("✅ GROQ evaluator imported successfully")
-                
-                result = evaluator.evaluate_answer(question, answer)
-                logger.info(f"📊 GROQ returned score: {result.get('score', 'N/A')}")
-                
-                if result and result.get('score', 0) > 0:
-                    logger.info(f"✅ Using GROQ AI evaluation for: {question[:50]}...")
-                    return result
-                else:
-                    logger.warning("⚠️ GROQ returned invalid score, using fallback")
-            except Exception as e:
-                logger.error(f"❌ GROQ evaluation failed: {str(e)}")
-                import traceback
-                logger.error(f"Traceback: {traceback.format_exc()}")
+            # Skipped when the caller already tried GROQ for this answer
+            if try_groq:
+                try:
+                    logger.info("🚀 Attempting GROQ evaluation...")
+                    result = self.groq_evaluator.evaluate_answer(question, answer)
+                    logger.info(f"📊 GROQ returned score: {result.get('score', 'N/A')}")
+                    
+                    if result and result.get('score', 0) > 0:
+                        logger.info(f"✅ Using GROQ AI evaluation for: {question[:50]}...")
+                        return result
+                    else:
+                        logger.warning("⚠️ GROQ returned invalid score, using fallback")
+                except Exception as e:
+                    logger.error(f"❌ GROQ evaluation failed: {str(e)}")
+                    import traceback
+                    logger.error(f"Traceback: {traceback.format_exc()}")
             
             # Fallback to smart keyword evaluation
             from services.smart_keyword_evaluator import SmartKeywordEvaluator
@@ -434,52 +555,11 @@ class ProfessionalEvaluator:
         question_lower = question.lower()
         answer_lower = answer.lower().strip()
         
-        # Define correct expansions
-        expansions = {
-            'html': {
-                'correct': ['hyper text markup language', 'hypertext markup language'],
-                'keywords': ['hyper', 'text', 'markup', 'language']
-            },
-            'css': {
-                'correct': ['cascading style sheets', 'cascading style sheet'],
-                'keywords': ['cascading', 'style', 'sheets', 'sheet']
-            },
-            'js': {
-                'correct': ['javascript'],
-                'keywords': ['javascript']
-            },
-            'javascript': {
-                'correct': ['javascript'],
-                'keywords': ['javascript']
-            },
-            'sql': {
-                'correct': ['structured query language'],
-                'keywords': ['structured', 'query', 'language']
-            },
-            'api': {
-                'correct': ['application programming interface'],
-                'keywords': ['application', 'programming', 'interface']
-            },
-            'url': {
-                'correct': ['uniform resource locator'],
-                'keywords': ['uniform', 'resource', 'locator']
-            },
-            'http': {
-                'correct': ['hypertext transfer protocol', 'hyper text transfer protocol'],
-                'keywords': ['hypertext', 'transfer', 'protocol']
-            },
-            'https': {
-                'correct': ['hypertext transfer protocol secure', 'hyper text transfer protocol secure'],
-                'keywords': ['hypertext', 'transfer', 'protocol', 'secure']
-            }
-        }
-        
-        # Find which acronym is being asked
-        acronym_found = None
-        for acronym in expansions.keys():
-            if acronym in question_lower:
-                acronym_found = acronym
-                break
+        # Find which acronym is being asked (whole words, so 'http' doesn't match 'https')
+        acronym_found = next(
+            (word for word in re.findall(r'[a-z]+', question_lower) if word in self.EXPANSIONS),
+            None
+        )
         
         if not acronym_found:
             # Can't determine acronym, use basic scoring
@@ -494,7 +574,7 @@ class ProfessionalEvaluator:
                 "feedback": "Answer provided. Unable to verify accuracy automatically."
             }
         
-        expansion_data = expansions[acronym_found]
+        expansion_data = self.EXPANSIONS[acronym_found]
         
         # Check if answer matches correct expansion
         is_correct = any(correct in answer_lower for correct in expansion_data['correct'])
@@ -0,0 +1,108 @@
+"""
+Question Bank Snapshot - Per-request view of existing aptitude questions
+Holds counts by topic/difficulty and a few sample questions for the prompt,
+instead of the full text of every stored question. Generated questions are
+checked against the bank through stored content hashes and MinHash band keys
+(one lookup per batch), and against each other with an in-request index
+"""
+
+import hashlib
+import re
+from typing import Callable, Dict, Iterable, List, Set
+
+from services.near_duplicate_index import NearDuplicateIndex
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+def question_fingerprint(text: str) -> bytes:
+    """8-byte fingerprint of a question, insensitive to case, spacing and punctuation"""
+    normalized = ' '.join(re.findall(r'[a-z0-9]+', (text or '').lower()))
+    return hashlib.sha1(normalized.encode('utf-8')).digest()[:8]
+
+
+class QuestionBankSnapshot:
+    """Existing questions for the topics of one generation request"""
+
+    SAMPLES_PER_TOPIC = 3
+    SAMPLE_LENGTH = 100
+
+    def __init__(self, topics: Iterable[str], bank_lookup: Callable[[List[Dict], float], Set[int]] = None,
+                 threshold: float = None):
+        self.counts: Dict[str, Dict[str, int]] = {topic: {d: 0 for d in DIFFICULTIES} for topic in topics}
+        self.samples: Dict[str, List[str]] = {topic: [] for topic in self.counts}
+        # Returns the keys of candidates (signature_fields + 'key') that repeat a stored
+        # question; None when there is no bank to check against
+        self.bank_lookup = bank_lookup
+        # Questions accepted during this request (not stored yet)
+        self._accepted = NearDuplicateIndex(threshold=threshold)
+        self.threshold = self._accepted.threshold
+        self.fingerprints = set()
+        self.rejected = 0
+
+    def add_summary(self, topic: str, difficulty: str, count: int, samples: Iterable[str] = ()):
+        """Record the stored question count of one topic/difficulty and some of its questions"""
+        counts = self.counts.setdefault(topic, {d: 0 for d in DIFFICULTIES})
+        if difficulty in counts:
+            counts[difficulty] += count
+
+        topic_samples = self.samples.setdefault(topic, [])
+        for text in samples or ():
+            text = (text or '').strip().lower()
+            if not text or len(topic_samples) >= self.SAMPLES_PER_TOPIC:
+                continue
+            topic_samples.append(text[:self.SAMPLE_LENGTH] + '...' if len(text) > self.SAMPLE_LENGTH else text)
+
+    def signature_fields(self, question_text: str) -> Dict:
+        """Content hash, MinHash signature and band keys of a question, as stored with it in the bank"""
+        signature = self._accepted.signature(question_text)
+        return {
+            'content_hash': question_fingerprint(question_text).hex(),
+            'minhash': list(signature) if signature is not None else [],
+            'minhash_bands': self._accepted.band_keys(signature) if signature is not None else [],
+        }
+
+    def screen(self, questions: List[Dict], text_key: str = 'question') -> List[Dict]:
+        """Attach signature fields and drop questions that (nearly) repeat the bank, in one lookup"""
+        for question in questions:
+            question.update(self.signature_fields(question.get(text_key, '')))
+        if not questions or self.bank_lookup is None:
+            return list(questions)
+
+        candidates = [
+            {'key': key, **{field: question[field] for field in ('content_hash', 'minhash', 'minhash_bands')}}
+            for key, question in enumerate(questions)
+        ]
+        duplicates = self.bank_lookup(candidates, self.threshold)
+        kept = [question for key, question in enumerate(questions) if key not in duplicates]
+        self.rejected += len(questions) - len(kept)
+        return kept
+
+    def accept(self, question: Dict, text_key: str = 'question') -> bool:
+        """Register a screened question unless it (nearly) repeats one accepted earlier in this request"""
+        text = question.get(text_key, '')
+        fingerprint = question_fingerprint(text)
+        if fingerprint in self.fingerprints or not self._accepted.add_if_new(text):
+            self.rejected += 1
+            return False
+        self.fingerprints.add(fingerprint)
+        return True
+
+    def filter_new(self, questions: List[Dict], text_key: str = 'question') -> List[Dict]:
+        """Drop questions that (nearly) repeat the bank or an earlier accepted question and register the rest"""
+        return [question for question in self.screen(questions, text_key) if self.accept(question, text_key)]
+
+    def prompt_context(self) -> str:
+        """A few existing questions per topic to steer the model away from duplicates"""
+        existing_samples = [
+            f"{topic.upper()}: {', '.join(samples)}"
+            for topic, samples in self.samples.items() if samples
+        ]
+        if not existing_samples:
+            return ""
+
+        return f"""
+EXISTING QUESTIONS TO AVOID DUPLICATING:
+{chr(10).join(existing_samples)}
+
+DUPLICATE PREVENTION: Ensure your questions are completely different from the above existing questions. Use different scenarios, numbers, concepts, and wording."""
@@ -0,0 +1,209 @@
+"""
+Question Pool - Pre-generated interview questions served from a local store
+Validated questions are indexed by (role, category, difficulty) and sampled
+without replacement per candidate; a background refiller tops up pools that
+fall below the low-water mark so LLM calls stay off the request path
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'question_pool.db')
+
+PoolKey = Tuple[str, str, str]
+
+
+def pool_key(role: str, category: str, difficulty: str) -> PoolKey:
+    """Normalized (role, category, difficulty) index key"""
+    return (' '.join((role or '').lower().split()), (category or '').lower().strip(), (difficulty or '').lower().strip())
+
+
+def validate_question(question: Any, category: str) -> Optional[Dict[str, Any]]:
+    """Return a cleaned copy of a generated question, or None if it is unusable"""
+    if not isinstance(question, dict):
+        return None
+    text = question.get('text')
+    if not isinstance(text, str) or len(text.strip()) < 10:
+        return None
+
+    try:
+        duration = int(question.get('duration', 180))
+    except (TypeError, ValueError):
+        duration = 180
+
+    cleaned = dict(question)
+    cleaned['text'] = text.strip()
+    cleaned['type'] = category
+    cleaned['duration'] = min(max(duration, 60), 600)
+    return cleaned
+
+
+class QuestionPool:
+    """
+    SQLite-backed question pools with a background refiller
+
+    `generator(role, category, difficulty, count)` must return a list of
+    question dicts (or raise); it is only ever called from the refill thread.
+    """
+
+    def __init__(self, generator: Callable[[str, str, str, int], List[Dict]], path: str = None):
+        self.generator = generator
+        self.path = path or os.getenv('QUESTION_POOL_PATH', DEFAULT_POOL_PATH)
+        self.low_water = int(os.getenv('QUESTION_POOL_LOW_WATER', 20))
+        self.refill_batch = int(os.getenv('QUESTION_POOL_REFILL_BATCH', 10))
+        self.max_size = int(os.getenv('QUESTION_POOL_MAX_SIZE', 200))
+
+        self._lock = threading.Lock()
+        self._refill_queue: "queue.Queue[PoolKey]" = queue.Queue()
+        self._refill_pending = set()
+        self._refill_thread: Optional[threading.Thread] = None
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pool_questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                role TEXT NOT NULL,
+                category TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (role, category, difficulty, text_hash)
+            );
+            CREATE TABLE IF NOT EXISTS served_questions (
+                candidate TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                served_at REAL NOT NULL,
+                PRIMARY KEY (candidate, question_id)
+            );
+        """)
+        # Forget what was served to candidates long ago
+        self._conn.execute('DELETE FROM served_questions WHERE served_at < ?', (time.time() - 90 * 86400,))
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def take(self, role: str, category: str, difficulty: str, count: int, candidate: str = None) -> List[Dict[str, Any]]:
+        """
+        Randomly sample up to `count` distinct questions from the pool
+
+        Questions already served to `candidate` are excluded. A refill is
+        scheduled when fewer than the low-water mark remain unserved for this
+        candidate (or in the pool, without one) after the draw. Returns
+        fewer than `count` questions (possibly none) when the pool is short.
+        """
+        key = pool_key(role, category, difficulty)
+        with self._lock:
+            if candidate:
+                rows = self._conn.execute(
+                    'SELECT id, question FROM pool_questions WHERE role = ? AND category = ? AND difficulty = ? '
+                    'AND id NOT IN (SELECT question_id FROM served_questions WHERE candidate = ?)',
+                    key + (candidate,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    'SELECT id, question FROM pool_questions WHERE role = ? AND category = ? AND difficulty = ?',
+                    key
+                ).fetchall()
+
+            selected = random.sample(rows, min(count, len(rows)))
+            if candidate and selected:
+                now = time.time()
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO served_questions (candidate, question_id, served_at) VALUES (?, ?, ?)',
+                    [(candidate, row_id, now) for row_id, _ in selected]
+                )
+                self._conn.commit()
+
+        # Rows this candidate has not been served yet (served_questions keeps 90 days of history)
+        unserved = len(rows) - len(selected) if candidate else len(rows)
+        if unserved < self.low_water:
+            self.request_refill(role, category, difficulty)
+
+        return [json.loads(question) for _, question in selected]
+
+    def add(self, role: str, category: str, difficulty: str, questions: List[Dict[str, Any]]) -> int:
+        """Validate and store questions (duplicates ignored); returns the number added"""
+        key = pool_key(role, category, difficulty)
+        rows = []
+        for question in questions or []:
+            cleaned = validate_question(question, key[1])
+            if cleaned is None:
+                continue
+            text_hash = hashlib.sha1(' '.join(cleaned['text'].lower().split()).encode('utf-8')).hexdigest()
+            rows.append(key + (text_hash, json.dumps(cleaned), time.time()))
+
+        if not rows:
+            return 0
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO pool_questions (role, category, difficulty, text_hash, question, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def size(self, role: str, category: str, difficulty: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM pool_questions WHERE role = ? AND category = ? AND difficulty = ?',
+                pool_key(role, category, difficulty)
+            ).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Background refill
+    # ------------------------------------------------------------------
+
+    def request_refill(self, role: str, category: str, difficulty: str):
+        """Schedule a background top-up (ignored if one is already pending for this pool)"""
+        key = pool_key(role, category, difficulty)
+        with self._lock:
+            if key in self._refill_pending:
+                return
+            self._refill_pending.add(key)
+            if self._refill_thread is None or not self._refill_thread.is_alive():
+                self._refill_thread = threading.Thread(target=self._refill_loop, name='question-pool-refill', daemon=True)
+                self._refill_thread.start()
+        self._refill_queue.put((role, category, difficulty))
+
+    def _refill_loop(self):
+        while True:
+            role, category, difficulty = self._refill_queue.get()
+            key = pool_key(role, category, difficulty)
+            try:
+                self._refill(role, category, difficulty)
+            except Exception as e:
+                logger.error(f"❌ Question pool refill failed for {key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refill_pending.discard(key)
+
+    def _refill(self, role: str, category: str, difficulty: str):
+        size = self.size(role, category, difficulty)
+        if size >= self.max_size:
+            return
+
+        count = min(self.refill_batch, self.max_size - size)
+        logger.info(f"🔄 Refilling question pool {pool_key(role, category, difficulty)}: {size} questions, generating {count}")
+        added = self.add(role, category, difficulty, self.generator(role, category, difficulty, count))
+        logger.info(f"✅ Question pool refilled with {added} new questions")
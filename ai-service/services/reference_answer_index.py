@@ -0,0 +1,190 @@
+"""
+Reference Answer Index - Inverted index over the reference-answer bank
+Maps normalized question tokens to candidate references so lookup cost
+depends on the question's words, not on the size of the bank
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for with from into about as is are was were be been being
+it its this that these those there their they them we you your i me my he she his her our
+what which who whom how why when where do does did doing done can could should would will shall may might
+must have has had having not no nor so than too very just also only both each more most other some such
+explain describe define difference between differ tell give use used using
+""".split())
+
+
+def _stem(token: str) -> str:
+    """Light suffix stripping so 'tracks'/'tracking'/'tracked' share one term"""
+    if len(token) > 5 and token.endswith('ing'):
+        return token[:-3]
+    if len(token) > 4 and token.endswith('ed'):
+        return token[:-2]
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith(('xes', 'ches', 'shes', 'sses')):
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase content-word tokens with light stemming"""
+    return [_stem(token) for token in _TOKEN_RE.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+class ReferenceAnswerIndex:
+    """
+    BM25-ranked inverted index of reference answers
+
+    Each reference is indexed by its key (a few topic words such as
+    "box model css") plus its optional `question` and `aliases` fields.
+    A reference is only returned when the IDF-weighted share of its indexed
+    terms found in the question reaches `min_match`, so a single common
+    word no longer selects an unrelated reference.
+    """
+
+    def __init__(self, references: Dict[str, Dict] = None, min_match: float = None, k1: float = 1.5, b: float = 0.75):
+        self.min_match = float(os.getenv('REFERENCE_MATCH_THRESHOLD', 0.5)) if min_match is None else min_match
+        self.k1 = k1
+        self.b = b
+
+        self._references: Dict[str, Dict] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._postings: Dict[str, List[str]] = defaultdict(list)
+        self._total_length = 0
+
+        if references:
+            for key, reference in references.items():
+                self.add(key, reference)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def add(self, key: str, reference: Dict[str, Any]):
+        """Add or replace one reference answer"""
+        if key in self._references:
+            self.remove(key)
+
+        text = ' '.join([key, reference.get('question', '')] + list(reference.get('aliases', [])))
+        terms = Counter(tokenize(text))
+        if not terms:
+            logger.warning(f"⚠️ Reference '{key}' has no indexable words, skipping")
+            return
+
+        self._references[key] = reference
+        self._doc_terms[key] = terms
+        self._total_length += sum(terms.values())
+        for term in terms:
+            self._postings[term].append(key)
+
+    def remove(self, key: str):
+        """Remove one reference answer"""
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        del self._references[key]
+        self._total_length -= sum(terms.values())
+        for term in terms:
+            postings = self._postings[term]
+            postings.remove(key)
+            if not postings:
+                del self._postings[term]
+
+    def load_file(self, path: str) -> int:
+        """
+        Load a reference bank from JSON or YAML
+
+        The bank is either {key: reference} or a list of references each
+        with a `key` field. Returns the number of references loaded.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.lower().endswith(('.yaml', '.yml')):
+                import yaml  # Optional dependency, only needed for YAML banks
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+
+        if isinstance(data, dict) and isinstance(data.get('references'), (list, dict)):
+            data = data['references']
+        if isinstance(data, list):
+            data = {item['key']: item for item in data if isinstance(item, dict) and item.get('key')}
+        if not isinstance(data, dict):
+            raise ValueError(f"Unsupported reference bank format in {path}")
+
+        loaded = 0
+        for key, reference in data.items():
+            if isinstance(reference, dict) and reference.get('ideal_answer'):
+                self.add(key, reference)
+                loaded += 1
+
+        logger.info(f"📚 Loaded {loaded} reference answers from {path}")
+        return loaded
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency (unseen terms get the maximum)"""
+        n_docs = len(self._doc_terms)
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, question: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Return up to `limit` (key, bm25_score) pairs passing the minimum-match threshold"""
+        query = set(tokenize(question))
+        candidates = {key for term in query for key in self._postings.get(term, ())}
+        if not candidates:
+            return []
+
+        avg_length = self._total_length / len(self._doc_terms)
+        results = []
+        for key in candidates:
+            terms = self._doc_terms[key]
+            weights = {term: self.idf(term) for term in terms}
+            total = sum(weights.values())
+            matched = sum(weight for term, weight in weights.items() if term in query)
+            if not total or matched / total < self.min_match:
+                continue
+
+            length = sum(terms.values())
+            score = 0.0
+            for term in query:
+                tf = terms.get(term)
+                if tf:
+                    score += weights[term] * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+            results.append((key, score))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Key of the best matching reference answer, or None"""
+        results = self.search(question, limit=1)
+        return results[0][0] if results else None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._references.get(key)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(self._references.items())
+
+    def __len__(self) -> int:
+        return len(self._references)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._references
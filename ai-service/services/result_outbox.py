@@ -0,0 +1,234 @@
+"""
+Result Outbox - Durable, non-blocking delivery of results to the backend
+Results are written to a local SQLite queue and POSTed by a background
+sender with retries, exponential backoff and idempotency keys. Every
+worker process runs a sender on the same queue file, so each message is
+claimed atomically (claimed_by / lease_until) before it is sent
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'result_outbox.db')
+
+# Client errors that are worth retrying (timeouts, rate limits, conflicts while the backend catches up)
+RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+
+class ResultOutbox:
+    """SQLite-backed outbox with one background delivery thread per process"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('RESULT_OUTBOX_PATH', DEFAULT_OUTBOX_PATH)
+        self.timeout = float(os.getenv('RESULT_OUTBOX_TIMEOUT', 10))
+        self.max_attempts = int(os.getenv('RESULT_OUTBOX_MAX_ATTEMPTS', 12))
+        self.base_delay = float(os.getenv('RESULT_OUTBOX_BASE_DELAY', 2))
+        self.max_delay = float(os.getenv('RESULT_OUTBOX_MAX_DELAY', 600))
+        # Delivered messages are kept this long so duplicate submissions are recognised
+        self.retention = float(os.getenv('RESULT_OUTBOX_RETENTION_DAYS', 7)) * 86400
+        # A claimed message is left to its sender this long before another process may take it over
+        self.lease = self.timeout + 30
+        self.sender_id = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                claimed_by TEXT,
+                lease_until REAL,
+                created_at REAL NOT NULL
+            )
+        """)
+        # Queues created before messages were claimed
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')}
+        if 'claimed_by' not in columns:
+            self._conn.execute('ALTER TABLE outbox ADD COLUMN claimed_by TEXT')
+            self._conn.execute('ALTER TABLE outbox ADD COLUMN lease_until REAL')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)')
+        self._conn.execute(
+            "DELETE FROM outbox WHERE status = 'delivered' AND created_at < ?",
+            (time.time() - self.retention,)
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_idempotency_key(scope: str, payload: Dict[str, Any]) -> str:
+        """Same scope + same payload => same key, so re-submissions are delivered once"""
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return f"{scope}:{digest[:32]}"
+
+    def enqueue(self, url: str, payload: Dict[str, Any], idempotency_key: str) -> bool:
+        """
+        Durably queue a POST of `payload` to `url` and return immediately
+
+        Returns False if a message with the same idempotency key is already
+        queued or was delivered within the retention period.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO outbox (idempotency_key, url, payload, next_attempt_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (idempotency_key, url, json.dumps(payload, default=str), now, now)
+            )
+            self._conn.commit()
+            queued = cursor.rowcount > 0
+
+        if queued:
+            logger.info(f"📮 Queued result delivery: {idempotency_key}")
+        else:
+            logger.info(f"📮 Result already queued/delivered: {idempotency_key}")
+
+        self.start()
+        self._wakeup.set()
+        return queued
+
+    def start(self):
+        """Start the background sender (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='result-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def _run(self):
+        logger.info("📮 Result outbox sender started")
+        while not self._stop.is_set():
+            try:
+                delivered_any = self._deliver_due()
+            except Exception as e:
+                logger.error(f"❌ Result outbox error: {str(e)}")
+                delivered_any = False
+
+            if delivered_any:
+                continue
+            self._wakeup.wait(self._seconds_until_next())
+            self._wakeup.clear()
+
+    def _seconds_until_next(self) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(MAX(next_attempt_at, COALESCE(lease_until, 0))) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return 60
+        return min(max(row[0] - time.time(), 0.1), 60)
+
+    def _claim_next(self) -> Optional[tuple]:
+        """
+        Atomically claim the oldest due message that no other sender holds
+
+        The UPDATE selects and claims the row in one statement under
+        SQLite's write lock, so senders in other processes cannot take it too.
+        """
+        now = time.time()
+        claim = f"{self.sender_id}:{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET claimed_by = ?, lease_until = ? WHERE id = ("
+                "SELECT id FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "AND (lease_until IS NULL OR lease_until <= ?) ORDER BY id LIMIT 1)",
+                (claim, now + self.lease, now, now)
+            )
+            self._conn.commit()
+            if not cursor.rowcount:
+                return None
+            return self._conn.execute(
+                'SELECT id, idempotency_key, url, payload, attempts, claimed_by FROM outbox WHERE claimed_by = ?',
+                (claim,)
+            ).fetchone()
+
+    def _deliver_due(self) -> bool:
+        """Attempt up to 20 messages whose retry time has come; returns True if any was attempted"""
+        attempted = 0
+        while attempted < 20 and not self._stop.is_set():
+            row = self._claim_next()
+            if row is None:
+                break
+            self._deliver(*row)
+            attempted += 1
+        return bool(attempted)
+
+    def _deliver(self, row_id: int, key: str, url: str, payload: str, attempts: int, claim: str):
+        attempts += 1
+        error = None
+        permanent = False
+        try:
+            response = self.session.post(
+                url,
+                data=payload,
+                headers={'Content-Type': 'application/json', 'Idempotency-Key': key},
+                timeout=self.timeout
+            )
+            if 200 <= response.status_code < 300:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE outbox SET status = 'delivered', attempts = ?, last_error = NULL, "
+                        "claimed_by = NULL, lease_until = NULL WHERE id = ? AND claimed_by = ?",
+                        (attempts, row_id, claim)
+                    )
+                    self._conn.commit()
+                logger.info(f"✅ Results delivered to backend ({response.status_code}): {key}")
+                return
+            error = f"HTTP {response.status_code}"
+            permanent = 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_CLIENT_ERRORS
+        except requests.RequestException as e:
+            error = str(e)
+
+        if permanent or attempts >= self.max_attempts:
+            logger.error(f"❌ Giving up on result delivery after {attempts} attempt(s) ({error}): {key}")
+            status, next_attempt_at = 'dead', time.time()
+        else:
+            # Exponential backoff with jitter
+            delay = min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+            delay *= random.uniform(0.8, 1.2)
+            logger.warning(f"⚠️ Result delivery failed ({error}), retry {attempts}/{self.max_attempts} in {delay:.0f}s: {key}")
+            status, next_attempt_at = 'pending', time.time() + delay
+
+        with self._lock:
+            self._conn.execute(
+                'UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, '
+                'claimed_by = NULL, lease_until = NULL WHERE id = ? AND claimed_by = ?',
+                (status, attempts, next_attempt_at, error, row_id, claim)
+            )
+            self._conn.commit()
@@ -10,15 +10,30 @@ import requests
 import json
 from typing import Dict, List, Any, Tuple
 from collections import Counter
+from .llm_router import LLMRouter, AllProvidersFailed
 
 logger = logging.getLogger(__name__)
 
 class ResumeScreeningService:
+    LLM_ANALYSIS_PROMPT_PREFIX = """<s>[INST] You are an expert ATS analyzing a resume for the position below.
+
+Provide analysis in EXACT format:
+
+MATCH SCORE: [0-100]
+TECHNICAL FIT: [2-3 sentences]
+EXPERIENCE RELEVANCE: [2-3 sentences]
+CULTURAL FIT INDICATORS: [2-3 sentences]
+RED FLAGS: [list or "None identified"]
+HIRING RECOMMENDATION: [Strong Yes/Yes/Maybe/No]
+
+"""
+
     def __init__(self, llm_service):
         self.llm = llm_service
         self.groq_api_key = os.getenv('GROQ_API_KEY')
         self.groq_api_base = "https://api.groq.com/openai/v1"
         self.groq_model = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
+        self.router = LLMRouter('resume_analysis', local_providers=('local_llm',))
         
         if self.groq_api_key:
             logger.info("✅ ResumeScreeningService initialized with GROQ AI")
@@ -297,16 +312,30 @@ class ResumeScreeningService:
     def _ai_deep_analysis(self, resume_text: str, job_description: str, job_title: str) -> Dict[str, Any]:
         """AI-powered deep analysis using GROQ"""
         
-        # Try GROQ first (fast and accurate!)
+        providers = []
         if self.groq_api_key:
-            try:
-                logger.info(f"🚀 Analyzing resume with GROQ AI for: {job_title or 'position'}...")
-                return self._groq_analysis(resume_text, job_description, job_title)
-            except Exception as e:
-                logger.warning(f"⚠️ GROQ failed: {str(e)}, trying fallback...")
-        
-        # Fallback to original LLM
-        return self._llm_analysis(resume_text, job_description, job_title)
+            providers.append(('groq', lambda: self._groq_analysis(resume_text, job_description, job_title)))
+        providers.append(('local_llm', lambda: self._llm_analysis(resume_text, job_description, job_title)))
+        
+        # GROQ is preferred; the router moves to whichever provider is currently faster and healthy
+        try:
+            logger.info(f"🚀 Analyzing resume with AI for: {job_title or 'position'}...")
+            return self.router.call(providers, accept=lambda analysis: analysis.get('analysis') != 'AI analysis unavailable')
+        except AllProvidersFailed as e:
+            logger.warning(f"⚠️ {str(e)}")
+            return self._unavailable_analysis()
+    
+    @staticmethod
+    def _unavailable_analysis() -> Dict[str, Any]:
+        return {
+            'score': 50,
+            'analysis': 'AI analysis unavailable',
+            'technical_fit': 'N/A',
+            'experience_relevance': 'N/A',
+            'cultural_fit': 'N/A',
+            'red_flags': 'N/A',
+            'hiring_recommendation': 'Requires manual review'
+        }
     
     def _groq_analysis(self, resume_text: str, job_description: str, job_title: str) -> Dict[str, Any]:
         """Fast analysis using GROQ AI"""
@@ -383,26 +412,22 @@ Be objective and thorough. Focus on technical skills match, experience relevance
     
     def _llm_analysis(self, resume_text: str, job_description: str, job_title: str) -> Dict[str, Any]:
         """Fallback analysis using original LLM"""
-        prompt = f"""<s>[INST] You are an expert ATS analyzing a resume for: {job_title or 'Not specified'}
+        if not self.llm.is_loaded():
+            # generate() would return canned text, which must not count as an analysis
+            raise RuntimeError("Local LLM model is not loaded")
+        
+        # Static instructions first so the model can reuse their evaluated state
+        prompt = self.LLM_ANALYSIS_PROMPT_PREFIX + f"""POSITION: {job_title or 'Not specified'}
 
 JOB DESCRIPTION:
 {job_description[:1500]}
 
 CANDIDATE RESUME:
 {resume_text[:2500]}
-
-Provide analysis in EXACT format:
-
-MATCH SCORE: [0-100]
-TECHNICAL FIT: [2-3 sentences]
-EXPERIENCE RELEVANCE: [2-3 sentences]
-CULTURAL FIT INDICATORS: [2-3 sentences]
-RED FLAGS: [list or "None identified"]
-HIRING RECOMMENDATION: [Strong Yes/Yes/Maybe/No]
 [/INST]"""
         
         try:
-            response = self.llm.generate(prompt, max_tokens=1000, temperature=0.3)
+            response = self.llm.generate(prompt, cache_prefix=self.LLM_ANALYSIS_PROMPT_PREFIX, profile='ats_analysis')
             
             return {
                 'score': self._extract_score_from_ai(response),
@@ -415,15 +440,7 @@ HIRING RECOMMENDATION: [Strong Yes/Yes/Maybe/No]
             }
         except Exception as e:
             logger.error(f"LLM analysis error: {str(e)}")
-            return {
-                'score': 50,
-                'analysis': 'AI analysis unavailable',
-                'technical_fit': 'N/A',
-                'experience_relevance': 'N/A',
-                'cultural_fit': 'N/A',
-                'red_flags': 'N/A',
-                'hiring_recommendation': 'Requires manual review'
-            }
+            return self._unavailable_analysis()
     
     def _extract_score_from_ai(self, text: str) -> int:
         """Extract score from AI response"""
@@ -13,6 +13,25 @@ from .resume_parser import ResumeParser
 logger = logging.getLogger(__name__)
 
 class ResumeService:
+    SCREENING_PROMPT_PREFIX = """<s>[INST] You are a strict HR recruiter evaluating candidates. Analyze if the candidate's skills below match the job requirements below.
+
+SCORING RULES:
+- 90-100: Perfect match, all key skills present
+- 70-89: Good match, most skills present
+- 50-69: Partial match, some relevant skills
+- 30-49: Weak match, few relevant skills
+- 0-29: Poor match, wrong field/no relevant skills
+
+Provide ONLY:
+1. Match Score (0-100): [number only]
+2. Key Strengths: [2-3 points]
+3. Gaps: [2-3 points]
+4. Recommendation: [Highly Recommended/Recommended/Consider/Not Recommended]
+
+BE STRICT. If skills don't match the job, give LOW score.
+
+"""
+
     def __init__(self, llm_service):
         self.llm = llm_service
         self.parser = ResumeParser()
@@ -151,30 +170,14 @@ class ResumeService:
         Returns:
             Dictionary with match score, summary, and reasoning
         """
-        prompt = f"""<s>[INST] You are a strict HR recruiter evaluating candidates. Analyze if this candidate's skills match the job requirements.
-
-JOB REQUIREMENTS:
+        # Static instructions first so the model can reuse their evaluated state
+        prompt = self.SCREENING_PROMPT_PREFIX + f"""JOB REQUIREMENTS:
 {job_description[:1000]}
 
 CANDIDATE RESUME:
-{resume_text[:2000]}
-
-SCORING RULES:
-- 90-100: Perfect match, all key skills present
-- 70-89: Good match, most skills present
-- 50-69: Partial match, some relevant skills
-- 30-49: Weak match, few relevant skills
-- 0-29: Poor match, wrong field/no relevant skills
-
-Provide ONLY:
-1. Match Score (0-100): [number only]
-2. Key Strengths: [2-3 points]
-3. Gaps: [2-3 points]
-4. Recommendation: [Highly Recommended/Recommended/Consider/Not Recommended]
-
-BE STRICT. If skills don't match the job, give LOW score. [/INST]"""
+{resume_text[:2000]} [/INST]"""
         
-        response = self.llm.generate(prompt, max_tokens=800, temperature=0.5)
+        response = self.llm.generate(prompt, cache_prefix=self.SCREENING_PROMPT_PREFIX, profile='resume_screening')
         
         # Parse response
         score = self._extract_score(response)
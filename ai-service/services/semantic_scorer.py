@@ -0,0 +1,234 @@
+"""
+Semantic Answer Scorer - Fast local grading against reference answers
+Embeds reference/expected answers once (TF-IDF vector space, or a small
+sentence-transformers model when SEMANTIC_EMBEDDING_MODEL is set) and scores
+candidate answers by cosine similarity - no network calls, sub-10ms per answer
+"""
+
+import logging
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.reference_answer_index import ReferenceAnswerIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Similarity mapped to the minimum and to the full technical score, per backend
+SIMILARITY_RANGE = {
+    'tfidf': (0.05, 0.55),
+    'embedding': (0.20, 0.80),
+}
+
+
+def _terms(tokens: List[str]) -> List[str]:
+    """Unigrams plus bigrams (bigrams keep short phrases like 'block scoped' together)"""
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+class SemanticAnswerScorer:
+    """
+    Local answer scorer backed by a cached vector space of reference answers
+
+    References use the ProfessionalEvaluator format:
+        {key: {key_concepts, keywords, ideal_answer, min_acceptable}}
+    where `key` is a few words identifying the question topic. Questions
+    are matched to references through a ReferenceAnswerIndex.
+    """
+
+    def __init__(self, references: Dict[str, Dict] = None, index: ReferenceAnswerIndex = None, cache_size: int = 512):
+        self.index = index if index is not None else ReferenceAnswerIndex(references)
+        self.cache_size = cache_size
+
+        self._idf: Dict[str, float] = {}
+        self._default_idf = 1.0
+        self._reference_vectors: Dict[str, Any] = {}
+        self._text_cache: "OrderedDict[str, Any]" = OrderedDict()
+        # Graders score answers from several threads
+        self._cache_lock = threading.Lock()
+
+        self.backend = 'tfidf'
+        self._model = None
+        self._load_embedding_model()
+
+        self.fit()
+
+    def _load_embedding_model(self):
+        """Use a small CPU sentence-embedding model if configured and installed"""
+        model_name = os.getenv('SEMANTIC_EMBEDDING_MODEL')
+        if not model_name:
+            return
+        try:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(model_name, device='cpu')
+            self.backend = 'embedding'
+            logger.info(f"✅ Semantic scorer using embedding model: {model_name}")
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding model unavailable ({str(e)}), using TF-IDF vectors")
+
+    def fit(self):
+        """
+        (Re)build the TF-IDF vector space from the indexed reference answers
+
+        Reference answers are embedded lazily, the first time a question
+        matches them, so start-up cost stays flat as the bank grows.
+        """
+        with self._cache_lock:
+            self._text_cache.clear()
+        self._reference_vectors.clear()
+
+        doc_freq = Counter()
+        n_docs = 0
+        for key, ref in self.index.items():
+            text = ' '.join([key, ref.get('ideal_answer', ''), ' '.join(ref.get('key_concepts', []))])
+            doc_freq.update(set(_terms(tokenize(text))))
+            n_docs += 1
+        n_docs = max(n_docs, 1)
+        self._idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self._default_idf = math.log(1 + n_docs) + 1
+
+        logger.info(f"📚 Semantic scorer ready for {len(self.index)} reference answers ({self.backend})")
+
+    # ------------------------------------------------------------------
+    # Vectors
+    # ------------------------------------------------------------------
+
+    def _tfidf_vector(self, text: str) -> Dict[str, float]:
+        counts = Counter(_terms(tokenize(text)))
+        vector = {term: (1 + math.log(count)) * self._idf.get(term, self._default_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def _embed_many(self, texts: List[str]) -> List[Any]:
+        """Vectors for texts, computed once per distinct text and cached"""
+        vectors: Dict[str, Any] = {}
+        with self._cache_lock:
+            for text in dict.fromkeys(texts):
+                if text in self._text_cache:
+                    self._text_cache.move_to_end(text)
+                    vectors[text] = self._text_cache[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            # Encoded outside the lock; the result is built from these vectors, so
+            # eviction (batches larger than the cache, other threads) cannot lose them
+            if self._model is not None:
+                encoded = self._model.encode(missing, batch_size=32, normalize_embeddings=True)
+                computed = [vector.tolist() for vector in encoded]
+            else:
+                computed = [self._tfidf_vector(text) for text in missing]
+            vectors.update(zip(missing, computed))
+            with self._cache_lock:
+                for text, vector in zip(missing, computed):
+                    self._text_cache[text] = vector
+                    self._text_cache.move_to_end(text)
+                while len(self._text_cache) > self.cache_size:
+                    self._text_cache.popitem(last=False)
+        return [vectors[text] for text in texts]
+
+    def _similarity(self, a: Any, b: Any) -> float:
+        if self._model is not None:
+            return max(0.0, sum(x * y for x, y in zip(a, b)))
+        return _cosine(a, b)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _reference_vector(self, key: str) -> Any:
+        """Vector of a reference's ideal answer, embedded once"""
+        vector = self._reference_vectors.get(key)
+        if vector is None:
+            vector = self._embed_many([self.index.get(key).get('ideal_answer', '')])[0]
+            self._reference_vectors[key] = vector
+        return vector
+
+    def match_reference(self, question: str) -> Optional[str]:
+        """Key of the reference answer for a question, or None"""
+        return self.index.lookup(question)
+
+    def score(self, question: str, answer: str, expected_answer: str = None) -> Optional[Dict[str, Any]]:
+        """Score one answer; see score_batch()"""
+        return self.score_batch([{'question': question, 'answer': answer, 'expected_answer': expected_answer}])[0]
+
+    def score_batch(self, items: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Score many answers in one pass
+
+        Args:
+            items: [{question, answer, expected_answer (optional)}]
+
+        Returns:
+            Per item (in order) either None when no reference is known for
+            the question, or {reference_key, similarity, technical_accuracy,
+            completeness, matched_concepts, missed_concepts}
+        """
+        targets: List[Optional[Tuple[Optional[str], str, List[str]]]] = []
+        for item in items:
+            key = self.match_reference(item.get('question', ''))
+            if key is not None:
+                ref = self.index.get(key)
+                targets.append((key, ref.get('ideal_answer', ''), ref.get('key_concepts', [])))
+            elif item.get('expected_answer'):
+                expected = item['expected_answer']
+                targets.append((None, expected, [term for term in dict.fromkeys(tokenize(expected))]))
+            else:
+                targets.append(None)
+
+        scored = [i for i, target in enumerate(targets) if target is not None]
+        if not scored:
+            return [None] * len(items)
+
+        answer_vectors = self._embed_many([items[i].get('answer', '') for i in scored])
+        expected_vectors = dict(zip(
+            (targets[i][1] for i in scored if targets[i][0] is None),
+            self._embed_many([targets[i][1] for i in scored if targets[i][0] is None])
+        ))
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        for i, answer_vector in zip(scored, answer_vectors):
+            key, target_text, concepts = targets[i]
+            target_vector = self._reference_vector(key) if key is not None else expected_vectors[target_text]
+            similarity = self._similarity(answer_vector, target_vector)
+            results[i] = self._build_result(key, similarity, items[i].get('answer', ''), concepts)
+        return results
+
+    def _build_result(self, key: Optional[str], similarity: float, answer: str, concepts: List[str]) -> Dict[str, Any]:
+        low, high = SIMILARITY_RANGE[self.backend]
+        technical = int(25 + 70 * min(max((similarity - low) / (high - low), 0.0), 1.0))
+
+        answer_tokens = set(tokenize(answer))
+        matched, missed = [], []
+        coverage = 0.0
+        for concept in concepts:
+            concept_tokens = tokenize(concept)
+            if not concept_tokens:
+                continue
+            found = sum(1 for token in concept_tokens if token in answer_tokens)
+            if found == len(concept_tokens):
+                matched.append(concept)
+                coverage += 1
+            else:
+                missed.append(concept)
+                coverage += 0.5 * found / len(concept_tokens)  # Partial credit
+
+        total = len(matched) + len(missed)
+        completeness = int(25 + 70 * coverage / total) if total else technical
+
+        return {
+            "reference_key": key,
+            "similarity": round(similarity, 3),
+            "technical_accuracy": technical,
+            "completeness": completeness,
+            "matched_concepts": matched,
+            "missed_concepts": missed
+        }
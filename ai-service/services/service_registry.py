@@ -0,0 +1,175 @@
+"""
+Service Registry - Lazy, shared construction of the AI services
+Each service module is imported and its service constructed on first use
+(or by a background warm-up thread), exactly once per process, so the
+app and every blueprint share the same instances and startup does not
+wait for model loads, API clients or heavy imports
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Thread-safe named singletons built by factories that receive the registry"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[['ServiceRegistry'], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[['ServiceRegistry'], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """The service called `name`, constructing it (and its dependencies) on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown service: {name}")
+        # One lock per service: building one service never blocks users of another
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.monotonic()
+                instance = self._factories[name](self)
+                self._instances[name] = instance
+                logger.info(f"✅ Service '{name}' ready in {time.monotonic() - start:.2f}s")
+        return instance
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self._instances
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    @property
+    def initialized(self) -> List[str]:
+        return [name for name in self._factories if name in self._instances]
+
+    def proxy(self, name: str) -> 'LazyService':
+        return LazyService(self, name)
+
+    def warm_up(self, names: Iterable[str] = None, background: bool = True):
+        """Construct services ahead of their first request, by default in a daemon thread"""
+        names = self.names if names is None else list(names)
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"❌ Warm-up of service '{name}' failed: {str(e)}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name='service-warmup', daemon=True)
+        thread.start()
+        return thread
+
+
+class LazyService:
+    """Stands in for a registry service; the service is built when an attribute is first used"""
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __repr__(self) -> str:
+        state = 'ready' if self._registry.is_initialized(self._name) else 'not built'
+        return f"<LazyService {self._name} ({state})>"
+
+
+def _llm(registry):
+    from services.llm_service import LLMService
+    return LLMService()
+
+
+def _gemini(registry):
+    from services.gemini_service import GeminiService
+    return GeminiService()
+
+
+def _groq_generator(registry):
+    from services.groq_question_generator import GroqQuestionGenerator
+    return GroqQuestionGenerator()
+
+
+def _resume(registry):
+    from services.resume_service import ResumeService
+    return ResumeService(registry.get('llm'))
+
+
+def _resume_screening(registry):
+    from services.resume_screening_service import ResumeScreeningService
+    return ResumeScreeningService(registry.get('llm'))
+
+
+def _job_description(registry):
+    from services.job_description_service import JobDescriptionService
+    return JobDescriptionService(registry.get('llm'))
+
+
+def _email(registry):
+    from services.email_service import EmailService
+    return EmailService(registry.get('llm'), registry.get('gemini'))
+
+
+def _performance(registry):
+    from services.performance_service import PerformanceService
+    return PerformanceService(registry.get('llm'))
+
+
+def _interview(registry):
+    from services.interview_service import InterviewService
+    return InterviewService(registry.get('llm'), registry.get('gemini'), groq_generator=registry.get('groq_generator'))
+
+
+def _pdf_extractor(registry):
+    from services.pdf_service import PDFQuestionExtractor
+    return PDFQuestionExtractor(gemini_service=registry.get('gemini'))
+
+
+services = ServiceRegistry()
+for _name, _factory in (
+    ('llm', _llm),
+    ('gemini', _gemini),
+    ('groq_generator', _groq_generator),
+    ('resume', _resume),
+    ('resume_screening', _resume_screening),
+    ('job_description', _job_description),
+    ('email', _email),
+    ('performance', _performance),
+    ('interview', _interview),
+    ('pdf_extractor', _pdf_extractor),
+):
+    services.register(_name, _factory)
+
+
+def get_service(name: str) -> Any:
+    return services.get(name)
+
+
+def warmup_names() -> List[str]:
+    """Services to build in the background at startup: SERVICE_WARMUP=all|none|name,name"""
+    setting = os.getenv('SERVICE_WARMUP', 'all').strip().lower()
+    if setting in ('', 'none', 'false', '0'):
+        return []
+    if setting == 'all':
+        return services.names
+    return [name.strip() for name in setting.split(',') if name.strip()]
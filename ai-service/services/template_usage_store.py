@@ -0,0 +1,110 @@
+"""
+Template Usage Store - Which communication question templates were handed out
+A per-(scope, kind) cursor in SQLite, advanced inside a write transaction,
+so every worker process claims the next template exactly once and usage
+survives restarts
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'template_usage.db')
+
+GLOBAL_SCOPE = 'global'
+
+
+def usage_scope(scope: str = None) -> str:
+    """Normalized scope key (a job title, application id, ...)"""
+    scope = ' '.join(str(scope or '').lower().split())
+    return scope or GLOBAL_SCOPE
+
+
+class TemplateUsageStore:
+    """Shared across threads and processes; each claim is O(1)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('TEMPLATE_USAGE_PATH', DEFAULT_USAGE_PATH)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Autocommit mode so claims can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS template_cursors (
+                scope TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                template_count INTEGER NOT NULL,
+                claims INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (scope, kind)
+            )
+        """)
+        # Scopes (jobs) nobody generated for in a long time start over
+        self._conn.execute('DELETE FROM template_cursors WHERE updated_at < ?', (time.time() - 180 * 86400,))
+
+    def claim_next(self, kind: str, template_count: int, scope: str = None) -> int:
+        """
+        Atomically claim the next template index for `kind` within `scope`
+
+        Indices run 0..template_count-1 and start over once every template
+        has been claimed, so consecutive claims - from any process - only
+        repeat a template after the whole set was used.
+        """
+        if template_count <= 0:
+            raise ValueError('template_count must be positive')
+
+        scope = usage_scope(scope)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT claims, template_count FROM template_cursors WHERE scope = ? AND kind = ?',
+                    (scope, kind)
+                ).fetchone()
+                claims = 0 if row is None or row[1] != template_count else row[0]
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO template_cursors (scope, kind, template_count, claims, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (scope, kind, template_count, claims + 1, time.time())
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        if claims and claims % template_count == 0:
+            logger.info(f"🔄 All {template_count} {kind} templates used for '{scope}', starting over")
+        return claims % template_count
+
+    def used(self, kind: str, scope: str = None) -> int:
+        """Templates of `kind` claimed in the current pass over the set"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT claims, template_count FROM template_cursors WHERE scope = ? AND kind = ?',
+                (usage_scope(scope), kind)
+            ).fetchone()
+        if not row or not row[0]:
+            return 0
+        claims, template_count = row
+        return (claims - 1) % template_count + 1
+
+    def stats(self, scope: str = None) -> Dict[str, int]:
+        return {kind: self.used(kind, scope) for kind in ('reading', 'listening', 'grammar')}
+
+    def reset(self, scope: str = None):
+        """Forget usage for one scope, or for every scope when `scope` is None"""
+        with self._lock:
+            if scope is None:
+                self._conn.execute('DELETE FROM template_cursors')
+            else:
+                self._conn.execute('DELETE FROM template_cursors WHERE scope = ?', (usage_scope(scope),))
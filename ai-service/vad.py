@@ -0,0 +1,215 @@
+"""
+Energy-based voice activity detection.
+
+Frame RMS is computed for all 30 ms frames at once, voiced frames are
+dilated with a hangover (and a short pre-roll) so word gaps and soft
+onsets stay inside a segment, and isolated clicks shorter than
+`min_speech_ms` are dropped. SpeechGate applies the same decisions to
+audio that arrives in chunks. Recording code writes into a preallocated
+lock-free numpy ring buffer instead of a list of copied blocks.
+"""
+
+import threading
+import numpy as np
+from typing import List, Tuple
+
+
+class AudioRingBuffer:
+    """
+    Preallocated float32 sample buffer for one writer and one reader
+
+    The writer (an audio callback) copies each block in and then advances
+    the total-written counter and signals `data_ready`; readers only use
+    sample positions below a counter value they have read, so no lock is
+    needed. Once more than `capacity` samples were written the oldest are
+    overwritten; size the buffer for the longest recording to keep views
+    valid.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0
+        self.data_ready = threading.Event()
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    @property
+    def written(self) -> int:
+        """Samples written since creation (or clear); positions passed to view() count from here"""
+        return self._written
+
+    def write(self, block: np.ndarray):
+        block = np.asarray(block, dtype=np.float32).ravel()
+        size = block.size
+        if size > self.capacity:
+            # Only the newest `capacity` samples fit, but positions still count every sample
+            block = block[-self.capacity:]
+        position = (self._written + size - block.size) % self.capacity
+        first = min(block.size, self.capacity - position)
+        self._data[position:position + first] = block[:first]
+        self._data[:block.size - first] = block[first:]
+        self._written += size
+        self.data_ready.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until a block was written since the last wait (or the timeout passes)"""
+        ready = self.data_ready.wait(timeout)
+        self.data_ready.clear()
+        return ready
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        """
+        Samples [start, end) by total-written position, oldest first
+
+        A zero-copy view unless the range wraps around the end of the
+        buffer; positions already overwritten are clamped away.
+        """
+        start = max(start, self._written - self.capacity, 0)
+        if end <= start:
+            return self._data[:0]
+        position = start % self.capacity
+        count = end - start
+        if position + count <= self.capacity:
+            return self._data[position:position + count]
+        return np.concatenate([self._data[position:], self._data[:count - (self.capacity - position)]])
+
+    def last(self, count: int) -> np.ndarray:
+        """The most recent `count` samples, oldest first"""
+        written = self._written
+        return self.view(written - count, written)
+
+    def read_all(self) -> np.ndarray:
+        written = self._written
+        return self.view(written - len(self), written)
+
+    def clear(self):
+        self._written = 0
+        self.data_ready.clear()
+
+
+def frame_rms(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """RMS of consecutive non-overlapping frames; the last partial frame is zero padded"""
+    audio = np.asarray(audio, dtype=np.float32).ravel()
+    n_frames = -(-audio.size // frame_length)
+    if not n_frames:
+        return np.empty(0, dtype=np.float32)
+    if audio.size != n_frames * frame_length:
+        padded = np.zeros(n_frames * frame_length, dtype=np.float32)
+        padded[:audio.size] = audio
+        audio = padded
+    return np.sqrt(np.mean(np.square(audio.reshape(n_frames, frame_length)), axis=1))
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indices of the runs of True in `mask`"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+class EnergyVAD:
+    def __init__(self,
+                 sample_rate: int = 16000,
+                 frame_ms: int = 30,
+                 energy_threshold: float = 0.01,
+                 hangover_ms: int = 300,
+                 preroll_ms: int = 90,
+                 min_speech_ms: int = 90):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.energy_threshold = energy_threshold
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        self.preroll_frames = int(round(preroll_ms / frame_ms))
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+
+    def speech_mask(self, audio: np.ndarray) -> np.ndarray:
+        """Per-frame speech decision after click removal and hangover smoothing"""
+        voiced = frame_rms(audio, self.frame_length) >= self.energy_threshold
+
+        # Drop bursts too short to be speech
+        starts, ends = _runs(voiced)
+        for start, end in zip(starts, ends):
+            if end - start < self.min_speech_frames:
+                voiced[start:end] = False
+
+        # Frame i is speech if a voiced frame lies within [i - hangover, i + preroll]
+        counts = np.concatenate([[0], np.cumsum(voiced)])
+        n = voiced.size
+        index = np.arange(n)
+        upper = np.minimum(index + self.preroll_frames + 1, n)
+        lower = np.maximum(index - self.hangover_frames, 0)
+        return counts[upper] - counts[lower] > 0
+
+    def segments(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """(start, end) sample ranges of speech"""
+        audio = np.asarray(audio).ravel()
+        starts, ends = _runs(self.speech_mask(audio))
+        return [(int(start * self.frame_length), int(min(end * self.frame_length, audio.size)))
+                for start, end in zip(starts, ends)]
+
+    def trim(self, audio: np.ndarray) -> np.ndarray:
+        """Only the speech segments of `audio`, concatenated (empty if there is no speech)"""
+        audio = np.asarray(audio, dtype=np.float32).ravel()
+        segments = self.segments(audio)
+        if not segments:
+            return np.empty(0, dtype=np.float32)
+        if len(segments) == 1:
+            start, end = segments[0]
+            return audio[start:end]  # A view, no copy
+        return np.concatenate([audio[start:end] for start, end in segments])
+
+    def is_silent(self, audio: np.ndarray) -> bool:
+        """True when every frame of `audio` is below the energy threshold"""
+        rms = frame_rms(audio, self.frame_length)
+        return bool(rms.size) and bool(np.all(rms < self.energy_threshold))
+
+
+class SpeechGate:
+    """
+    EnergyVAD.trim for audio that arrives in chunks
+
+    Each chunk returns the speech samples that can be decided so far. A
+    frame is decided once the frames its pre-roll and short-burst rules
+    look at have arrived, and enough earlier frames are kept for the
+    hangover, so the concatenated output equals trimming the whole
+    recording at once while memory stays constant.
+    """
+
+    def __init__(self, vad: EnergyVAD):
+        self.vad = vad
+        self.lookahead = vad.preroll_frames + vad.min_speech_frames
+        self.context = vad.hangover_frames + vad.min_speech_frames
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.empty(0, dtype=np.float32)  # Context frames, undecided frames and a partial frame
+        self._decided = 0                             # Leading frames of _buffer that are context only
+
+    def feed(self, chunk: np.ndarray) -> np.ndarray:
+        """Speech samples decided after adding `chunk`"""
+        return self._gate(np.asarray(chunk, dtype=np.float32).ravel(), final=False)
+
+    def flush(self) -> np.ndarray:
+        """Speech samples of the rest of the recording"""
+        speech = self._gate(np.empty(0, dtype=np.float32), final=True)
+        self.reset()
+        return speech
+
+    def _gate(self, chunk: np.ndarray, final: bool) -> np.ndarray:
+        frame = self.vad.frame_length
+        buffer = np.concatenate([self._buffer, chunk])
+        # Until the end, only whole frames are classified
+        mask = self.vad.speech_mask(buffer if final else buffer[:buffer.size // frame * frame])
+        end = mask.size if final else max(self._decided, mask.size - self.lookahead)
+
+        starts, ends = _runs(mask[self._decided:end])
+        speech = [buffer[(self._decided + start) * frame:min((self._decided + stop) * frame, buffer.size)]
+                  for start, stop in zip(starts, ends)]
+
+        keep = max(0, end - self.context)
+        self._buffer = buffer[keep * frame:]
+        self._decided = end - keep
+        if not speech:
+            return np.empty(0, dtype=np.float32)
+        return speech[0] if len(speech) == 1 else np.concatenate(speech)
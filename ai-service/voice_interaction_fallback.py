@@ -2,7 +2,8 @@
 Fallback voice interaction module that avoids native build requirements.
 - Uses pyttsx3 for offline TTS (pure Python wrappers over SAPI on Windows)
 - Uses a simple RMS-energy VAD instead of webrtcvad
-- Uses openai-whisper for ASR if available, but provides text-only fallback
+- Uses openai-whisper for ASR if available (in a shared worker process that
+  transcribes while recording), but provides text-only fallback
 
 How to use:
 1. Install minimal requirements: see `requirements-alt.txt`
@@ -11,25 +12,33 @@ How to use:
 This is designed for Windows where compiling native extensions may fail.
 """
 
+import importlib.util
 import time
 import numpy as np
 import sounddevice as sd
 import pyttsx3
 import threading
 
-try:
-    import whisper
-    _HAS_WHISPER = True
-except Exception:
-    _HAS_WHISPER = False
+from asr_worker import get_asr_worker
+from vad import AudioRingBuffer, EnergyVAD, frame_rms
+
+# whisper (and torch) are only imported by the ASR worker process
+_HAS_WHISPER = importlib.util.find_spec('whisper') is not None
 
 
 class VoiceInteractionFallback:
-    def __init__(self, sample_rate=16000, channels=1, energy_threshold=0.01, silence_duration=0.6):
+    def __init__(self, sample_rate=16000, channels=1, energy_threshold=0.01, silence_duration=0.6,
+                 chunk_pause=0.3, max_chunk_seconds=10.0, transcribe_timeout=60.0):
         self.sample_rate = sample_rate
         self.channels = channels
         self.energy_threshold = energy_threshold
         self.silence_duration = silence_duration
+        # While recording, a voiced chunk is sent to ASR after a pause this long (or once it gets too long)
+        self.chunk_pause = chunk_pause
+        self.max_chunk_seconds = max_chunk_seconds
+        # Upper bound on one Whisper decode, so a dead or stuck worker cannot hang the caller
+        self.transcribe_timeout = transcribe_timeout
+        self.vad = EnergyVAD(sample_rate=sample_rate, energy_threshold=energy_threshold)
 
         # Initialize TTS (pyttsx3 uses native Windows SAPI - no build required)
         self.tts_engine = pyttsx3.init()
@@ -39,15 +48,15 @@ class VoiceInteractionFallback:
             # Prefer a female/en-US voice if present
             self.tts_engine.setProperty('voice', voices[0].id)
 
-        # Whisper model (optional)
+        # Whisper worker (optional); the model is loaded once per process, not per instance
         if _HAS_WHISPER:
             try:
-                self.asr_model = whisper.load_model('base')
+                self.asr = get_asr_worker('base', language='en')
             except Exception as e:
-                print('Warning: Failed to load whisper model:', e)
-                self.asr_model = None
+                print('Warning: Failed to start whisper worker:', e)
+                self.asr = None
         else:
-            self.asr_model = None
+            self.asr = None
 
     def speak_text(self, text: str, wait=True):
         """Speak using pyttsx3. Runs in background thread if wait=False"""
@@ -58,66 +67,109 @@ class VoiceInteractionFallback:
             t = threading.Thread(target=self.speak_text, args=(text, True), daemon=True)
             t.start()
 
-    def _rms(self, frames: np.ndarray):
-        return np.sqrt(np.mean(np.square(frames)))
-
-    def record_until_silence(self, timeout=15):
+    def record_until_silence(self, timeout=15, on_chunk=None):
         """Record audio frames until sustained silence detected.
-        Returns a numpy array of float32 audio samples at `self.sample_rate`.
+        Returns a numpy array of float32 audio samples at `self.sample_rate`
+        (a view of the capture buffer). `on_chunk`, if given, is called from
+        the recording loop with each voiced chunk as soon as it completes.
         """
         block_ms = 30
         blocksize = int(self.sample_rate * (block_ms / 1000.0))
+        frame = self.vad.frame_length
+        silence_frames = max(1, int(np.ceil(self.silence_duration * self.sample_rate / frame)))
 
-        recorded = []
-        silence_blocks = 0
-        max_silence_blocks = int(self.silence_duration / (block_ms / 1000.0))
+        # Preallocated for the whole timeout (plus slack): the callback never allocates and
+        # the finished recording is a view of this buffer, not a concatenation of blocks
+        ring = AudioRingBuffer(int((timeout + 1) * self.sample_rate))
 
         def callback(indata, frames, time_info, status):
             if status:
                 # print('Input status:', status)
                 pass
-            recorded.append(indata.copy())
+            ring.write(indata[:, 0] if indata.shape[1] == 1 else indata.mean(axis=1))
+
+        checked = 0          # Samples already classified as silent / not silent
+        trailing_silent = 0  # Silent frames at the end of what was checked
+
+        pause_frames = max(1, int(np.ceil(self.chunk_pause * self.sample_rate / frame)))
+        max_chunk = int(self.max_chunk_seconds * self.sample_rate)
+        preroll = self.vad.preroll_frames * frame
+        chunk_floor = 0      # Samples before this were already handed to on_chunk
+        chunk_start = None   # Start of the voiced chunk being collected
+        last_loud = 0        # End of the last loud frame
 
         stream = sd.InputStream(samplerate=self.sample_rate, channels=self.channels, blocksize=blocksize, callback=callback)
         stream.start()
-        start_ts = time.time()
+        deadline = time.time() + timeout
         try:
             while True:
-                time.sleep(block_ms / 1000.0)
-                if len(recorded) == 0:
-                    continue
-                # compute RMS on last block
-                last_block = recorded[-1].flatten()
-                rms = self._rms(last_block)
-                if rms < self.energy_threshold:
-                    silence_blocks += 1
-                else:
-                    silence_blocks = 0
-                if silence_blocks >= max_silence_blocks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
                     break
-                if time.time() - start_ts > timeout:
+                # Wake as soon as the callback delivers a block instead of polling on a timer
+                ring.wait(min(remaining, 0.25))
+
+                # Classify only the complete frames that arrived since the last check
+                complete = (ring.written - checked) // frame * frame
+                if complete:
+                    loud = np.flatnonzero(frame_rms(ring.view(checked, checked + complete), frame) >= self.energy_threshold)
+                    frames_checked = complete // frame
+                    trailing_silent = trailing_silent + frames_checked if loud.size == 0 else frames_checked - 1 - loud[-1]
+                    if loud.size:
+                        if chunk_start is None:
+                            chunk_start = max(chunk_floor, checked + loud[0] * frame - preroll)
+                        last_loud = checked + (loud[-1] + 1) * frame
+                    checked += complete
+
+                    # Hand over a chunk at a pause, or mid-speech once it reaches max_chunk_seconds
+                    if on_chunk is not None and chunk_start is not None:
+                        cut = None
+                        if trailing_silent >= pause_frames:
+                            cut = min(checked, last_loud + pause_frames * frame)
+                        elif checked - chunk_start >= max_chunk:
+                            cut = checked
+                        if cut is not None:
+                            on_chunk(ring.view(chunk_start, cut))
+                            chunk_floor, chunk_start = cut, None
+                if trailing_silent >= silence_frames:
                     break
         finally:
             stream.stop()
             stream.close()
 
-        if not recorded:
-            return np.zeros((0,), dtype=np.float32)
+        if on_chunk is not None and chunk_start is not None:
+            on_chunk(ring.view(chunk_start, min(ring.written, last_loud + pause_frames * frame)))
 
-        audio = np.concatenate(recorded, axis=0)
-        audio = audio.flatten().astype(np.float32)
-        return audio
+        return ring.read_all()
+
+    def record_and_transcribe(self, timeout=15, finish_timeout=30):
+        """Record until silence while transcribing completed voiced chunks in the background.
+        Returns (audio, transcript); the transcript is ready shortly after end-of-speech.
+        """
+        if self.asr is None:
+            return self.record_until_silence(timeout=timeout), ''
+        session = self.asr.session()
+        audio = self.record_until_silence(timeout=timeout, on_chunk=session.add)
+        return audio, session.finish(timeout=finish_timeout)
+
+    def speech_only(self, audio_np: np.ndarray) -> np.ndarray:
+        """Voiced segments of a recording, without leading, trailing and long inner silence"""
+        return self.vad.trim(audio_np)
 
     def transcribe_audio(self, audio_np: np.ndarray):
         """Transcribe with whisper if available, otherwise return empty string"""
-        if self.asr_model is None:
+        if self.asr is None:
             print('ASR not available (whisper not installed or failed to load).')
             return ''
 
+        # Whisper cost grows with audio length, so silence is cut before transcribing
+        speech = self.speech_only(audio_np)
+        if speech.size == 0:
+            return ''
+
         # Whisper expects float32 audio sampled at 16000
         try:
-            result = self.asr_model.transcribe(audio_np, language='en')
-            return result.get('text', '').strip()
+            return self.asr.transcribe(speech, timeout=self.transcribe_timeout)
         except Exception as e:
             print('Whisper transcription failed:', e)
             return ''
@@ -128,11 +180,9 @@ if __name__ == '__main__':
     mgr = VoiceInteractionFallback()
     mgr.speak_text('Hello. Please say something after the beep.', wait=True)
     print('Recording...')
-    audio = mgr.record_until_silence(timeout=10)
+    audio, text = mgr.record_and_transcribe(timeout=10)
     print('Recorded', len(audio), 'samples')
-    if len(audio) > 0 and mgr.asr_model is not None:
-        print('Transcribing...')
-        text = mgr.transcribe_audio(audio)
+    if len(audio) > 0 and mgr.asr is not None:
         print('Transcript:', text)
     else:
         print('No ASR available; recorded audio length:', len(audio))
\ No newline at end of file
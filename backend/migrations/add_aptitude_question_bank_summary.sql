@@ -0,0 +1,41 @@
+-- Summarize the aptitude question bank for the AI service in one call
+-- Returns one row per (topic, difficulty) with the question count, how many of
+-- those rows still lack near-duplicate signatures, and a few recent question
+-- texts (truncated) that the generation prompt lists as examples to avoid.
+-- The full text of the bank never leaves the database.
+-- Requires add_aptitude_question_signatures.sql
+
+CREATE OR REPLACE FUNCTION aptitude_question_bank_summary(
+  p_topics TEXT[],
+  p_samples INTEGER DEFAULT 3,
+  p_sample_length INTEGER DEFAULT 100
+) RETURNS TABLE (
+  topic TEXT,
+  difficulty TEXT,
+  question_count BIGINT,
+  unsigned_count BIGINT,
+  samples TEXT[]
+) AS $$
+  WITH ranked AS (
+    SELECT
+      q.topic,
+      q.difficulty,
+      q.question_text,
+      q.minhash IS NULL AS unsigned,
+      ROW_NUMBER() OVER (PARTITION BY q.topic, q.difficulty ORDER BY q.created_at DESC) AS position
+    FROM aptitude_questions q
+    WHERE q.topic = ANY(p_topics)
+  )
+  SELECT
+    r.topic::TEXT,
+    r.difficulty::TEXT,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE r.unsigned),
+    ARRAY_AGG(LEFT(r.question_text, p_sample_length + 1) ORDER BY r.position) FILTER (WHERE r.position <= p_samples)
+  FROM ranked r
+  GROUP BY r.topic, r.difficulty;
+$$ LANGUAGE sql STABLE;
+
+-- Topic filter for the summary
+CREATE INDEX IF NOT EXISTS idx_aptitude_questions_topic_difficulty
+ON aptitude_questions(topic, difficulty);
@@ -0,0 +1,77 @@
+-- Add near-duplicate signatures to aptitude_questions
+-- The AI service computes a content hash and a MinHash signature (60 values,
+-- banded into 20 keys) for every generated question. Storing them lets a new
+-- question be checked against the whole bank through an index lookup instead
+-- of loading and re-hashing every stored question on each request
+
+-- 1. Signature columns
+ALTER TABLE aptitude_questions
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(16),
+ADD COLUMN IF NOT EXISTS minhash BIGINT[],
+ADD COLUMN IF NOT EXISTS minhash_bands BIGINT[];
+
+-- 2. Indexes: exact repeats by hash, near-duplicate candidates by shared band key
+CREATE INDEX IF NOT EXISTS idx_aptitude_questions_content_hash
+ON aptitude_questions(content_hash);
+
+CREATE INDEX IF NOT EXISTS idx_aptitude_questions_minhash_bands
+ON aptitude_questions USING GIN (minhash_bands);
+
+-- Rows still waiting for the AI service to backfill their signatures
+CREATE INDEX IF NOT EXISTS idx_aptitude_questions_unsigned
+ON aptitude_questions(id) WHERE minhash IS NULL;
+
+-- 3. Keys of candidate questions that repeat, or nearly repeat, a stored question
+-- p_candidates: [{"key": 0, "content_hash": "...", "minhash": [...], "minhash_bands": [...]}, ...]
+-- A stored question sharing a band key is a candidate; it counts as a near-duplicate
+-- when at least p_threshold of the signature positions are equal
+CREATE OR REPLACE FUNCTION find_aptitude_near_duplicates(
+  p_candidates JSONB,
+  p_threshold REAL DEFAULT 0.6
+) RETURNS TABLE (candidate INTEGER) AS $$
+  WITH candidates AS (
+    SELECT
+      (item->>'key')::INTEGER AS key,
+      item->>'content_hash' AS content_hash,
+      ARRAY(SELECT jsonb_array_elements_text(COALESCE(item->'minhash', '[]'))::BIGINT) AS minhash,
+      ARRAY(SELECT jsonb_array_elements_text(COALESCE(item->'minhash_bands', '[]'))::BIGINT) AS bands
+    FROM jsonb_array_elements(p_candidates) AS item
+  )
+  SELECT c.key
+  FROM candidates c
+  WHERE EXISTS (
+      SELECT 1 FROM aptitude_questions q WHERE q.content_hash = c.content_hash
+    )
+    OR EXISTS (
+      SELECT 1
+      FROM aptitude_questions q
+      WHERE q.minhash_bands && c.bands
+        AND (
+          SELECT COUNT(*) FROM unnest(q.minhash, c.minhash) AS m(stored, candidate)
+          WHERE m.stored = m.candidate
+        ) >= p_threshold * cardinality(c.minhash)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- 4. Backfill signatures computed by the AI service for existing rows
+-- p_rows: [{"id": "...", "content_hash": "...", "minhash": [...], "minhash_bands": [...]}, ...]
+CREATE OR REPLACE FUNCTION set_aptitude_question_signatures(
+  p_rows JSONB
+) RETURNS INTEGER AS $$
+  WITH updated AS (
+    UPDATE aptitude_questions q
+    SET
+      content_hash = r->>'content_hash',
+      minhash = ARRAY(SELECT jsonb_array_elements_text(COALESCE(r->'minhash', '[]'))::BIGINT),
+      minhash_bands = ARRAY(SELECT jsonb_array_elements_text(COALESCE(r->'minhash_bands', '[]'))::BIGINT)
+    FROM jsonb_array_elements(p_rows) AS r
+    WHERE q.id = (r->>'id')::UUID
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INTEGER FROM updated;
+$$ LANGUAGE sql;
+
+-- Add comments
+COMMENT ON COLUMN aptitude_questions.content_hash IS 'Hash of the normalized question text (exact-repeat check)';
+COMMENT ON COLUMN aptitude_questions.minhash IS 'MinHash signature of the question word shingles (empty if the text has no words)';
+COMMENT ON COLUMN aptitude_questions.minhash_bands IS 'LSH band keys of minhash; questions sharing a key are near-duplicate candidates';
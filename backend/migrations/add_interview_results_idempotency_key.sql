@@ -0,0 +1,14 @@
+-- Add idempotency_key column to interview_results table
+-- The AI service sends an Idempotency-Key header with every results delivery;
+-- a retried delivery (e.g. after a timeout on a request that did succeed)
+-- must not create a second row
+
+ALTER TABLE interview_results
+ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(128);
+
+-- Unique so concurrent deliveries of the same results insert only once
+CREATE UNIQUE INDEX IF NOT EXISTS idx_interview_results_idempotency_key
+ON interview_results(idempotency_key);
+
+-- Add comment
+COMMENT ON COLUMN interview_results.idempotency_key IS 'Idempotency-Key of the AI service delivery that created this row';
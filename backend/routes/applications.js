@@ -249,32 +249,59 @@ router.post('/interview/:token/results', async (req, res) => {
       });
     }
     
-    // Save interview results
-    const { data: savedResults, error: saveError } = await supabase
+    // Deliveries carry an Idempotency-Key: a retried delivery (e.g. after a timeout on a
+    // request that did succeed) gets the row its first attempt created instead of a new one
+    const idempotencyKey = req.get('Idempotency-Key') || null;
+    const findDelivered = () => supabase
       .from('interview_results')
-      .insert({
-        application_id: application.id,
-        candidate_id: application.candidate_id,
-        job_id: application.job_id,
-        overall_score: results.overall_score || 0,
-        performance_level: results.performance_level || 'Average',
-        question_scores: results.question_scores || [],
-        category_scores: results.category_scores || [],
-        feedback: results.feedback || '',
-        recommendations: results.recommendations || [],
-        strengths: results.strengths || [],
-        weaknesses: results.weaknesses || [],
-        completed_at: new Date().toISOString()
-      })
       .select()
-      .single();
+      .eq('idempotency_key', idempotencyKey)
+      .maybeSingle();
     
-    if (saveError) {
-      console.error('❌ Error saving results:', saveError);
-      return res.status(500).json({
-        success: false,
-        message: 'Failed to save results'
-      });
+    let savedResults = null;
+    if (idempotencyKey) {
+      const { data: existing } = await findDelivered();
+      savedResults = existing;
+    }
+    
+    if (savedResults) {
+      console.log('♻️ Interview results already saved for this delivery, skipping insert');
+    } else {
+      // Save interview results
+      const { data: inserted, error: saveError } = await supabase
+        .from('interview_results')
+        .insert({
+          application_id: application.id,
+          candidate_id: application.candidate_id,
+          job_id: application.job_id,
+          overall_score: results.overall_score || 0,
+          performance_level: results.performance_level || 'Average',
+          question_scores: results.question_scores || [],
+          category_scores: results.category_scores || [],
+          feedback: results.feedback || '',
+          recommendations: results.recommendations || [],
+          strengths: results.strengths || [],
+          weaknesses: results.weaknesses || [],
+          idempotency_key: idempotencyKey,
+          completed_at: new Date().toISOString()
+        })
+        .select()
+        .single();
+      
+      if (saveError && saveError.code === '23505' && idempotencyKey) {
+        // A concurrent delivery with the same key inserted first
+        console.log('♻️ Interview results saved by a concurrent delivery');
+        const { data: existing } = await findDelivered();
+        savedResults = existing;
+      } else if (saveError) {
+        console.error('❌ Error saving results:', saveError);
+        return res.status(500).json({
+          success: false,
+          message: 'Failed to save results'
+        });
+      } else {
+        savedResults = inserted;
+      }
     }
     
     // Update application status and mark interview as completed
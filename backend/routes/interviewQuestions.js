@@ -2,6 +2,7 @@ const express = require('express');
 const { authenticate } = require('../middlewares/auth');
 const { authorize } = require('../middlewares/role');
 const { supabase } = require('../config/db');
+const aiService = require('../services/aiService');
 
 const router = express.Router();
 
@@ -102,6 +103,7 @@ router.delete('/application/:applicationId/duplicates', authorize('admin', 'hr')
         .in('id', toDelete);
       
       console.log(`✅ Deleted ${toDelete.length} duplicate questions, kept ${toKeep.length}`);
+      aiService.invalidateCustomQuestions(applicationId); // Never rejects; not awaited
     }
     
     res.json({
@@ -177,6 +179,7 @@ router.post('/application/:applicationId', authorize('admin', 'hr'), async (req,
     }
     
     console.log('✅ Questions created successfully');
+    aiService.invalidateCustomQuestions(applicationId); // Never rejects; not awaited
     
     res.json({
       success: true,
@@ -246,6 +249,8 @@ router.put('/:id', authorize('admin', 'hr'), async (req, res) => {
       });
     }
     
+    aiService.invalidateCustomQuestions(data.application_id); // Never rejects; not awaited
+    
     res.json({
       success: true,
       data
@@ -264,10 +269,11 @@ router.delete('/:id', authorize('admin', 'hr'), async (req, res) => {
   try {
     const { id } = req.params;
     
-    const { error } = await supabase
+    const { data: deleted, error } = await supabase
       .from('interview_questions')
       .delete()
-      .eq('id', id);
+      .eq('id', id)
+      .select('application_id');
     
     if (error) {
       return res.status(500).json({
@@ -276,6 +282,10 @@ router.delete('/:id', authorize('admin', 'hr'), async (req, res) => {
       });
     }
     
+    if (deleted && deleted.length > 0) {
+      aiService.invalidateCustomQuestions(deleted[0].application_id); // Never rejects; not awaited
+    }
+    
     res.json({
       success: true,
       message: 'Question deleted successfully'
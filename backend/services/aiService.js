@@ -132,6 +132,23 @@ const aiService = {
     }
   },
 
+  /**
+   * Drop the AI service's cached custom questions for an application
+   * Best effort: the cache lives in each AI worker process (this reaches one of them)
+   * and otherwise expires after CUSTOM_QUESTIONS_CACHE_TTL
+   * @param {string} applicationId - Application whose questions changed
+   */
+  async invalidateCustomQuestions(applicationId) {
+    try {
+      const headers = process.env.API_SECRET ? { 'X-API-Secret': process.env.API_SECRET } : {};
+      await axios.post(`${AI_SERVICE_URL}/api/ai/interview/questions/invalidate`, {
+        application_id: applicationId
+      }, { headers, timeout: 5000 });
+    } catch (error) {
+      console.error('Custom question cache invalidation failed:', error.message);
+    }
+  },
+
   /**
    * Chat with AI assistant (role-based)
    * @param {string} message - User message
@@ -22,7 +22,11 @@ class AssessmentService {
             topic: q.topic,
             difficulty: q.difficulty || 'medium',
             time_limit: q.time_limit || 60,
-            question_order: index
+            question_order: index,
+            // Near-duplicate signatures computed by the AI service
+            content_hash: q.content_hash || null,
+            minhash: q.minhash || null,
+            minhash_bands: q.minhash_bands || null
           }));
           break;
           